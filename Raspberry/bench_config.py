@@ -0,0 +1,65 @@
+"""
+Benchmark da gravação de configuração
+-------------------------------------
+- Simula o botão "+" segurado: N alterações seguidas de limiar
+- Compara a gravação síncrona antiga (json.dump a cada alteração, na thread
+  da interface) com o ConfigStore (memória + gravação atômica adiada)
+- Mede o tempo gasto na thread chamadora e o número de gravações em disco
+
+Uso: python bench_config.py --alteracoes 50
+"""
+
+import argparse, contextlib, io, json, os, tempfile, time
+import configuracao
+
+
+def _legacy_save(path, thresholds, manual_mask):
+    """Gravação original de comunicacao.save_config()."""
+    with open(path, "w") as f:
+        json.dump({"aeradores": thresholds, "mask": manual_mask}, f, indent=2)
+
+
+def run(alteracoes=50, intervalo=0.02, quiet=0.5):
+    """Executa as duas variantes e retorna um dicionário com os resultados."""
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        path = os.path.join(tmp, "config_oxigenio.json")
+        legacy_time = 0.0
+        for i in range(alteracoes):
+            t0 = time.perf_counter()
+            _legacy_save(path, [5.0 + i * 0.1, 5.0, 5.0, 5.0], 0)
+            legacy_time += time.perf_counter() - t0
+            time.sleep(intervalo)
+
+        path = os.path.join(tmp, "config_store.json")
+        store = configuracao.ConfigStore(path, quiet=quiet)
+        store_time = 0.0
+        for i in range(alteracoes):
+            t0 = time.perf_counter()
+            store.update([5.0 + i * 0.1, 5.0, 5.0, 5.0], 0)
+            store_time += time.perf_counter() - t0
+            time.sleep(intervalo)
+        time.sleep(quiet + 0.2)
+        store.flush()
+        assert store.load()["thresholds"][0] == 5.0 + (alteracoes - 1) * 0.1
+
+    return {
+        "alteracoes": alteracoes,
+        "legado_gravacoes": alteracoes,
+        "legado_ms_por_chamada": legacy_time * 1000 / alteracoes,
+        "store_gravacoes": store.writes,
+        "store_bytes": store.bytes_written,
+        "store_ms_por_chamada": store_time * 1000 / alteracoes,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--alteracoes", type=int, default=50, help="alterações seguidas de limiar")
+    parser.add_argument("--intervalo", type=float, default=0.02, help="intervalo entre alterações (s)")
+    parser.add_argument("--silencio", type=float, default=0.5, help="período de silêncio do ConfigStore (s)")
+    args = parser.parse_args()
+
+    r = run(args.alteracoes, args.intervalo, args.silencio)
+    print(f"Legado: {r['legado_gravacoes']} gravações | {r['legado_ms_por_chamada']:.3f} ms por chamada")
+    print(f"ConfigStore: {r['store_gravacoes']} gravação(ões), {r['store_bytes']} bytes "
+          f"| {r['store_ms_por_chamada']:.3f} ms por chamada")
@@ -0,0 +1,150 @@
+"""
+Benchmark do monitor de enlace com perda roteirizada
+----------------------------------------------------
+- Uma máscara por segundo (tempo simulado) de send_mask_once() para uma
+  Black Pill virtual, com a perda do éter trocada por fases (ROTEIRO)
+- Compara retransmissões fixas (setRetries(15, 15), 5 tentativas de software)
+  com o MonitorEnlace adaptativo: entregas, retransmissões desperdiçadas,
+  tempo de ar e latência de entrega (tempo simulado, sem dormir)
+- Também na cadência real de um viveiro: máscara estável, só o keep-alive do
+  MaskTransmitter (uma escrita a cada 30 s), fases de 30 min
+- Varredura de canais contra ruído conhecido por canal
+
+Uso: python bench_enlace.py --fase 120 --roteiro 0,0.3,0.6,1,0.1,0
+"""
+
+import argparse, os, random, statistics
+
+os.environ.setdefault("AERACAO_RADIO", "virtual")
+
+import comunicacao
+import enlace
+import transmissao
+import transporte
+
+ROTEIRO = [0.0, 0.3, 0.6, 1.0, 0.1, 0.0]  # Perda por fase (1.0 = estação fora do ar)
+
+
+class _Orcamento:
+    """Orçamento de software ajustado pelo monitor (como um MaskTransmitter)."""
+
+    def __init__(self, max_attempts=5, backoff=0.02):
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(p / 100 * len(ordenados)))] if ordenados else float("nan")
+
+
+def executar(adaptativo, roteiro=ROTEIRO, fase=120.0, janela=10.0, seed=1, intervalo=1.0):
+    """Uma passada pelo roteiro; retorna o resultado e as janelas do monitor."""
+    ether = transporte.VirtualEther(realtime=False, seed=seed)
+    radio = transporte.VirtualRF24(ether, name="rpi")
+    estacao = transporte.VirtualRF24(ether, name="bp")
+    estacao.setChannel(comunicacao.CANAL)
+    estacao.openReadingPipe(1, comunicacao.ADDR_TX)
+    estacao.startListening()
+
+    agora = 0.0
+    monitor = enlace.MonitorEnlace(janela=janela, adaptativo=adaptativo, relogio=lambda: agora,
+                                   lost_counter=None)
+    if not adaptativo:
+        monitor.nivel = len(enlace.NIVEIS) - 1  # setRetries(15, 15) de antes
+    orcamento = _Orcamento()
+    if adaptativo:
+        monitor.acompanhar(orcamento)
+    comunicacao.link_monitor = monitor
+    comunicacao.use_radio(radio)
+    comunicacao.setup()
+
+    latencias, entregues, enviadas = [], 0, 0
+    for perda in roteiro:
+        ether.loss = perda
+        ether.ruido = {comunicacao.CANAL: perda / 2}  # Interferência aparece no RPD
+        fim = agora + fase
+        while agora < fim:
+            enviadas += 1
+            inicio = agora
+            delay = orcamento.backoff
+            for tentativa in range(orcamento.max_attempts):
+                antes = radio.tx_time_s
+                ok = comunicacao.send_mask_once(enviadas & 0x0F)
+                agora += radio.tx_time_s - antes
+                estacao.flush_rx()
+                if ok:
+                    entregues += 1
+                    latencias.append(agora - inicio)
+                    break
+                if tentativa + 1 < orcamento.max_attempts:
+                    agora += delay
+                    delay = min(delay * 2, 0.2)
+            agora = inicio + intervalo  # Próxima máscara
+    return {
+        "enviadas": enviadas,
+        "entregues": entregues,
+        "escritas": radio.tx_packets,
+        "tentativas_radio": radio.tx_attempts,
+        "desperdicadas": radio.tx_attempts - entregues,
+        "tempo_ar_ms": round(radio.airtime_s * 1000, 1),
+        "latencia_media_ms": round(statistics.fmean(latencias) * 1000, 2) if latencias else float("nan"),
+        "latencia_p95_ms": round(_percentil(latencias, 95) * 1000, 2),
+        "trocas_nivel": monitor.trocas,
+        "nivel_final": monitor.politica.nome,
+    }, list(monitor.janelas)
+
+
+def varredura(seed=1, ruidosos=(100, 101, 102, 40), amostras=50):
+    """Ruído conhecido em alguns canais; retorna o ranking da varredura."""
+    ether = transporte.VirtualEther(realtime=False, seed=seed)
+    rng = random.Random(seed)
+    ether.ruido = {c: rng.uniform(0.0, 0.02) for c in range(126)}
+    for c in ruidosos:
+        ether.ruido[c] = 0.5
+    radio = transporte.VirtualRF24(ether, name="scan")
+    return enlace.varrer_canais(radio, range(126), amostras, espera=0.0)
+
+
+def run(roteiro=ROTEIRO, fase=120.0, janela=10.0, seed=1):
+    """Executa o benchmark e retorna um dicionário com os resultados."""
+    anterior = comunicacao.radio, comunicacao.link_monitor
+    try:
+        fixo, _ = executar(False, roteiro, fase, janela, seed)
+        adaptativo, janelas = executar(True, roteiro, fase, janela, seed)
+        keepalive = transmissao.MaskTransmitter().keepalive
+        fixo_keepalive, _ = executar(False, roteiro, fase * keepalive / 2, janela, seed, keepalive)
+        adaptativo_keepalive, _ = executar(True, roteiro, fase * keepalive / 2, janela, seed, keepalive)
+    finally:
+        comunicacao.use_radio(anterior[0])
+        comunicacao.link_monitor = anterior[1]
+    ranking = varredura(seed)
+    return {"fixo": fixo, "adaptativo": adaptativo, "fixo_keepalive": fixo_keepalive,
+            "adaptativo_keepalive": adaptativo_keepalive, "janelas": janelas,
+            "canais_limpos": ranking[:5], "canais_ruidosos": ranking[-4:]}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--roteiro", type=lambda s: [float(v) for v in s.split(",")], default=ROTEIRO,
+                        help="perda de cada fase, separada por vírgulas")
+    parser.add_argument("--fase", type=float, default=120.0, help="duração de cada fase (s simulados)")
+    parser.add_argument("--janela", type=float, default=10.0, help="janela do monitor (s simulados)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--janelas", action="store_true", help="lista as janelas do modo adaptativo")
+    args = parser.parse_args()
+
+    import contextlib, io
+    with contextlib.redirect_stdout(io.StringIO()):  # Mensagens do setup()
+        r = run(args.roteiro, args.fase, args.janela, args.seed)
+    for modo in ("fixo", "adaptativo", "fixo_keepalive", "adaptativo_keepalive"):
+        m = r[modo]
+        print(f"{modo:>20}: {m['entregues']}/{m['enviadas']} entregues | {m['desperdicadas']} retransmissões "
+              f"desperdiçadas | ar {m['tempo_ar_ms']} ms | latência média {m['latencia_media_ms']} ms, "
+              f"p95 {m['latencia_p95_ms']} ms | trocas de nível {m['trocas_nivel']} (fim: {m['nivel_final']})")
+    if args.janelas:
+        for j in r["janelas"]:
+            print(f"  {j['duracao_s']:6.1f} s  {j['nivel']:<8} escritas={j['escritas']:<3} falhas={j['falhas']:<3} "
+                  f"arc_medio={j['arc_medio']:<5} portadora={j['portadora']}")
+    print("Varredura: mais limpos " + ", ".join(f"{c} ({f:.0%})" for c, f in r["canais_limpos"])
+          + " | mais ruidosos " + ", ".join(f"{c} ({f:.0%})" for c, f in r["canais_ruidosos"]))
@@ -0,0 +1,83 @@
+"""
+Benchmark do hub com várias estações virtuais
+---------------------------------------------
+- Até 6 Black Pills virtuais, cada uma em um pipe do Raspberry Pi, com
+  períodos defasados e leituras diferentes
+- Mede por estação a latência RX→ACK da máscara e a taxa de janelas perdidas
+  (máscara que não chegou dentro de 1 s)
+
+Uso: python bench_hub.py --estacoes 6 --duracao 20 --perda 0.1
+"""
+
+import argparse, contextlib, io, math, os, time
+
+os.environ.setdefault("AERACAO_RADIO", "virtual")
+
+import comunicacao
+import hub as _hub
+import transporte
+from estacao_virtual import EstacaoVirtual
+
+
+def run(estacoes=6, duracao=10.0, perda=0.0, latencia=0.0, periodo=0.5, seed=1):
+    """Executa o benchmark e retorna (resumo, estatísticas por nó)."""
+    ether = transporte.VirtualEther(loss=perda, latency=latencia, seed=seed)
+    comunicacao.use_radio(transporte.VirtualRF24(ether, name="rpi"))
+
+    # Nó 1 no pipe 1 (endereços originais do master.ino); o pipe 0 fica por último
+    nodes = [_hub.Node(k + 1, (k + 1) % transporte.NUM_PIPES, b"Bp32" + bytes([ord("A") + k]),
+                       [4.0 + k * 0.5, 5.0, 6.0, 7.0]) for k in range(estacoes)]
+    central = _hub.Hub(nodes)
+    stations = []
+    for node in nodes:
+        # Cada viveiro oscila com fase própria
+        sample = (lambda phase: lambda n: (5.5 + 2.0 * math.sin(n / 10 + phase), 25.0))(node.pipe)
+        stations.append(EstacaoVirtual(ether, sample=sample, period=periodo, addr_tx=node.rx_address,
+                                       addr_rx=node.tx_address, name=f"bp{node.node_id}"))
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        central.setup()
+        central.start()
+        t0 = time.perf_counter()
+        for k, station in enumerate(stations):
+            station.start()
+            time.sleep(periodo / max(1, estacoes))  # Defasagem entre estações
+        time.sleep(duracao)
+        for station in stations:
+            station.running = False
+        for station in stations:
+            station.join(timeout=2)
+        elapsed = time.perf_counter() - t0
+        central.stop()
+
+    por_no = central.stats()
+    for s, station in zip(por_no, stations):
+        s["janelas_perdidas_estacao"] = station.missed
+    amostras = sum(s["amostras"] for s in por_no)
+    resumo = {
+        "estacoes": estacoes,
+        "perda": perda,
+        "duracao_s": elapsed,
+        "amostras_s": amostras / elapsed if elapsed else 0.0,
+        "ack": sum(s["ack"] for s in por_no),
+        "perdas": sum(s["perdas"] for s in por_no),
+    }
+    return resumo, por_no
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--estacoes", type=int, default=6, help="número de estações (1 a 6)")
+    parser.add_argument("--duracao", type=float, default=10.0, help="duração do teste (s)")
+    parser.add_argument("--perda", type=float, default=0.0, help="probabilidade de perda por pacote")
+    parser.add_argument("--latencia", type=float, default=0.0, help="latência extra por tentativa (s)")
+    parser.add_argument("--periodo", type=float, default=0.5, help="intervalo das estações entre ciclos (s)")
+    args = parser.parse_args()
+
+    resumo, por_no = run(args.estacoes, args.duracao, args.perda, args.latencia, args.periodo)
+    print(f"Estações: {resumo['estacoes']} | perda={resumo['perda']:.0%} | {resumo['amostras_s']:.1f} amostras/s "
+          f"em {resumo['duracao_s']:.1f} s | ACK {resumo['ack']} | perdas {resumo['perdas']}")
+    for s in por_no:
+        print(f"  nó {s['no']} (pipe {s['pipe']}): {s['amostras']} amostras | ACK {s['ack']} | "
+              f"perda {s['taxa_perda']:.1%} | estação sem máscara {s['janelas_perdidas_estacao']} | "
+              f"latência p50={s['latencia_ms_p50']} ms p99={s['latencia_ms_p99']} ms")
@@ -0,0 +1,96 @@
+"""
+Benchmark de inicialização: controlador (daemon) × painel
+---------------------------------------------------------
+- Sobe cada processo com o rádio virtual e mede o tempo até a linha de pronto
+  ("Controlador pronto" / "Painel exibido") e a memória residente (VmRSS)
+- Painel em modo local (dono do rádio) e em modo cliente do controlador
+  (Qt offscreen)
+- Mata o painel cliente com SIGKILL e confere que o controlador continua
+  processando amostras da Black Pill virtual
+
+Uso: python bench_inicio.py --espera 2
+"""
+
+import argparse, os, signal, subprocess, sys, tempfile, threading, time
+
+os.environ.setdefault("AERACAO_RADIO", "virtual")
+
+import controlador
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+
+
+def rss_mb(pid):
+    """Memória residente do processo (MB), lida de /proc."""
+    with open(f"/proc/{pid}/status") as f:
+        for linha in f:
+            if linha.startswith("VmRSS:"):
+                return int(linha.split()[1]) / 1024
+    return None
+
+
+def iniciar(script, marcador, env, *args, timeout=30.0):
+    """Sobe `script` e espera a linha com `marcador`; retorna (processo, segundos)."""
+    t0 = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, os.path.join(AQUI, script), *args], env=env, cwd=AQUI,
+                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    fim = t0 + timeout
+    for linha in proc.stdout:
+        if marcador in linha:
+            elapsed = time.perf_counter() - t0
+            # Continua drenando a saída para o processo não travar no pipe
+            threading.Thread(target=proc.stdout.read, daemon=True).start()
+            return proc, elapsed
+        if time.perf_counter() > fim:
+            break
+    proc.kill()
+    raise RuntimeError(f"{script} não imprimiu {marcador!r}")
+
+
+def run(espera=2.0):
+    """Executa o benchmark e retorna um dicionário com os resultados."""
+    with tempfile.TemporaryDirectory() as tmp:
+        socket_path = os.path.join(tmp, "controle.sock")
+        env = dict(os.environ, AERACAO_RADIO="virtual", QT_QPA_PLATFORM="offscreen", AERACAO_SOCKET=socket_path)
+        r = {}
+
+        gui, r["painel_local_s"] = iniciar("programa.py", "Painel exibido", env, "--local")
+        time.sleep(espera)
+        r["painel_local_rss_mb"] = rss_mb(gui.pid)
+        gui.terminate()
+        gui.wait()
+
+        daemon, r["controlador_s"] = iniciar("controlador.py", "Controlador pronto", env, "--estacao-virtual")
+        try:
+            gui, r["painel_cliente_s"] = iniciar("programa.py", "Painel exibido", env)
+            time.sleep(espera)
+            r["controlador_rss_mb"] = rss_mb(daemon.pid)
+            r["painel_cliente_rss_mb"] = rss_mb(gui.pid)
+
+            # Queda do painel: o controlador segue recebendo e decidindo
+            gui.send_signal(signal.SIGKILL)
+            gui.wait()
+            amostras = []
+            cliente = controlador.ClienteControle(socket_path, on_message=lambda m: amostras.append(m))
+            r["controlador_vivo"] = cliente.connect() is not None
+            cliente.start()
+            time.sleep(max(espera, 2.5))  # A estação virtual envia uma amostra por segundo
+            cliente.stop()
+            r["amostras_apos_queda"] = sum(1 for m in amostras if m["tipo"] == "amostra")
+        finally:
+            daemon.terminate()
+            daemon.wait()
+    return r
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--espera", type=float, default=2.0, help="tempo até medir a memória (s)")
+    args = parser.parse_args()
+
+    r = run(args.espera)
+    print(f"Controlador: pronto em {r['controlador_s']:.2f} s | RSS {r['controlador_rss_mb']:.1f} MB")
+    print(f"Painel local: exibido em {r['painel_local_s']:.2f} s | RSS {r['painel_local_rss_mb']:.1f} MB")
+    print(f"Painel cliente: exibido em {r['painel_cliente_s']:.2f} s | RSS {r['painel_cliente_rss_mb']:.1f} MB")
+    print(f"Após SIGKILL no painel: controlador respondendo={r['controlador_vivo']} | "
+          f"{r['amostras_apos_queda']} amostras processadas")
@@ -0,0 +1,60 @@
+"""
+Benchmark do motor de máscaras
+------------------------------
+- Compara comunicacao.calculate_mask() em laço Python com mascara.calculate_masks()
+  vetorizado, para um lote de viveiros com N aeradores cada
+- Confere que as duas implementações geram exatamente as mesmas máscaras
+
+Uso: python bench_mascara.py --viveiros 10000 --aeradores 16
+"""
+
+import argparse, os, time
+import numpy as np
+
+os.environ.setdefault("AERACAO_RADIO", "virtual")
+
+import comunicacao
+import mascara
+
+
+def run(viveiros=10000, aeradores=16, repeticoes=20, seed=1):
+    """Executa o benchmark e retorna um dicionário com os resultados."""
+    rng = np.random.default_rng(seed)
+    # Leituras com 3 casas decimais para exercitar o arredondamento
+    o2 = np.round(rng.uniform(0.0, 10.0, viveiros), 3)
+    thresholds = np.round(rng.uniform(2.0, 8.0, (viveiros, aeradores)), 2)
+    manual = rng.integers(0, 1 << min(aeradores, 62), viveiros, dtype=np.int64)
+    manual_bytes = mascara.ints_to_masks(manual, aeradores)
+
+    t0 = time.perf_counter()
+    esperado = [comunicacao.calculate_mask(float(o2[p]), thresholds[p].tolist(), int(manual[p]))[0]
+                for p in range(viveiros)]
+    loop_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for _ in range(repeticoes):
+        final, _ = mascara.calculate_masks(o2, thresholds, manual_bytes)
+    vec_s = (time.perf_counter() - t0) / repeticoes
+
+    iguais = mascara.masks_to_ints(final) == esperado
+    return {
+        "viveiros": viveiros,
+        "aeradores": aeradores,
+        "laco_ms": loop_s * 1000,
+        "vetorizado_ms": vec_s * 1000,
+        "aceleracao": loop_s / vec_s,
+        "iguais": iguais,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--viveiros", type=int, default=10000)
+    parser.add_argument("--aeradores", type=int, default=16)
+    parser.add_argument("--repeticoes", type=int, default=20)
+    args = parser.parse_args()
+
+    r = run(args.viveiros, args.aeradores, args.repeticoes)
+    print(f"{r['viveiros']} viveiros × {r['aeradores']} aeradores")
+    print(f"Laço calculate_mask(): {r['laco_ms']:.1f} ms | calculate_masks(): {r['vetorizado_ms']:.2f} ms "
+          f"({r['aceleracao']:.0f}×) | resultados iguais: {r['iguais']}")
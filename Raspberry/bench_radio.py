@@ -0,0 +1,151 @@
+"""
+Benchmark do enlace de rádio contra o nRF24 virtual
+----------------------------------------------------
+- Executa o caminho real get_data() → calculate_mask() → send_mask()
+  de comunicacao.py sobre um VirtualRF24
+- Uma Black Pill virtual envia amostras e espera a máscara como o master.ino
+- Mede pacotes/s e a latência RX→ACK da máscara (ida e volta na estação)
+- Compara o envio direto (send_mask) com o MaskTransmitter em tempo de ar e de lock
+- Compara o quadro legado "<ff" com o versionado, com várias amostras por quadro
+
+Uso: python bench_radio.py --amostras 500 --perda 0.1 --latencia 0.002
+"""
+
+import argparse, contextlib, io, os, statistics, threading, time
+
+os.environ.setdefault("AERACAO_RADIO", "virtual")
+
+import comunicacao
+import recepcao
+import transmissao
+import transporte
+from estacao_virtual import EstacaoVirtual
+
+
+def _percentil(valores, p):
+    if not valores:
+        return float("nan")
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(p / 100 * len(ordenados)))]
+
+
+def run(amostras=500, perda=0.0, latencia=0.0, periodo=0.0, poll=0.001, seed=1, irq=False,
+        agendador=False, janela=1.0, versionado=False, lote=1):
+    """Executa o benchmark e retorna um dicionário com os resultados."""
+    ether = transporte.VirtualEther(loss=perda, latency=latencia, seed=seed)
+    radio = transporte.VirtualRF24(ether, name="rpi")
+    comunicacao.use_radio(radio)
+    transmitter = transmissao.MaskTransmitter()
+    lock_time = 0.0
+
+    def send(mask):
+        nonlocal lock_time
+        if agendador:
+            transmitter.submit(mask)
+            return
+        t0 = time.perf_counter()
+        comunicacao.send_mask(mask)
+        lock_time += time.perf_counter() - t0
+    estacao = EstacaoVirtual(ether, sample=lambda n: (4.0 + (n // 50 % 2) * 2.0, 25.0),
+                             period=periodo, rx_timeout=janela, count=amostras,
+                             versioned=versionado or lote > 1, batch=lote)
+
+    rodando = True
+    recebidas = 0
+
+    def on_sample(ox, temp):
+        nonlocal recebidas
+        recebidas += 1
+
+    def on_batch(samples):
+        # Só a amostra mais recente do despertar decide a máscara
+        mask, _ = comunicacao.calculate_mask(samples[-1][0], [5.0, 5.0, 5.0, 5.0])
+        send(mask)
+
+    engine = recepcao.ReceiveEngine(on_sample, on_batch=on_batch)
+
+    def pi_loop():
+        nonlocal recebidas
+        if irq:
+            engine.run()
+            return
+        while rodando:
+            data = comunicacao.get_data()
+            if data:
+                recebidas += 1
+                mask, _ = comunicacao.calculate_mask(data[0], [5.0, 5.0, 5.0, 5.0])
+                send(mask)
+            else:
+                time.sleep(poll)
+
+    # send_mask() imprime cada envio; silencia para não medir o terminal
+    with contextlib.redirect_stdout(io.StringIO()):
+        comunicacao.setup()
+        if agendador:
+            transmitter.start()
+        pi = threading.Thread(target=pi_loop, daemon=True)
+        pi.start()
+        t0 = time.perf_counter()
+        estacao.start()
+        estacao.join()
+        elapsed = time.perf_counter() - t0
+        rodando = False
+        engine.stop()
+        pi.join(timeout=1)
+        transmitter.stop()
+        if agendador:
+            lock_time = transmitter.radio_time
+
+    rtts_ms = [r * 1000 for r in estacao.rtts]
+    return {
+        "recepcao": "irq" if irq else f"polling {poll * 1000:g} ms",
+        "tx": "agendador" if agendador else "direto",
+        "quadro": f"versionado, {lote} amostra(s)" if estacao.versioned else "legado",
+        "amostras": amostras,
+        "perda": perda,
+        "latencia_s": latencia,
+        "duracao_s": elapsed,
+        "pacotes_s": estacao.sent / elapsed if elapsed else 0.0,
+        "amostras_s": recebidas / elapsed if elapsed else 0.0,
+        "recebidas_pi": recebidas,
+        "quadros_estacao": estacao.sent,
+        "estacao_tempo_ar_s": estacao.radio.airtime_s,
+        "sequencia": comunicacao.sequence_tracker.stats(),
+        "mascaras_ack": estacao.masks,
+        "mascaras_perdidas": estacao.missed,
+        "rtt_ms_p50": _percentil(rtts_ms, 50),
+        "rtt_ms_p95": _percentil(rtts_ms, 95),
+        "rtt_ms_max": max(rtts_ms) if rtts_ms else float("nan"),
+        "rtt_ms_media": statistics.fmean(rtts_ms) if rtts_ms else float("nan"),
+        "tx_escritas": radio.tx_packets,
+        "tx_tempo_ar_s": radio.airtime_s,
+        "tx_lock_s": lock_time,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--amostras", type=int, default=500, help="amostras enviadas pela estação")
+    parser.add_argument("--perda", type=float, default=0.0, help="probabilidade de perda por pacote")
+    parser.add_argument("--latencia", type=float, default=0.0, help="latência extra por tentativa (s)")
+    parser.add_argument("--periodo", type=float, default=0.0, help="intervalo da estação entre ciclos (s)")
+    parser.add_argument("--janela", type=float, default=1.0, help="janela de recepção da máscara na estação (s)")
+    parser.add_argument("--poll", type=float, default=0.001, help="intervalo de polling do get_data() (s)")
+    parser.add_argument("--irq", action="store_true", help="recebe pelo ReceiveEngine (IRQ) em vez de polling")
+    parser.add_argument("--agendador", action="store_true", help="envia pelo MaskTransmitter em vez de send_mask()")
+    parser.add_argument("--versionado", action="store_true", help="estação envia quadros versionados")
+    parser.add_argument("--lote", type=int, default=1, help="amostras por quadro (implica --versionado)")
+    args = parser.parse_args()
+
+    r = run(args.amostras, args.perda, args.latencia, args.periodo, args.poll, irq=args.irq,
+            agendador=args.agendador, janela=args.janela, versionado=args.versionado, lote=args.lote)
+    print(f"Amostras: {r['amostras']} | perda={r['perda']:.0%} | latência={r['latencia_s'] * 1000:.1f} ms "
+          f"| recepção: {r['recepcao']} | TX: {r['tx']} | quadro: {r['quadro']}")
+    print(f"Throughput: {r['pacotes_s']:.1f} pacotes/s, {r['amostras_s']:.1f} amostras/s em {r['duracao_s']:.2f} s")
+    print(f"Estação: {r['quadros_estacao']} quadros | tempo de ar {r['estacao_tempo_ar_s'] * 1000:.1f} ms | "
+          f"sequência: {r['sequencia']}")
+    print(f"Máscaras com ACK: {r['mascaras_ack']} | sem máscara na janela: {r['mascaras_perdidas']}")
+    print(f"RTT RX→máscara: p50={r['rtt_ms_p50']:.2f} ms | p95={r['rtt_ms_p95']:.2f} ms | "
+          f"máx={r['rtt_ms_max']:.2f} ms")
+    print(f"TX: {r['tx_escritas']} escritas | tempo de ar {r['tx_tempo_ar_s'] * 1000:.1f} ms "
+          f"| radio_lock ocupado {r['tx_lock_s'] * 1000:.1f} ms")
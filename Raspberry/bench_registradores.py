@@ -0,0 +1,75 @@
+"""
+Benchmark do mapa de registradores DO71/DO72
+--------------------------------------------
+- Ida e volta (floats → registradores → bytes do barramento → floats) de um
+  snapshot de 3000 registradores (1500 floats)
+- Compara a conversão valor a valor (como o float_to_regs() antigo) com
+  mapa_do71.Codec.encode_array()/decode_array() e confere os resultados
+
+Uso: python bench_registradores.py --registradores 3000 --ordem CDAB
+"""
+
+import argparse, struct, time
+import numpy as np
+
+import mapa_do71
+
+
+def _por_valor(valores):
+    """Conversão antiga: um struct.pack/unpack por valor e por registrador."""
+    regs = []
+    for v in valores:
+        regs.extend(struct.unpack("<HH", struct.pack("<f", v)))
+    wire = b"".join(struct.pack(">H", r) for r in regs)
+    regs = [struct.unpack(">H", wire[i:i + 2])[0] for i in range(0, len(wire), 2)]
+    return [struct.unpack("<f", struct.pack("<HH", regs[i], regs[i + 1]))[0] for i in range(0, len(regs), 2)]
+
+
+def run(registradores=3000, ordem=mapa_do71.ORDEM_PADRAO, repeticoes=50, seed=1):
+    """Executa o benchmark e retorna um dicionário com os resultados."""
+    codec = mapa_do71.Codec(ordem)
+    valores = np.random.default_rng(seed).uniform(0.0, 50.0, registradores // 2).astype(np.float32)
+    lista = valores.tolist()
+
+    t0 = time.perf_counter()
+    antigo = _por_valor(lista)
+    loop_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for _ in range(repeticoes):
+        regs = codec.encode_array("float32", valores)
+        wire = mapa_do71.regs_to_bytes(regs)
+        novo = codec.decode_array("float32", mapa_do71.bytes_to_regs(wire))
+    bloco_s = (time.perf_counter() - t0) / repeticoes
+
+    t0 = time.perf_counter()
+    for _ in range(repeticoes):
+        snapshot = codec.decode_bloco(codec.encode_bloco({"o2": 7.5, "temperatura": 25.0}))
+    mapa_s = (time.perf_counter() - t0) / repeticoes
+
+    iguais = bool((novo == valores).all())
+    if ordem == "CDAB":
+        iguais = iguais and antigo == novo.tolist()
+    return {
+        "registradores": registradores,
+        "ordem": ordem,
+        "por_valor_ms": loop_s * 1000,
+        "bloco_ms": bloco_s * 1000,
+        "aceleracao": loop_s / bloco_s,
+        "snapshot_mapa_ms": mapa_s * 1000,
+        "iguais": iguais and snapshot["o2"] == 7.5,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--registradores", type=int, default=3000)
+    parser.add_argument("--ordem", default=mapa_do71.ORDEM_PADRAO, choices=sorted(mapa_do71.ORDENS))
+    parser.add_argument("--repeticoes", type=int, default=50)
+    args = parser.parse_args()
+
+    r = run(args.registradores, args.ordem, args.repeticoes)
+    print(f"{r['registradores']} registradores ({r['registradores'] // 2} floats, {r['ordem']}) ida e volta")
+    print(f"Valor a valor: {r['por_valor_ms']:.2f} ms | bloco: {r['bloco_ms']:.3f} ms "
+          f"({r['aceleracao']:.0f}×) | bloco do simulador pelo mapa: {r['snapshot_mapa_ms']:.3f} ms "
+          f"| resultados iguais: {r['iguais']}")
@@ -0,0 +1,315 @@
+"""
+Suíte de benchmarks dos caminhos quentes do controle
+----------------------------------------------------
+- comunicacao.calculate_mask() com e sem o condicionamento do O2, decodificação
+  do payload (struct e quadro versionado), save_config()/load_config() e a
+  gravação em disco
+- MainWindow.update_data() e render() com Qt offscreen, rádio virtual e
+  transmissor falso (sempre ACK)
+- Conversões float/registradores e atendimento de requisições do simulador
+  yokogawa_do71 (pymodbus e yokogawa_servidor)
+- Resultado em JSON (µs por operação, melhor de várias repetições); --comparar
+  falha (código 1) se algum caso ficou mais lento que a referência além da
+  tolerância (e de --delta-min µs, para os casos de menos de 1 µs não oscilarem
+  entre execuções) ou se algum caso da referência não existe mais
+
+Uso:
+    python bench_suite.py --saida referencia.json
+    python bench_suite.py --comparar referencia.json --tolerancia 0.5
+"""
+
+import argparse, contextlib, io, json, os, platform, struct, subprocess, sys, tempfile, time, timeit
+
+os.environ.setdefault("AERACAO_RADIO", "virtual")
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import comunicacao
+import configuracao
+
+RAIZ = os.path.dirname(comunicacao.BASE_DIR)
+
+
+# ==================== CASOS ====================
+# Cada preparo retorna (operação sem argumentos, limpeza ou None)
+
+def _calculate_mask():
+    thresholds = [5.0, 4.5, 4.0, 3.5]
+    return lambda: comunicacao.calculate_mask(4.237, thresholds, 0b0001), None
+
+
+def _condicionamento():
+    import condicionamento
+    thresholds = [5.0, 4.5, 4.0, 3.5]
+    c = condicionamento.Condicionador("pico:1.5,mediana:5,ema:0.3,histerese:0.2")
+    return lambda: c.calcular(4.237, thresholds, 0b0001), None
+
+
+def _struct_ff():
+    payload = comunicacao.encode_legacy(6.5, 27.0) + bytes(24)
+    fmt = struct.Struct(comunicacao.payload_format)
+    return lambda: fmt.unpack_from(payload), None
+
+
+def _decode_legado():
+    payload = comunicacao.encode_legacy(6.5, 27.0) + bytes(24)
+    return lambda: comunicacao.decode_frame(payload), None
+
+
+def _decode_versionado():
+    payload = comunicacao.encode_frame([(6.5 + i / 10, 27.0) for i in range(5)], node=1, seq=7)
+    return lambda: comunicacao.decode_frame(payload), None
+
+
+def _config(tmp):
+    store = configuracao.ConfigStore(os.path.join(tmp, "config_oxigenio.json"), quiet=3600)
+    anterior = comunicacao.config_store
+    comunicacao.config_store = store
+    thresholds = [5.0, 4.5, 4.0, 3.5]
+
+    def op():
+        comunicacao.save_config(thresholds, 0b0101)
+        comunicacao.load_config()
+
+    def limpeza():
+        store.flush()
+        comunicacao.config_store = anterior
+    return op, limpeza
+
+
+def _config_gravacao(tmp):
+    store = configuracao.ConfigStore(os.path.join(tmp, "config_gravacao.json"), quiet=3600)
+    estado = [5.0]
+
+    def op():
+        estado[0] += 0.01
+        store.update([estado[0], 5.0, 5.0, 5.0], 0)
+        store.flush()  # Gravação atômica com fsync
+    return op, None
+
+
+class _Janela:
+    """MainWindow offscreen com rádio virtual, arquivos temporários e transmissor falso."""
+
+    def __init__(self, tmp):
+        from PySide6.QtWidgets import QApplication
+        import programa
+        import transporte
+        self.app = QApplication.instance() or QApplication([])
+        comunicacao.use_radio(transporte.VirtualRF24(transporte.VirtualEther(), name="rpi"))
+        self._arquivos = comunicacao.config_store, comunicacao.TELEMETRY_FILE
+        comunicacao.config_store = configuracao.ConfigStore(os.path.join(tmp, "config_janela.json"), quiet=3600)
+        comunicacao.TELEMETRY_FILE = os.path.join(tmp, "telemetria.bin")
+        self.window = programa.MainWindow()
+        self.window.transmitter.send = lambda mask: True
+        self.leituras = [3.0, 7.0]  # Alterna a máscara e o status dos aeradores
+        self.i = 0
+
+    def update_data(self):
+        self.i += 1
+        self.window.update_data(self.leituras[self.i & 1], 27.0)
+
+    def render(self):
+        self.i += 1
+        self.window.update_data(self.leituras[self.i & 1], 27.0)
+        self.window.render()
+
+    def close(self):
+        self.window.close()
+        self.app.processEvents()
+        comunicacao.config_store, comunicacao.TELEMETRY_FILE = self._arquivos
+
+
+_janela = None
+
+
+def _janela_compartilhada(tmp):
+    """Uma única janela para os casos de interface, fechada no fim do run()."""
+    global _janela
+    if _janela is None:
+        _janela = _Janela(tmp)
+    return _janela
+
+
+def _update_data(tmp):
+    return _janela_compartilhada(tmp).update_data, None
+
+
+def _render(tmp):
+    return _janela_compartilhada(tmp).render, None
+
+
+def _do71():
+    if RAIZ not in sys.path:
+        sys.path.insert(0, RAIZ)
+    import yokogawa_do71
+    return yokogawa_do71
+
+
+def _do71_float_to_regs():
+    do71 = _do71()
+    return lambda: do71.float_to_regs(6.543), None
+
+
+def _do71_regs_to_float():
+    do71 = _do71()
+    regs = do71.float_to_regs(6.543)
+    return lambda: do71.regs_to_float(*regs), None
+
+
+def _do71_atualizar():
+    do71 = _do71()
+    anterior = do71.context
+    do71.context = do71.criar_contexto()
+
+    def limpeza():
+        do71.context = anterior
+    return lambda: do71.atualizar_registradores(6.5, 27.0), limpeza
+
+
+def _do71_pymodbus():
+    from pymodbus.register_read_message import ReadHoldingRegistersRequest
+    import mapa_do71
+    slave = _do71().criar_contexto()[1]
+    request = ReadHoldingRegistersRequest(mapa_do71.MAPA["o2"].endereco, 2)
+    return lambda: request.execute(slave), None
+
+
+def _do71_rtu():
+    import mapa_do71
+    do71 = _do71()
+    import yokogawa_servidor
+    server = yokogawa_servidor.RtuServer(do71.criar_contexto([1]), fd=-1)
+    server.write = lambda frame: None
+    frame = yokogawa_servidor.with_crc(bytes((1, 3)) + struct.pack(">HH", mapa_do71.MAPA["o2"].endereco, 2))
+    return lambda: server._frame(frame), None
+
+
+# (nome, preparo, usa diretório temporário, máximo de operações por repetição)
+# Os casos com Qt têm número fixo de operações: render() custa centenas de µs e reduz
+# todas as amostras da coluna atual do gráfico; como cada update_data() acrescenta uma
+# amostra, dobrar as operações até tempo_min mediria uma coluna cada vez maior
+CASOS = (
+    ("calculate_mask", _calculate_mask, False, None),
+    ("calculate_mask_condicionado", _condicionamento, False, None),
+    ("payload_struct_ff", _struct_ff, False, None),
+    ("payload_decode_legado", _decode_legado, False, None),
+    ("payload_decode_versionado", _decode_versionado, False, None),
+    ("config_save_load", _config, True, None),
+    ("config_gravacao_disco", _config_gravacao, True, None),
+    ("ui_update_data", _update_data, True, 10),
+    ("ui_update_render", _render, True, 10),
+    ("do71_float_to_regs", _do71_float_to_regs, False, None),
+    ("do71_regs_to_float", _do71_regs_to_float, False, None),
+    ("do71_atualizar_registradores", _do71_atualizar, False, None),
+    ("do71_requisicao_pymodbus", _do71_pymodbus, False, None),
+    ("do71_requisicao_rtu", _do71_rtu, False, None),
+)
+
+
+# ==================== EXECUÇÃO ====================
+def medir(op, repeticoes=5, tempo_min=0.2, maximo=None):
+    """Melhor tempo por operação (s) entre as repetições; cada uma dura ao menos tempo_min
+    (ou executa `maximo` operações)."""
+    timer = timeit.Timer(op)
+    numero = maximo or 1
+    while not maximo and timer.timeit(numero) < tempo_min:
+        numero *= 2
+    return min(timer.repeat(repeticoes, numero)) / numero, numero
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run(filtro=None, repeticoes=5, tempo_min=0.2):
+    """Executa os casos (opcionalmente só os que contêm `filtro`) e retorna o dicionário de resultados."""
+    global _janela
+    casos = {}
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        try:
+            for nome, preparo, usa_tmp, maximo in CASOS:
+                if filtro and filtro not in nome:
+                    continue
+                op, limpeza = preparo(tmp) if usa_tmp else preparo()
+                try:
+                    op()  # Aquecimento (imports, caches)
+                    por_op, numero = medir(op, repeticoes, tempo_min, maximo)
+                finally:
+                    if limpeza is not None:
+                        limpeza()
+                casos[nome] = {"us_op": round(por_op * 1e6, 3), "ops_s": round(1 / por_op, 1), "numero": numero}
+        finally:
+            if _janela is not None:
+                _janela.close()
+                _janela = None
+    return {
+        "commit": _commit(),
+        "data": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "maquina": f"{platform.system()} {platform.machine()}",
+        "filtro": filtro,
+        "casos": casos,
+    }
+
+
+def comparar(atual, referencia, tolerancia=0.5, delta_min=1.0):
+    """Lista (caso, µs ref., µs atual, variação) dos casos que ficaram mais lentos que ref. × (1 + tolerância)
+    e também mais de `delta_min` µs mais lentos.
+
+    Caso da referência que não rodou (renomeado ou removido) entra com µs atual e variação None;
+    os deixados de fora por --filtro não contam."""
+    regressoes = []
+    filtro = atual.get("filtro")
+    for nome, ref in referencia["casos"].items():
+        caso = atual["casos"].get(nome)
+        if caso is None:
+            if not filtro or filtro in nome:
+                regressoes.append((nome, ref["us_op"], None, None))
+            continue
+        variacao = caso["us_op"] / ref["us_op"] - 1
+        if variacao > tolerancia and caso["us_op"] - ref["us_op"] > delta_min:
+            regressoes.append((nome, ref["us_op"], caso["us_op"], variacao))
+    return regressoes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--saida", help="grava o resultado neste JSON")
+    parser.add_argument("--comparar", help="JSON de referência (gerado com --saida em outro commit)")
+    parser.add_argument("--tolerancia", type=float, default=0.5, help="piora máxima aceita (0.5 = 50%%)")
+    parser.add_argument("--delta-min", type=float, default=1.0,
+                        help="piora mínima em µs/op para contar como regressão")
+    parser.add_argument("--filtro", help="executa só os casos cujo nome contém este texto")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--tempo-min", type=float, default=0.2, help="duração mínima de cada repetição (s)")
+    args = parser.parse_args()
+
+    r = run(args.filtro, args.repeticoes, args.tempo_min)
+    referencia = None
+    if args.comparar:
+        with open(args.comparar) as f:
+            referencia = json.load(f)
+
+    for nome, caso in r["casos"].items():
+        linha = f"{nome:32s} {caso['us_op']:12.3f} µs/op"
+        if referencia and nome in referencia["casos"]:
+            linha += f"  ({caso['us_op'] / referencia['casos'][nome]['us_op'] - 1:+.0%})"
+        print(linha)
+    if args.saida:
+        with open(args.saida, "w") as f:
+            json.dump(r, f, indent=2)
+    if referencia:
+        regressoes = comparar(r, referencia, args.tolerancia, args.delta_min)
+        for nome, ref, atual, variacao in regressoes:
+            if atual is None:
+                print(f"AUSENTE {nome}: caso da referência ({ref:.3f} µs/op) não foi executado")
+            else:
+                print(f"REGRESSÃO {nome}: {ref:.3f} → {atual:.3f} µs/op ({variacao:+.0%})")
+        if regressoes:
+            sys.exit(1)
+        print(f"Nenhum caso piorou mais que {args.tolerancia:.0%} (e {args.delta_min:g} µs/op) "
+              f"em relação a {referencia.get('commit')}")
@@ -0,0 +1,350 @@
+"""
+Gravação e reprodução do tráfego de rádio
+-----------------------------------------
+- AERACAO_CAPTURA=arquivo.cap grava, com tempo monotônico, cada payload
+  recebido (e o pipe), cada máscara transmitida com o resultado (ACK ou
+  falha), cada troca de endereço de destino e cada configuração carregada ou
+  salva (limiares e máscara manual)
+- Formato: cabeçalho + registros "<dBBH" (t desde o início, tipo, pipe/ACK,
+  tamanho) seguidos do payload; zeros finais do payload estático não são
+  gravados (o rádio sempre entrega 32 bytes)
+- Reprodução: os payloads gravados entram por um rádio virtual no pipeline
+  sem alterações (controlador.Controlador ou programa.MainWindow offscreen), em
+  tempo real ou o mais rápido possível; as escritas do rádio devolvem os ACKs
+  gravados
+- Compara a máscara em vigor após cada recepção com a gravada e mede amostras/s
+
+Uso:
+    AERACAO_CAPTURA=campo.cap python programa.py
+    python captura.py info campo.cap
+    python captura.py reproduzir campo.cap --rapido [--pipeline painel]
+"""
+
+import argparse, os, struct, threading, time
+from collections import deque
+
+MAGIC = b"AERCAP01"
+HEADER = struct.Struct("<8sdd")     # magic, época (time.time()) e time.monotonic() no início
+REGISTRO = struct.Struct("<dBBH")   # t (s desde o início), tipo, pipe ou ACK, tamanho do payload
+RX, TX, DESTINO, CONFIG = 1, 2, 3, 4
+NOMES = {RX: "rx", TX: "tx", DESTINO: "destino", CONFIG: "config"}
+FLUSH_INTERVAL = 1.0
+
+
+def encode_config(thresholds, manual_mask):
+    return struct.pack(f"<Q{len(thresholds)}d", manual_mask, *thresholds)
+
+
+def decode_config(data):
+    manual_mask, = struct.unpack_from("<Q", data)
+    return list(struct.unpack_from(f"<{(len(data) - 8) // 8}d", data, 8)), manual_mask
+
+
+# ==================== GRAVAÇÃO ====================
+class Captura:
+    """Arquivo de captura somente-anexação (seguro entre threads)."""
+
+    def __init__(self, path):
+        self.path = path
+        self.t0 = time.monotonic()
+        self._file = open(path, "wb")
+        self._file.write(HEADER.pack(MAGIC, time.time(), self.t0))
+        self._lock = threading.Lock()
+        self._last_flush = self.t0
+        self.registros = 0
+
+    def registrar(self, tipo, arg, payload=b""):
+        payload = bytes(payload).rstrip(b"\x00") if tipo == RX else bytes(payload)
+        with self._lock:
+            now = time.monotonic()
+            self._file.write(REGISTRO.pack(now - self.t0, tipo, arg, len(payload)) + payload)
+            self.registros += 1
+            if now - self._last_flush >= FLUSH_INTERVAL:
+                self._file.flush()
+                self._last_flush = now
+
+    def config(self, thresholds, manual_mask):
+        self.registrar(CONFIG, 0, encode_config(thresholds, manual_mask))
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+class RadioGravador:
+    """Envolve o rádio (RF24 ou VirtualRF24) gravando recepções e transmissões na captura."""
+
+    def __init__(self, radio, captura):
+        self._radio = radio
+        self.captura = captura
+        self._pipe = 0
+        self._address = None
+
+    def __getattr__(self, name):
+        return getattr(self._radio, name)
+
+    def available_pipe(self):
+        has_data, pipe = self._radio.available_pipe()
+        self._pipe = pipe
+        return has_data, pipe
+
+    def read(self, *args):
+        payload = self._radio.read(*args)
+        self.captura.registrar(RX, self._pipe, payload)
+        return payload
+
+    def openWritingPipe(self, address):
+        self._radio.openWritingPipe(address)
+        if address != self._address:
+            self._address = bytes(address)
+            self.captura.registrar(DESTINO, 0, self._address)
+
+    def write(self, buf):
+        ok = self._radio.write(buf)
+        self.captura.registrar(TX, int(bool(ok)), buf)
+        return ok
+
+
+# ==================== LEITURA ====================
+def ler(path):
+    """Retorna (época do início, [(t, tipo, arg, payload)])."""
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, epoch, _ = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"{path} não é uma captura de rádio")
+    eventos = []
+    pos = HEADER.size
+    while pos + REGISTRO.size <= len(data):
+        t, tipo, arg, size = REGISTRO.unpack_from(data, pos)
+        pos += REGISTRO.size
+        if pos + size > len(data):
+            break  # Registro truncado (queda de energia)
+        eventos.append((t, tipo, arg, data[pos:pos + size]))
+        pos += size
+    return epoch, eventos
+
+
+class Trecho:
+    """Uma recepção e o que foi transmitido até a próxima."""
+
+    def __init__(self, t, pipe, payload, config=None):
+        self.t = t
+        self.pipe = pipe
+        self.payload = payload
+        self.config = config      # (limiares, máscara manual) aplicada antes desta recepção
+        self.tx = []              # [(máscara, ok)]
+
+
+def trechos(eventos):
+    """Agrupa os eventos por recepção; retorna (configuração inicial, [Trecho])."""
+    inicial, config, lista = None, None, []
+    for t, tipo, arg, payload in eventos:
+        if tipo == CONFIG:
+            if not lista:
+                inicial = decode_config(payload)
+            else:
+                config = decode_config(payload)
+        elif tipo == RX:
+            lista.append(Trecho(t, arg, payload, config))
+            config = None
+        elif tipo == TX and lista:
+            lista[-1].tx.append((int.from_bytes(payload, "little"), bool(arg)))
+    return inicial, lista
+
+
+def mascaras_em_vigor(listas_tx, inicial=None):
+    """Máscara em vigor após cada trecho: a última tentada nele ou a anterior."""
+    atual, saida = inicial, []
+    for tx in listas_tx:
+        if tx:
+            atual = tx[-1][0]
+        saida.append(atual)
+    return saida
+
+
+# ==================== REPRODUÇÃO ====================
+def _radio_reproducao():
+    import transporte
+
+    class RadioReproducao(transporte.VirtualRF24):
+        """Rádio virtual alimentado pela captura; write() devolve os ACKs gravados do trecho atual."""
+
+        def __init__(self):
+            super().__init__(transporte.VirtualEther(realtime=False), name="reproducao")
+            self.acks = deque()
+            self.escritas = []    # [(trecho, máscara)]
+            self.trecho = -1
+            self._packet_id = 0
+
+        def injetar(self, pipe, payload):
+            with self.ether.lock:
+                self._packet_id += 1
+                return self._receive(payload.ljust(transporte.MAX_PAYLOAD, b"\x00"), pipe, self._packet_id)
+
+        def write(self, buf):
+            self.escritas.append((self.trecho, int.from_bytes(bytes(buf), "little")))
+            return self.acks.popleft() if self.acks else True
+
+    return RadioReproducao()
+
+
+class _PipelineControlador:
+    def __init__(self, tmp):
+        import controlador
+        self.c = controlador.Controlador(os.path.join(tmp, "controle.sock"), os.path.join(tmp, "telemetria.bin"))
+        self.c.start()
+        self.transmitter = self.c.transmitter
+
+    def config(self, thresholds, manual_mask):
+        self.c.set_config(thresholds, manual_mask)
+
+    def processar_eventos(self):
+        pass
+
+    def close(self):
+        self.c.stop()
+
+
+class _PipelinePainel:
+    def __init__(self, tmp):
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        from PySide6.QtWidgets import QApplication
+        import comunicacao, programa
+        self.app = QApplication.instance() or QApplication([])
+        comunicacao.TELEMETRY_FILE = os.path.join(tmp, "telemetria.bin")
+        self.window = programa.MainWindow()
+        self.transmitter = self.window.transmitter
+
+    def config(self, thresholds, manual_mask):
+        self.window.apply_config(thresholds, manual_mask)
+
+    def processar_eventos(self):
+        self.app.processEvents()
+
+    def close(self):
+        self.window.close()
+
+
+def reproduzir(path, rapido=True, pipeline="controlador", limite=None):
+    """Reproduz a captura no pipeline e retorna um dicionário com a comparação e a vazão."""
+    import tempfile, contextlib, io
+    import comunicacao, configuracao
+
+    _, eventos = ler(path)
+    inicial, lista = trechos(eventos)
+    lista = lista[:limite] if limite else lista
+    # Amostras que o pipeline deve aceitar (mesma regra de duplicados/atrasados/sinalizados da recepção)
+    tracker = comunicacao.SequenceTracker()
+    esperadas = []
+    total = 0
+    for tr in lista:
+        frame = comunicacao.decode_frame(tr.payload.ljust(32, b"\x00"))
+        if tracker.accept(frame, comunicacao._tracker_key(tr.pipe, frame)) and tracker.usable(frame):
+            total += len(frame.samples)
+        esperadas.append(total)
+
+    radio = _radio_reproducao()
+    anterior = comunicacao.radio, comunicacao.config_store, comunicacao.sequence_tracker, comunicacao.TELEMETRY_FILE
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        comunicacao.use_radio(radio)
+        comunicacao.sequence_tracker = comunicacao.SequenceTracker()
+        comunicacao.config_store = configuracao.ConfigStore(os.path.join(tmp, "config.json"), quiet=3600)
+        if inicial is not None:
+            comunicacao.save_config(*inicial)
+        pipe = _PipelinePainel(tmp) if pipeline == "painel" else _PipelineControlador(tmp)
+        atrasos = 0
+        try:
+            t_inicio = time.monotonic()
+            t_base = lista[0].t if lista else 0.0
+            for i, tr in enumerate(lista):
+                if tr.config is not None:
+                    pipe.config(*tr.config)
+                if not rapido:
+                    espera = (tr.t - t_base) - (time.monotonic() - t_inicio)
+                    if espera > 0:
+                        time.sleep(espera)
+                    else:
+                        atrasos += espera < -0.05
+                radio.trecho = i
+                radio.acks = deque(ok for _, ok in tr.tx)
+                while radio.rxFifoFull():
+                    time.sleep(0.0005)
+                radio.injetar(tr.pipe, tr.payload)
+                # Espera o pipeline decidir e transmitir antes do próximo trecho
+                while pipe.transmitter.submitted < esperadas[i]:
+                    pipe.processar_eventos()
+                    time.sleep(0.0002)
+                pipe.transmitter.wait_idle(timeout=5.0)
+                pipe.processar_eventos()
+            elapsed = time.monotonic() - t_inicio
+        finally:
+            pipe.close()
+            comunicacao.use_radio(anterior[0])
+            comunicacao.config_store, comunicacao.sequence_tracker, comunicacao.TELEMETRY_FILE = anterior[1:]
+
+    gravado = mascaras_em_vigor([tr.tx for tr in lista])
+    por_trecho = [[] for _ in lista]
+    for i, mask in radio.escritas:
+        if 0 <= i < len(lista):
+            por_trecho[i].append((mask, True))
+    reproduzido = mascaras_em_vigor(por_trecho)
+    diferencas = [(i, lista[i].t, g, r) for i, (g, r) in enumerate(zip(gravado, reproduzido)) if g != r]
+    return {
+        "pipeline": pipeline,
+        "modo": "rápido" if rapido else "tempo real",
+        "recepcoes": len(lista),
+        "amostras": total,
+        "tx_gravadas": sum(len(tr.tx) for tr in lista),
+        "tx_reproduzidas": len(radio.escritas),
+        "diferencas": len(diferencas),
+        "primeiras_diferencas": diferencas[:10],
+        "duracao_gravada_s": round(lista[-1].t - lista[0].t, 3) if lista else 0.0,
+        "duracao_s": round(elapsed, 3),
+        "amostras_s": round(total / elapsed, 1) if elapsed else 0.0,
+        "atrasos": atrasos,
+    }
+
+
+def info(path):
+    epoch, eventos = ler(path)
+    contagem = {nome: 0 for nome in NOMES.values()}
+    acks = 0
+    for _, tipo, arg, _ in eventos:
+        contagem[NOMES.get(tipo, "?")] += 1
+        acks += tipo == TX and arg
+    return {
+        "inicio": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(epoch)),
+        "duracao_s": round(eventos[-1][0], 3) if eventos else 0.0,
+        "bytes": os.path.getsize(path),
+        **contagem,
+        "ack": acks,
+    }
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("AERACAO_RADIO", "virtual")
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p = sub.add_parser("info", help="resumo da captura")
+    p.add_argument("arquivo")
+    p = sub.add_parser("reproduzir", help="reproduz a captura e compara as máscaras")
+    p.add_argument("arquivo")
+    p.add_argument("--rapido", action="store_true", help="o mais rápido possível (padrão: tempo real)")
+    p.add_argument("--pipeline", choices=("controlador", "painel"), default="controlador")
+    p.add_argument("--limite", type=int, help="reproduz só as primeiras N recepções")
+    args = parser.parse_args()
+
+    if args.comando == "info":
+        for k, v in info(args.arquivo).items():
+            print(f"{k}: {v}")
+    else:
+        r = reproduzir(args.arquivo, args.rapido, args.pipeline, args.limite)
+        print(f"{r['pipeline']}, {r['modo']}: {r['recepcoes']} recepções, {r['amostras']} amostras em "
+              f"{r['duracao_s']} s (gravadas em {r['duracao_gravada_s']} s) = {r['amostras_s']} amostras/s")
+        print(f"TX gravadas: {r['tx_gravadas']} | reproduzidas: {r['tx_reproduzidas']} | "
+              f"máscaras diferentes: {r['diferencas']}")
+        for i, t, gravada, nova in r["primeiras_diferencas"]:
+            print(f"  recepção {i} (t={t:.3f} s): gravada {gravada} → reproduzida {nova}")
+        raise SystemExit(1 if r["diferencas"] else 0)
@@ -1,88 +1,361 @@
-from pyrf24 import RF24, RF24_PA_MAX, RF24_250KBPS, RF24_CRC_16
-import struct, time, json, os, threading
+import struct, time, os, threading, atexit
+from typing import NamedTuple, Optional
+import transporte
+import configuracao
+import enlace
+import metricas
+from transporte import RF24_PA_MAX, RF24_250KBPS, RF24_CRC_16
 
 # ==================== LOCK PARA ACESSO AO RÁDIO ====================
 # Impede que duas threads chamem funções RF24 ao mesmo tempo
 radio_lock = threading.Lock()
+_radio_init_lock = threading.Lock()
 
 # ==================== CONFIGURAÇÃO RF24 ====================
-radio = RF24(25, 0)  # CE=GPIO25, CSN=SPI0-CE0
+# O rádio só é criado em get_radio()/setup(): importar este módulo não toca no
+# hardware (o controlador, o painel cliente e o painel web importam sem rádio)
+radio = None
+# AERACAO_CAPTURA=arquivo grava todo o tráfego do rádio para reprodução (ver captura.py)
+capture = None
 ADDR_RX = b"RPi58"
 ADDR_TX = b"Bp32A"
-payload_format = "<ff"
+payload_format = "<ff"  # Quadro legado (SensorData): oxigênio, temperatura
 payload_size = struct.calcsize(payload_format)
+# GPIO ligado ao pino IRQ do nRF24 (None = sem IRQ, recepção por polling)
+IRQ_PIN = int(os.environ["AERACAO_IRQ_PIN"]) if os.environ.get("AERACAO_IRQ_PIN") else None
+# Canal do enlace (o mesmo do radio.cpp); ver a varredura em enlace.py
+CANAL = int(os.environ.get("AERACAO_CANAL", "100"))
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 CONFIG_FILE = os.path.join(BASE_DIR, "config_oxigenio.json")
+TELEMETRY_FILE = os.path.join(BASE_DIR, "telemetria.bin")
+
+# ==================== FORMATO DO PAYLOAD ====================
+# Quadro legado: "<ff" (8 bytes, resto do payload estático em zero).
+# Quadro versionado (até 32 bytes):
+#   magic (0xA5) | versão | nó | flags | nº de amostras | seq (uint16)
+#   | intervalo entre amostras (ms, uint16) | amostras | CRC-8
+# Amostras em float32 "<ff" (até 2 por quadro) ou, com FLAG_COMPACT, O2 em
+# 0,001 mg/L (uint16) e temperatura em 0,01 °C (int16), até 5 por quadro.
+# calculate_mask() arredonda o O2 a 0,01, então o formato compacto não muda a decisão.
+FRAME_MAGIC = 0xA5
+FRAME_VERSION = 1
+FLAG_SENSOR_ERROR = 0x01  # Última leitura do sensorRead() falhou (valores repetidos)
+FLAG_SENSOR_STALE = 0x02  # Mais de 5 min sem leitura válida (valores zerados)
+FLAG_COMPACT = 0x80       # Amostras no formato compacto
+# Amostras de quadros com estas flags não entram na decisão nem na telemetria:
+# sem amostra nova, a estação cai no próprio modo de segurança após o timeout
+FLAGS_SENSOR = FLAG_SENSOR_ERROR | FLAG_SENSOR_STALE
+FRAME_HEADER = struct.Struct("<BBBBBHH")
+SAMPLE_FLOAT = struct.Struct("<ff")
+SAMPLE_COMPACT = struct.Struct("<Hh")
+LEGACY_FRAME = struct.Struct(payload_format)
+
+class Frame(NamedTuple):
+    version: int        # 0 = quadro legado "<ff"
+    node: Optional[int]
+    seq: Optional[int]
+    flags: int
+    interval_ms: int
+    samples: list       # [(oxigênio, temperatura), ...], a mais recente por último
+
+def _crc8(data):
+    """CRC-8 (polinômio 0x07, valor inicial 0)."""
+    crc = 0
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x07) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+    return crc
+
+_CRC8_TABLE = bytes(_crc8([i]) for i in range(256))
+
+def crc8(data):
+    crc = 0
+    for byte in data:
+        crc = _CRC8_TABLE[crc ^ byte]
+    return crc
+
+def max_samples(compact=True):
+    sample = SAMPLE_COMPACT if compact else SAMPLE_FLOAT
+    return (transporte.MAX_PAYLOAD - FRAME_HEADER.size - 1) // sample.size
+
+def encode_frame(samples, node=0, seq=0, flags=0, interval_ms=0, compact=True):
+    """Monta um quadro versionado com uma ou mais amostras (oxigênio, temperatura)."""
+    if not 1 <= len(samples) <= max_samples(compact):
+        raise ValueError(f"Quadro comporta de 1 a {max_samples(compact)} amostras")
+    flags = (flags | FLAG_COMPACT) if compact else (flags & ~FLAG_COMPACT)
+    parts = [FRAME_HEADER.pack(FRAME_MAGIC, FRAME_VERSION, node, flags, len(samples), seq & 0xFFFF, interval_ms)]
+    if compact:
+        for ox, temp in samples:
+            parts.append(SAMPLE_COMPACT.pack(min(max(round(ox * 1000), 0), 0xFFFF),
+                                             min(max(round(temp * 100), -0x8000), 0x7FFF)))
+    else:
+        parts.extend(SAMPLE_FLOAT.pack(ox, temp) for ox, temp in samples)
+    body = b"".join(parts)
+    return body + bytes((crc8(body),))
+
+def encode_legacy(ox, temp):
+    return LEGACY_FRAME.pack(ox, temp)
+
+def decode_frame(data):
+    """Decodifica um payload: quadro versionado (magic + CRC válidos) ou legado "<ff"."""
+    data = bytes(data)
+    if len(data) > FRAME_HEADER.size and data[0] == FRAME_MAGIC and data[1] == FRAME_VERSION:
+        _, version, node, flags, count, seq, interval = FRAME_HEADER.unpack_from(data)
+        sample = SAMPLE_COMPACT if flags & FLAG_COMPACT else SAMPLE_FLOAT
+        end = FRAME_HEADER.size + count * sample.size
+        # Um quadro legado só passaria aqui com magic, versão e CRC coincidindo por acaso
+        if count and end < len(data) and crc8(data[:end]) == data[end]:
+            values = list(sample.iter_unpack(data[FRAME_HEADER.size:end]))
+            if sample is SAMPLE_COMPACT:
+                values = [(o / 1000, t / 100) for o, t in values]
+            return Frame(version, node, seq, flags, interval, values)
+    ox, temp = LEGACY_FRAME.unpack_from(data)
+    return Frame(0, None, None, 0, 0, [(ox, temp)])
+
+class SequenceTracker:
+    """Detecta duplicados, perdas e quadros fora de ordem por nó (seq de 16 bits).
+
+    Uma estação reiniciada volta a contar do zero: um salto para trás maior que
+    REORDER_WINDOW, RESYNC_FRAMES quadros seguidos para trás ou um salto para a
+    frente maior que MAX_LOST ressincronizam a sequência em vez de descartar
+    quadros (ou contar milhares de perdas)."""
+
+    REORDER_WINDOW = 32  # Quadros atrasados de verdade chegam poucos números atrás
+    RESYNC_FRAMES = 3
+    MAX_LOST = 1024
+
+    def __init__(self):
+        self.last = {}
+        self._backward = {}
+        self.frames = 0
+        self.duplicates = 0
+        self.lost = 0
+        self.out_of_order = 0
+        self.resyncs = 0
+        self.flagged = 0
+
+    def accept(self, frame, key=None):
+        """Retorna False para quadros repetidos ou atrasados (não devem ser usados)."""
+        self.frames += 1
+        if frame.seq is None:
+            return True  # Legado: sem número de sequência
+        key = frame.node if key is None else key
+        last = self.last.get(key)
+        if last is not None:
+            delta = (frame.seq - last) & 0xFFFF
+            if delta == 0:
+                self.duplicates += 1
+                return False
+            if delta >= 0x8000:
+                backward = self._backward.get(key, 0) + 1
+                if 0x10000 - delta <= self.REORDER_WINDOW and backward < self.RESYNC_FRAMES:
+                    self._backward[key] = backward
+                    self.out_of_order += 1
+                    return False
+                self.resyncs += 1
+            elif delta - 1 > self.MAX_LOST:
+                self.resyncs += 1
+            else:
+                self.lost += delta - 1
+        self._backward[key] = 0
+        self.last[key] = frame.seq
+        return True
+
+    def usable(self, frame):
+        """False se a estação sinalizou erro ou leitura velha do sensor (FLAGS_SENSOR)."""
+        if frame.flags & FLAGS_SENSOR:
+            self.flagged += 1
+            return False
+        return True
+
+    def stats(self):
+        return {"quadros": self.frames, "duplicados": self.duplicates,
+                "perdidos": self.lost, "fora_de_ordem": self.out_of_order,
+                "ressincronizacoes": self.resyncs, "sensor_sinalizados": self.flagged}
+
+sequence_tracker = SequenceTracker()
+# Qualidade do enlace por janela e adaptação das retransmissões (ver enlace.py)
+link_monitor = enlace.MonitorEnlace(lost_counter=lambda: sequence_tracker.lost)
 
 # ==================== FUNÇÕES RF24 ====================
-def enter_tx():
+def use_radio(new_radio):
+    """Substitui o rádio usado pelas funções deste módulo (ex.: VirtualRF24)."""
+    global radio
+    with radio_lock:
+        radio = new_radio
+
+def get_radio():
+    """Retorna o rádio, criando-o na primeira chamada.
+
+    Backend escolhido por AERACAO_RADIO: "rf24" (padrão) ou "virtual"."""
+    global radio, capture
+    with _radio_init_lock:
+        if radio is None:
+            new_radio = transporte.create_radio(ce_pin=25, csn_pin=0)  # CE=GPIO25, CSN=SPI0-CE0
+            if os.environ.get("AERACAO_CAPTURA"):
+                import captura
+                capture = captura.Captura(os.environ["AERACAO_CAPTURA"])
+                new_radio = captura.RadioGravador(new_radio, capture)
+                atexit.register(capture.close)
+                # load_config() costuma rodar antes do rádio existir: grava a configuração em vigor
+                config = config_store.load()
+                capture.config(config["thresholds"], config["manual_mask"])
+            radio = new_radio
+    return radio
+
+# Pipes de leitura abertos em enter_rx() (no modo hub, um por estação)
+rx_pipes = {1: ADDR_RX}
+
+def enter_tx(address=None):
     radio.stopListening()
-    radio.openWritingPipe(ADDR_TX)
+    radio.openWritingPipe(address or ADDR_TX)
 
 def enter_rx():
-    radio.openReadingPipe(1, ADDR_RX)
+    for pipe, address in rx_pipes.items():
+        radio.openReadingPipe(pipe, address)
     radio.startListening()
 
+def set_rx_pipes(pipes):
+    """Define os pipes de leitura {pipe: endereço} e volta a escutar."""
+    global rx_pipes
+    with radio_lock:
+        for pipe in rx_pipes:
+            if pipe not in pipes:
+                radio.closeReadingPipe(pipe)
+        rx_pipes = dict(pipes)
+        enter_rx()
+
 def setup():
+    get_radio()
     with radio_lock:
         if not radio.begin():
             raise SystemExit("radio.begin() falhou.")
         radio.setPALevel(RF24_PA_MAX)
         radio.setDataRate(RF24_250KBPS)
-        radio.setChannel(100)
+        radio.setChannel(CANAL)
         radio.setCRCLength(RF24_CRC_16)
         radio.setAutoAck(True)
-        radio.setRetries(15, 15)
+        radio.setRetries(*link_monitor.retries())
+        radio.maskIRQ(True, True, False)  # IRQ apenas para dados recebidos (RX_DR)
         enter_rx()
         print("Inicialização concluída, aguardando dados...")
 
+def _tracker_key(pipe, frame):
+    # Quadros legados são identificados só pelo pipe
+    return pipe if frame.node is None else (pipe, frame.node)
+
+def get_frames():
+    """Esvazia a FIFO e retorna [(pipe, Frame)] em ordem, sem duplicados nem atrasados."""
+    frames = []
+    with radio_lock:
+        while True:
+            has_data, pipe = radio.available_pipe()
+            if not has_data:
+                break
+            frame = decode_frame(radio.read(transporte.MAX_PAYLOAD))
+            accepted = sequence_tracker.accept(frame, _tracker_key(pipe, frame)) and sequence_tracker.usable(frame)
+            if __debug__ and metricas.ATIVO:
+                metricas.marca_rx()
+                (metricas.amostras if accepted else metricas.descartadas).inc(len(frame.samples))
+            if accepted:
+                frames.append((pipe, frame))
+    return frames
+
 def get_data():
-    """Verifica se há dados disponíveis e retorna (oxigênio, temperatura) ou None."""
+    """Verifica se há dados disponíveis e retorna (oxigênio, temperatura) ou None.
+
+    Se o quadro trouxer várias amostras, retorna a mais recente."""
     with radio_lock:
-        if radio.available():
-            data = radio.read(payload_size)
-            ox, temp = struct.unpack(payload_format, data)
-            return ox, temp
+        has_data, pipe = radio.available_pipe()
+        if has_data:
+            frame = decode_frame(radio.read(transporte.MAX_PAYLOAD))
+            accepted = sequence_tracker.accept(frame, _tracker_key(pipe, frame)) and sequence_tracker.usable(frame)
+            if __debug__ and metricas.ATIVO:
+                metricas.marca_rx()
+                (metricas.amostras if accepted else metricas.descartadas).inc(len(frame.samples))
+            if accepted:
+                return frame.samples[-1]
     return None
 
+def get_all_data():
+    """Esvazia a FIFO de recepção e retorna a lista de (oxigênio, temperatura) em ordem."""
+    return [sample for _, frame in get_frames() for sample in frame.samples]
+
+def get_all_data_pipes():
+    """Como get_all_data(), mas retorna (pipe, oxigênio, temperatura) para identificar a estação."""
+    return [(pipe, *sample) for pipe, frame in get_frames() for sample in frame.samples]
+
+def clear_irq():
+    """Limpa as flags de status do rádio, liberando a linha IRQ."""
+    with radio_lock:
+        if hasattr(radio, "clearStatusFlags"):
+            radio.clearStatusFlags()
+        else:
+            radio.whatHappened()
+
+def rx_fifo_full():
+    with radio_lock:
+        return radio.rxFifoFull()
+
+def encode_mask(mask: int):
+    """Máscara em bytes little endian (bit i = aerador i), no mínimo 1 byte.
+
+    A Black Pill lê só o primeiro byte, então máscaras de até 8 aeradores
+    continuam idênticas ao formato antigo."""
+    return mask.to_bytes(max(1, (mask.bit_length() + 7) // 8), "little")
+
+def _write_mask(mask, address=None):
+    """Uma escrita (radio_lock tomado), registrada no monitor do enlace."""
+    carrier = radio.testRPD()  # Portadora no canal enquanto ainda em RX
+    enter_tx(address)
+    ok = radio.write(encode_mask(mask))
+    link_monitor.registrar_tx(radio, ok, radio.getARC(), carrier)
+    enter_rx()
+    return ok
+
 def send_mask(mask: int):
-    """Envia uma máscara de 1 byte para a Black Pill logo após RX, com até 5 tentativas."""
+    """Envia a máscara para a Black Pill logo após RX, com o orçamento de tentativas do enlace."""
+    policy = link_monitor.politica
     with radio_lock:
-        for attempt in range(5):
-            enter_tx()
-            ok = radio.write(bytes([mask & 0xFF]))
-            enter_rx()
+        for attempt in range(policy.tentativas):
+            ok = _write_mask(mask)
             if ok:
                 print(f"TX -> Máscara {bin(mask)} enviada com ACK (tentativa {attempt+1})")
                 return True
-            time.sleep(0.05)
+            time.sleep(policy.backoff)
 
-    print("TX -> Falha ao enviar máscara (sem ACK após 5 tentativas).")
+    print(f"TX -> Falha ao enviar máscara (sem ACK após {policy.tentativas} tentativas).")
     return False
 
+def send_mask_once(mask: int, address=None):
+    """Uma única tentativa de envio da máscara (retransmissões só do hardware).
+
+    Segura o radio_lock apenas durante esta escrita; retorna True se houve ACK.
+    `address` escolhe a estação de destino (padrão ADDR_TX)."""
+    with radio_lock:
+        return _write_mask(mask, address)
+
 # ==================== CONFIGURAÇÃO LOCAL ====================
+# Estado em memória com gravação atômica e adiada (ver configuracao.py)
+config_store = configuracao.ConfigStore(CONFIG_FILE)
+
 def load_config():
     """Carrega limiares e estado dos aeradores."""
-    if os.path.exists(CONFIG_FILE):
-        try:
-            with open(CONFIG_FILE, "r") as f:
-                data = json.load(f)
-                return {
-                    "thresholds": data.get("aeradores", [5.0, 5.0, 5.0, 5.0]),
-                    "manual_mask": data.get("mask", 0)
-                }
-        except Exception as e:
-            print(f"Erro ao carregar {CONFIG_FILE}: {e}")
-    return {"thresholds": [5.0, 5.0, 5.0, 5.0], "manual_mask": 0}
+    config = config_store.load()
+    if capture is not None:
+        capture.config(config["thresholds"], config["manual_mask"])
+    return config
 
 def save_config(thresholds, manual_mask):
-    """Salva limiares e estado dos aeradores."""
-    try:
-        with open(CONFIG_FILE, "w") as f:
-            json.dump({"aeradores": thresholds, "mask": manual_mask}, f, indent=2)
-        print(f"Configuração salva: {thresholds}, máscara {bin(manual_mask)}")
-    except Exception as e:
-        print(f"Erro ao salvar {CONFIG_FILE}: {e}")
+    """Salva limiares e estado dos aeradores (gravação em disco após um período sem alterações)."""
+    config_store.update(thresholds, manual_mask)
+    if capture is not None:
+        capture.config(thresholds, manual_mask)
+
+def flush_config():
+    """Grava imediatamente a configuração pendente."""
+    config_store.flush()
 
 # ==================== LÓGICA DE CONTROLE ====================
 def calculate_mask(o2_value, thresholds, manual_mask=0):
@@ -96,10 +369,18 @@ def calculate_mask(o2_value, thresholds, manual_mask=0):
     return final_mask, auto_mask
 
 if __name__ == "__main__":
+    import recepcao, telemetria
+    historico = telemetria.Telemetria(TELEMETRY_FILE)
+
+    def on_sample(ox, temp):
+        print(f"O2={ox:.2f}, Temp={temp:.2f}")
+        historico.append(time.time(), ox, temp, 0)  # Sem controle: nenhuma máscara aplicada
+
     setup()
-    while True:
-        data = get_data()
-        if data:
-            ox, temp = data
-            print(f"O2={ox:.2f}, Temp={temp:.2f}")
-        time.sleep(0.1)
+    engine = recepcao.ReceiveEngine(on_sample)
+    try:
+        engine.run()
+    except KeyboardInterrupt:
+        print(f"Recepção: {engine.stats()}")
+    finally:
+        historico.close()
@@ -0,0 +1,265 @@
+"""
+Condicionamento do sinal de O2 antes da decisão da máscara
+----------------------------------------------------------
+- Cadeia de filtros por aerador, atualizada a cada amostra em tempo constante:
+    pico:d[:n]   rejeita saltos maiores que d mg/L em relação ao último valor
+                 aceito; depois de n rejeições seguidas (padrão 3) aceita o
+                 novo nível (queda real de O2 não fica presa)
+    mediana:n    mediana móvel das últimas n amostras (janela fixa)
+    ema:a        média móvel exponencial com fator a (0 < a <= 1)
+    histerese:b  o aerador liga com O2 <= limiar, como antes, e só desliga
+                 com O2 > limiar + b
+- Mesma regra de comunicacao.calculate_mask() sobre o valor condicionado (O2
+  arredondado a 2 casas, OR com a máscara manual)
+- Configuração em AERACAO_FILTRO: etapas separadas por vírgula, aeradores por
+  ponto e vírgula (o último vale para os aeradores restantes), ex.:
+    AERACAO_FILTRO="pico:1.5,mediana:5,ema:0.3,histerese:0.2"
+    AERACAO_FILTRO="mediana:5,histerese:0.2;ema:0.5,histerese:0.1"
+  Vazio (padrão) = sem condicionamento, idêntico a calculate_mask(); parâmetro
+  fora da faixa gera ValueError já na criação (o controlador não sobe)
+- Estatísticas: transições de aerador e mudanças de máscara com e sem o
+  condicionamento (cada mudança de máscara é uma transmissão pelo rádio)
+
+Uso:
+    python condicionamento.py --filtro "mediana:5,histerese:0.2" telemetria.bin
+    python condicionamento.py --filtro "pico:1.5,ema:0.3,histerese:0.2" --sintetico 3600
+"""
+
+import argparse, bisect, os
+from collections import deque
+import comunicacao
+
+FILTRO = os.environ.get("AERACAO_FILTRO", "")
+
+
+# ==================== ETAPAS ====================
+class Pico:
+    """Rejeição de picos: repete o último valor aceito diante de um salto isolado."""
+
+    def __init__(self, limite, max_seguidos=3):
+        if not limite > 0:
+            raise ValueError(f"pico: limite {limite} deve ser > 0")
+        if not (max_seguidos >= 0 and float(max_seguidos).is_integer()):
+            raise ValueError(f"pico: rejeições seguidas {max_seguidos} deve ser um inteiro >= 0")
+        self.limite = limite
+        self.max_seguidos = int(max_seguidos)
+        self.ultimo = None
+        self.seguidos = 0
+        self.rejeitados = 0
+
+    def atualizar(self, x):
+        if self.ultimo is not None and abs(x - self.ultimo) > self.limite and self.seguidos < self.max_seguidos:
+            self.seguidos += 1
+            self.rejeitados += 1
+            return self.ultimo
+        self.ultimo = x
+        self.seguidos = 0
+        return x
+
+
+class Mediana:
+    """Mediana móvel sobre uma janela fixa (deque + lista ordenada)."""
+
+    def __init__(self, janela):
+        if not (janela >= 1 and float(janela).is_integer()):
+            raise ValueError(f"mediana: janela {janela} deve ser um inteiro >= 1")
+        self.janela = deque(maxlen=int(janela))
+        self.ordenada = []
+
+    def atualizar(self, x):
+        if len(self.janela) == self.janela.maxlen:
+            del self.ordenada[bisect.bisect_left(self.ordenada, self.janela[0])]
+        self.janela.append(x)
+        bisect.insort(self.ordenada, x)
+        n = len(self.ordenada)
+        meio = n // 2
+        return self.ordenada[meio] if n % 2 else (self.ordenada[meio - 1] + self.ordenada[meio]) / 2
+
+
+class EMA:
+    """Média móvel exponencial."""
+
+    def __init__(self, alfa):
+        if not 0 < alfa <= 1:
+            raise ValueError(f"ema: fator {alfa} fora de (0, 1]")
+        self.alfa = alfa
+        self.valor = None
+
+    def atualizar(self, x):
+        self.valor = x if self.valor is None else self.valor + self.alfa * (x - self.valor)
+        return self.valor
+
+
+ETAPAS = {"pico": Pico, "mediana": Mediana, "ema": EMA}
+
+
+class Cadeia:
+    """Etapas aplicadas em ordem a cada amostra; `histerese` fica à parte (vale na decisão)."""
+
+    def __init__(self, etapas=(), histerese=0.0):
+        if not histerese >= 0:
+            raise ValueError(f"histerese: banda {histerese} deve ser >= 0")
+        self.etapas = list(etapas)
+        self.histerese = histerese
+        self.valor = None
+
+    def atualizar(self, x):
+        if x != x:  # NaN (leitura inválida): não contamina o estado dos filtros
+            return x
+        for etapa in self.etapas:
+            x = etapa.atualizar(x)
+        self.valor = x
+        return x
+
+    @property
+    def rejeitados(self):
+        return sum(getattr(e, "rejeitados", 0) for e in self.etapas)
+
+
+def ler_cadeia(texto):
+    """"pico:1.5,mediana:5,histerese:0.2" → Cadeia."""
+    etapas, histerese = [], 0.0
+    for parte in filter(None, (p.strip() for p in texto.split(","))):
+        nome, *valores = parte.split(":")
+        if nome not in ETAPAS and nome != "histerese":
+            raise ValueError(f"Etapa desconhecida: {nome!r} (use {', '.join([*ETAPAS, 'histerese'])})")
+        try:
+            valores = [float(v) for v in valores]
+        except ValueError:
+            raise ValueError(f"{parte!r}: parâmetro não numérico") from None
+        if nome == "histerese":
+            if len(valores) != 1:
+                raise ValueError(f"{parte!r}: use histerese:banda")
+            histerese = valores[0]
+            continue
+        try:
+            etapas.append(ETAPAS[nome](*valores))
+        except TypeError:
+            raise ValueError(f"{parte!r}: número de parâmetros inválido") from None
+    return Cadeia(etapas, histerese)
+
+
+# ==================== DECISÃO ====================
+class Condicionador:
+    """Substitui comunicacao.calculate_mask() no laço de decisão, com estado por aerador.
+
+    calcular() é chamado só pela thread do rádio."""
+
+    def __init__(self, especificacao=FILTRO):
+        self.especificacoes = [e.strip() for e in especificacao.split(";")] if especificacao.strip() else []
+        for e in self.especificacoes:
+            ler_cadeia(e)  # Valida já na criação
+        self.ativo = bool(self.especificacoes)
+        self.cadeias = []
+        self._auto = self._auto_bruta = None
+        self._final = self._final_bruta = None
+        # Estatísticas
+        self.amostras = 0
+        self.transicoes = 0
+        self.transicoes_brutas = 0
+        self.mudancas = 0
+        self.mudancas_brutas = 0
+
+    def _montar(self, n):
+        # Aeradores com a mesma especificação compartilham a cadeia (filtra uma vez)
+        cadeias = {}
+        self.cadeias = []
+        for i in range(n):
+            e = self.especificacoes[min(i, len(self.especificacoes) - 1)]
+            if e not in cadeias:
+                cadeias[e] = ler_cadeia(e)
+            self.cadeias.append(cadeias[e])
+
+    def calcular(self, o2_value, thresholds, manual_mask=0):
+        """(máscara final, máscara automática), como calculate_mask()."""
+        if not self.ativo:
+            return comunicacao.calculate_mask(o2_value, thresholds, manual_mask)
+        if len(self.cadeias) != len(thresholds):
+            self._montar(len(thresholds))
+            self._auto = None
+        filtrados = {}
+        anterior = self._auto or 0
+        auto_mask = 0
+        for i, (limiar, cadeia) in enumerate(zip(thresholds, self.cadeias)):
+            valor = filtrados.get(id(cadeia))
+            if valor is None:
+                valor = filtrados[id(cadeia)] = round(cadeia.atualizar(o2_value), 2)
+            if valor <= limiar or (anterior >> i & 1 and valor <= limiar + cadeia.histerese):
+                auto_mask |= 1 << i
+        final_mask = auto_mask | manual_mask
+        final_bruta, auto_bruta = comunicacao.calculate_mask(o2_value, thresholds, manual_mask)
+        self._contar(auto_mask, final_mask, auto_bruta, final_bruta)
+        return final_mask, auto_mask
+
+    def _contar(self, auto_mask, final_mask, auto_bruta, final_bruta):
+        self.amostras += 1
+        if self._auto is not None:
+            self.transicoes += bin(self._auto ^ auto_mask).count("1")
+            self.mudancas += final_mask != self._final
+        if self._auto_bruta is not None:
+            self.transicoes_brutas += bin(self._auto_bruta ^ auto_bruta).count("1")
+            self.mudancas_brutas += final_bruta != self._final_bruta
+        self._auto, self._final = auto_mask, final_mask
+        self._auto_bruta, self._final_bruta = auto_bruta, final_bruta
+
+    def stats(self):
+        if not self.ativo:
+            return {"ativo": False}
+        return {
+            "ativo": True,
+            "filtro": ";".join(self.especificacoes),
+            "amostras": self.amostras,
+            "transicoes": self.transicoes,
+            "transicoes_sem_filtro": self.transicoes_brutas,
+            "transicoes_evitadas": self.transicoes_brutas - self.transicoes,
+            "mudancas_mascara": self.mudancas,
+            "mudancas_mascara_sem_filtro": self.mudancas_brutas,
+            "transmissoes_evitadas": self.mudancas_brutas - self.mudancas,
+            "picos_rejeitados": sum(c.rejeitados for c in {id(c): c for c in self.cadeias}.values()),
+        }
+
+
+# ==================== AVALIAÇÃO OFFLINE ====================
+def sintetico(n, seed=1, media=5.0, ruido=0.08, pico=0.01):
+    """O2 oscilando devagar em torno de `media`, com ruído branco e picos isolados."""
+    import math, random
+    rng = random.Random(seed)
+    for k in range(n):
+        x = media + 0.4 * math.sin(2 * math.pi * k / 900) + rng.gauss(0, ruido)
+        if rng.random() < pico:
+            x += rng.choice((-1, 1)) * rng.uniform(2, 5)
+        yield x
+
+
+def avaliar(valores, especificacao, thresholds, manual_mask=0):
+    """Passa a série pelo Condicionador e retorna stats() (transições e transmissões evitadas)."""
+    condicionador = Condicionador(especificacao)
+    for x in valores:
+        condicionador.calcular(float(x), thresholds, manual_mask)
+    return condicionador.stats()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("log", nargs="?", default=comunicacao.TELEMETRY_FILE, help="log de telemetria (.bin)")
+    parser.add_argument("--filtro", default=FILTRO or "pico:1.5,mediana:5,ema:0.3,histerese:0.2",
+                        help="especificação como em AERACAO_FILTRO")
+    parser.add_argument("--limiares", type=lambda s: [float(v) for v in s.split(",")],
+                        help="limiares separados por vírgula (padrão: os da configuração salva)")
+    parser.add_argument("--sintetico", type=int, metavar="N", help="usa N amostras sintéticas em vez do log")
+    args = parser.parse_args()
+
+    limiares = args.limiares or comunicacao.config_store.load()["thresholds"]
+    if args.sintetico:
+        valores = list(sintetico(args.sintetico, media=sum(limiares) / len(limiares)))
+        origem = f"{args.sintetico} amostras sintéticas"
+    else:
+        import telemetria
+        valores = telemetria.TelemetryReader(args.log).query(float("-inf"), float("inf"))["o2"]
+        origem = f"{len(valores)} amostras de {args.log}"
+    r = avaliar(valores, args.filtro, limiares)
+    print(f"{origem} | limiares {limiares} | filtro {r['filtro']}")
+    print(f"Transições de aerador: {r['transicoes_sem_filtro']} → {r['transicoes']} "
+          f"({r['transicoes_evitadas']} evitadas)")
+    print(f"Mudanças de máscara (transmissões): {r['mudancas_mascara_sem_filtro']} → {r['mudancas_mascara']} "
+          f"({r['transmissoes_evitadas']} evitadas) | picos rejeitados: {r['picos_rejeitados']}")
@@ -0,0 +1,212 @@
+"""
+Armazenamento da configuração (limiares e máscara manual)
+---------------------------------------------------------
+- Mantém o estado em memória; update() não toca no disco
+- Uma thread de escrita grava só depois de um período sem alterações (debounce)
+- Escrita atômica: arquivo temporário + fsync + rename, guardando o snapshot
+  anterior em .bak
+- Diário (.journal) com as últimas gravações, usado na recuperação
+"""
+
+import atexit, json, os, threading, time
+import metricas
+
+DEFAULT_THRESHOLDS = [5.0, 5.0, 5.0, 5.0]
+
+
+def _fsync_dir(path):
+    """Garante que o rename foi persistido no diretório (quando suportado)."""
+    try:
+        fd = os.open(os.path.dirname(path) or ".", os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _parse(data):
+    """Valida um dicionário lido do disco; retorna o estado ou None se inválido."""
+    thresholds = data.get("aeradores")
+    mask = data.get("mask", 0)
+    if not isinstance(thresholds, list) or not all(isinstance(v, (int, float)) for v in thresholds):
+        return None
+    if not isinstance(mask, int):
+        return None
+    return {"thresholds": [float(v) for v in thresholds], "manual_mask": mask}
+
+
+class ConfigStore:
+    def __init__(self, path, quiet=1.0, journal_size=32):
+        self.path = path
+        self.backup_path = path + ".bak"
+        self.journal_path = os.path.splitext(path)[0] + ".journal"
+        self.quiet = quiet                # Segundos sem alterações antes de gravar
+        self.journal_size = journal_size  # Entradas mantidas no diário
+        self._state = None
+        self._dirty = False
+        self._deadline = 0.0
+        self._cond = threading.Condition()
+        self._io_lock = threading.Lock()
+        self._writer = None
+        self._journal_lines = None
+        # Estatísticas
+        self.updates = 0
+        self.writes = 0
+        self.bytes_written = 0
+        self.write_time = 0.0
+        self.recovered_from = None
+
+    # -------- Leitura --------
+    def _read_snapshot(self, path):
+        try:
+            with open(path, "r") as f:
+                return _parse(json.load(f))
+        except (OSError, ValueError, AttributeError):
+            return None
+
+    def _read_journal(self):
+        """Retorna as linhas válidas do diário (mais antigas primeiro)."""
+        entries = []
+        try:
+            with open(self.journal_path, "r") as f:
+                for line in f:
+                    try:
+                        state = _parse(json.loads(line))
+                    except (ValueError, AttributeError):
+                        continue  # Linha truncada por queda de energia
+                    if state is not None:
+                        entries.append(line if line.endswith("\n") else line + "\n")
+        except OSError:
+            pass
+        return entries
+
+    def load(self):
+        """Carrega a configuração: arquivo principal, diário, .bak ou padrão."""
+        with self._cond:
+            if self._state is not None:
+                return self._copy(self._state)
+        state = self._read_snapshot(self.path)
+        source = None
+        if state is None and os.path.exists(self.path):
+            print(f"Erro ao carregar {self.path}; tentando o último snapshot válido.")
+        if state is None:
+            # A última linha do diário é o snapshot gravado mais recente
+            journal = self._read_journal()
+            if journal:
+                state, source = _parse(json.loads(journal[-1])), self.journal_path
+        if state is None:
+            state, source = self._read_snapshot(self.backup_path), self.backup_path
+        if state is None:
+            state, source = {"thresholds": list(DEFAULT_THRESHOLDS), "manual_mask": 0}, None
+        elif source is not None:
+            print(f"Configuração recuperada de {source}")
+            self.recovered_from = source
+        with self._cond:
+            if self._state is None:
+                self._state = state
+            return self._copy(self._state)
+
+    @staticmethod
+    def _copy(state):
+        return {"thresholds": list(state["thresholds"]), "manual_mask": state["manual_mask"]}
+
+    # -------- Escrita --------
+    def update(self, thresholds, manual_mask):
+        """Atualiza o estado em memória e agenda a gravação após o período de silêncio."""
+        with self._cond:
+            self._state = {"thresholds": list(thresholds), "manual_mask": manual_mask}
+            self._dirty = True
+            self._deadline = time.monotonic() + self.quiet
+            self.updates += 1
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, daemon=True)
+                self._writer.start()
+                atexit.register(self.flush)
+            self._cond.notify()
+
+    def _write_loop(self):
+        with self._cond:
+            while True:
+                while not self._dirty:
+                    self._cond.wait()
+                wait = self._deadline - time.monotonic()
+                if wait > 0:
+                    self._cond.wait(wait)  # Nova alteração adia o prazo
+                    continue
+                self._cond.release()
+                try:
+                    self.flush()
+                finally:
+                    self._cond.acquire()
+
+    def flush(self):
+        """Grava imediatamente se houver alterações pendentes."""
+        with self._io_lock:
+            with self._cond:
+                if not self._dirty:
+                    return
+                state = self._copy(self._state)
+                self._dirty = False
+            t0 = time.perf_counter()
+            try:
+                self._write(state)
+                print(f"Configuração salva: {state['thresholds']}, máscara {bin(state['manual_mask'])}")
+            except OSError as e:
+                print(f"Erro ao salvar {self.path}: {e}")
+                with self._cond:
+                    self._dirty = True
+            self.write_time += time.perf_counter() - t0
+
+    def _write(self, state):
+        data = {"aeradores": state["thresholds"], "mask": state["manual_mask"]}
+        snapshot = json.dumps(data, indent=2).encode()
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(snapshot)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(self.path):
+            os.replace(self.path, self.backup_path)
+        os.replace(tmp, self.path)
+        _fsync_dir(self.path)
+        self.writes += 1
+        self.bytes_written += len(snapshot)
+        if __debug__ and metricas.ATIVO:
+            metricas.config_gravacoes.inc()
+        self._append_journal(dict(data, t=round(time.time(), 3)))
+
+    def _append_journal(self, entry):
+        """Anexa a gravação ao diário, compactando-o quando passa do limite."""
+        line = json.dumps(entry, separators=(",", ":")) + "\n"
+        if self._journal_lines is None:
+            self._journal_lines = len(self._read_journal())
+        if self._journal_lines >= self.journal_size:
+            keep = self._read_journal()[-(self.journal_size // 2):] + [line]
+            tmp = self.journal_path + ".tmp"
+            with open(tmp, "w") as f:
+                f.writelines(keep)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.journal_path)
+            self._journal_lines = len(keep)
+            self.bytes_written += sum(len(l) for l in keep)
+            return
+        with open(self.journal_path, "a") as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        self._journal_lines += 1
+        self.bytes_written += len(line)
+
+    def stats(self):
+        return {
+            "alteracoes": self.updates,
+            "gravacoes": self.writes,
+            "bytes_gravados": self.bytes_written,
+            "tempo_gravacao_s": round(self.write_time, 4),
+            "recuperado_de": self.recovered_from,
+        }
@@ -0,0 +1,308 @@
+"""
+Controlador sem interface (daemon)
+----------------------------------
+- Dono do rádio e do laço de decisão: amostra → condicionamento → máscara → transmissor
+  de máscaras, mais telemetria e configuração, sem carregar Qt
+- Publica o estado em um socket Unix (uma linha JSON por mensagem) para
+  qualquer número de clientes; o painel (programa.py) é só um cliente e pode
+  cair ou reiniciar sem interromper a aeração
+- Mensagens: {"tipo": "estado"} ao conectar, "amostra", "ack" e "config";
+  clientes enviam {"cmd": "config", "limiares": [...], "manual": m}
+- Cliente lento (buffer de saída acima de LIMITE_BUFFER) é desconectado
+
+Uso: python controlador.py [--socket /run/aeracao/controle.sock] [--estacao-virtual]
+"""
+
+import argparse, asyncio, json, os, signal, socket, threading, time
+import comunicacao
+import condicionamento
+import recepcao
+import telemetria
+import transmissao
+
+SOCKET_PATH = os.environ.get("AERACAO_SOCKET", os.path.join(comunicacao.BASE_DIR, "controle.sock"))
+LIMITE_BUFFER = 256 * 1024  # Bytes pendentes por cliente antes de desconectá-lo
+
+
+def _linha(msg):
+    return (json.dumps(msg, separators=(",", ":")) + "\n").encode()
+
+
+# ==================== PUBLICAÇÃO ====================
+class Publicador:
+    """Servidor do socket Unix em um laço asyncio próprio; publish() pode ser chamado de qualquer thread."""
+
+    def __init__(self, path, snapshot, on_command):
+        self.path = path
+        self.snapshot = snapshot      # Função que retorna a mensagem "estado" atual
+        self.on_command = on_command  # Chamado como on_command(dict) no laço do publicador
+        self.loop = asyncio.new_event_loop()
+        self._clients = set()
+        self._server = None
+        # Estatísticas
+        self.published = 0
+        self.connections = 0
+        self.dropped_clients = 0
+
+    def start(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)  # Socket órfão de uma execução anterior
+        pronto = threading.Event()
+        threading.Thread(target=self._run, args=(pronto,), daemon=True).start()
+        pronto.wait()
+
+    def _run(self, pronto):
+        asyncio.set_event_loop(self.loop)
+        self._server = self.loop.run_until_complete(asyncio.start_unix_server(self._client, self.path))
+        os.chmod(self.path, 0o660)
+        pronto.set()
+        self.loop.run_forever()
+
+    def publish(self, msg):
+        self.loop.call_soon_threadsafe(self._fanout, _linha(msg))
+
+    def _fanout(self, data):
+        self.published += 1
+        for writer in list(self._clients):
+            if writer.transport.get_write_buffer_size() > LIMITE_BUFFER:
+                self._clients.discard(writer)
+                self.dropped_clients += 1
+                writer.close()
+            else:
+                writer.write(data)
+
+    async def _client(self, reader, writer):
+        self.connections += 1
+        writer.write(_linha(self.snapshot()))
+        self._clients.add(writer)
+        try:
+            while line := await reader.readline():
+                try:
+                    self.on_command(json.loads(line))
+                except (ValueError, TypeError, KeyError) as e:
+                    writer.write(_linha({"tipo": "erro", "erro": str(e)}))
+        except ConnectionError:
+            pass
+        finally:
+            self._clients.discard(writer)
+            writer.close()
+
+    def stop(self):
+        def _close():
+            self._server.close()
+            for writer in self._clients:
+                writer.close()
+            self.loop.stop()
+        self.loop.call_soon_threadsafe(_close)
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def stats(self):
+        return {
+            "clientes": len(self._clients),
+            "conexoes": self.connections,
+            "publicadas": self.published,
+            "clientes_lentos": self.dropped_clients,
+        }
+
+
+# ==================== CONTROLADOR ====================
+LIMIAR_MAX = 20.0  # mg/L
+
+
+def validar_config(thresholds, manual_mask, n):
+    """Limiares e máscara manual vindos de um cliente → (limiares, máscara); ValueError se inválidos.
+
+    O número de aeradores é o da configuração em vigor (a máscara vai inteira para a estação)."""
+    thresholds = [float(v) for v in thresholds]
+    manual_mask = int(manual_mask)
+    if len(thresholds) != n:
+        raise ValueError(f"Esperados {n} limiares, recebidos {len(thresholds)}")
+    if not all(0 <= v <= LIMIAR_MAX for v in thresholds):
+        raise ValueError(f"Limiares fora de 0–{LIMIAR_MAX:g} mg/L")
+    if not 0 <= manual_mask < 1 << n:
+        raise ValueError(f"Máscara manual fora de 0–{(1 << n) - 1}")
+    return thresholds, manual_mask
+
+
+class Controlador:
+    def __init__(self, socket_path=SOCKET_PATH, telemetry_path=comunicacao.TELEMETRY_FILE):
+        config = comunicacao.load_config()
+        self.thresholds = config["thresholds"]
+        self.manual_mask = config["manual_mask"]
+        self.auto_mask = 0
+        self.condicionador = condicionamento.Condicionador()  # AERACAO_FILTRO
+        self.last_sample = None   # (t, oxigênio, temperatura, máscara final)
+        self.last_ack = None      # (máscara, ok)
+        self.telemetria = telemetria.Telemetria(telemetry_path)
+        self.transmitter = transmissao.MaskTransmitter(on_result=self._on_ack)
+        comunicacao.link_monitor.acompanhar(self.transmitter)
+        self.engine = recepcao.ReceiveEngine(self.on_sample)
+        self.publicador = Publicador(socket_path, self.snapshot, self.on_command)
+
+    # -------- Laço de decisão (thread do rádio) --------
+    def on_sample(self, ox, temp):
+        final_mask, self.auto_mask = self.condicionador.calcular(ox, self.thresholds, self.manual_mask)
+        self.transmitter.submit(final_mask)
+        t = time.time()
+        self.telemetria.append(t, ox, temp, final_mask)
+        self.last_sample = (t, ox, temp, final_mask)
+        self.publicador.publish({"tipo": "amostra", "t": t, "o2": ox, "temp": temp,
+                                 "mascara": final_mask, "auto": self.auto_mask})
+
+    def _on_ack(self, mask, ok):
+        self.last_ack = (mask, ok)
+        self.publicador.publish({"tipo": "ack", "mascara": mask, "ok": ok})
+
+    # -------- Configuração (clientes) --------
+    def set_config(self, thresholds, manual_mask):
+        # Listas novas (troca atômica) lidas pela thread do rádio em on_sample()
+        self.thresholds = [float(v) for v in thresholds]
+        self.manual_mask = int(manual_mask)
+        comunicacao.save_config(self.thresholds, self.manual_mask)
+        self.publicador.publish(self._config_msg())
+
+    def on_command(self, cmd):
+        if not isinstance(cmd, dict):
+            raise ValueError("Comando deve ser um objeto JSON")
+        if cmd.get("cmd") == "config":
+            self.set_config(*validar_config(cmd.get("limiares", self.thresholds), cmd.get("manual", self.manual_mask),
+                                            len(self.thresholds)))
+        else:
+            raise ValueError(f"Comando desconhecido: {cmd.get('cmd')!r}")
+
+    def _config_msg(self):
+        return {"tipo": "config", "limiares": self.thresholds, "manual": self.manual_mask}
+
+    def snapshot(self):
+        msg = dict(self._config_msg(), tipo="estado")
+        if self.last_sample is not None:
+            t, ox, temp, mask = self.last_sample
+            msg.update(t=t, o2=ox, temp=temp, mascara=mask, auto=self.auto_mask)
+        if self.last_ack is not None:
+            msg.update(ack_mascara=self.last_ack[0], ack_ok=self.last_ack[1])
+        return msg
+
+    # -------- Ciclo de vida --------
+    def start(self):
+        comunicacao.setup()
+        self.transmitter.start()
+        self.rx_thread = threading.Thread(target=self.engine.run, daemon=True)
+        self.rx_thread.start()
+        self.publicador.start()
+
+    def stop(self):
+        self.engine.stop()
+        self.rx_thread.join(timeout=1)
+        self.transmitter.stop()
+        self.publicador.stop()
+        comunicacao.save_config(self.thresholds, self.manual_mask)
+        comunicacao.flush_config()
+        self.telemetria.close()
+
+    def stats(self):
+        return {"recepcao": self.engine.stats(), "transmissor": self.transmitter.stats(),
+                "enlace": comunicacao.link_monitor.stats(), "publicador": self.publicador.stats(),
+                "condicionamento": self.condicionador.stats()}
+
+
+# ==================== CLIENTE ====================
+class ClienteControle(threading.Thread):
+    """Cliente do socket do controlador; reconecta sozinho se o daemon reiniciar.
+
+    on_message(msg) é chamado na thread do cliente para cada mensagem recebida."""
+
+    def __init__(self, path=SOCKET_PATH, on_message=None, retry=1.0):
+        super().__init__(daemon=True)
+        self.path = path
+        self.on_message = on_message
+        self.retry = retry
+        self.running = True
+        self._sock = None
+        self._file = None
+        self._send_lock = threading.Lock()
+
+    def connect(self, timeout=1.0):
+        """Conecta e lê o estado inicial; retorna a mensagem "estado" ou None se o daemon não responde."""
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        try:
+            sock.connect(self.path)
+            self._file = sock.makefile("rb")
+            estado = json.loads(self._file.readline())
+        except (OSError, ValueError):
+            sock.close()
+            return None
+        sock.settimeout(None)
+        self._sock = sock
+        return estado
+
+    def run(self):
+        while self.running:
+            if self._sock is None:
+                estado = self.connect()
+                if estado is None:
+                    time.sleep(self.retry)
+                    continue
+                self._dispatch(estado)
+            try:
+                for line in self._file:
+                    self._dispatch(json.loads(line))
+            except (OSError, ValueError):
+                pass
+            self._close()
+
+    def _dispatch(self, msg):
+        if self.on_message is not None:
+            self.on_message(msg)
+
+    def send(self, cmd):
+        """Envia um comando; retorna False se o daemon não está conectado."""
+        with self._send_lock:
+            if self._sock is None:
+                return False
+            try:
+                self._sock.sendall(_linha(cmd))
+                return True
+            except OSError:
+                return False
+
+    def send_config(self, thresholds, manual_mask):
+        return self.send({"cmd": "config", "limiares": list(thresholds), "manual": manual_mask})
+
+    def _close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def stop(self):
+        self.running = False
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except (AttributeError, OSError):
+            pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--socket", default=SOCKET_PATH, help="caminho do socket Unix")
+    parser.add_argument("--intervalo", type=float, default=60.0, help="intervalo entre relatórios (s)")
+    parser.add_argument("--estacao-virtual", action="store_true",
+                        help="Black Pill simulada no mesmo processo (com AERACAO_RADIO=virtual)")
+    args = parser.parse_args()
+
+    signal.signal(signal.SIGTERM, signal.default_int_handler)  # systemd: encerra como Ctrl+C
+    t0 = time.perf_counter()
+    controlador = Controlador(args.socket)
+    controlador.start()
+    print(f"Controlador pronto em {time.perf_counter() - t0:.3f} s, socket {args.socket}", flush=True)
+    if args.estacao_virtual:
+        import random
+        from estacao_virtual import EstacaoVirtual
+        EstacaoVirtual(sample=lambda n: (random.uniform(3.0, 8.0), 27.0), period=1.0).start()
+    try:
+        while True:
+            time.sleep(args.intervalo)
+            print(controlador.stats(), flush=True)
+    except KeyboardInterrupt:
+        controlador.stop()
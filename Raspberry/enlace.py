@@ -0,0 +1,249 @@
+"""
+Qualidade do enlace de rádio
+----------------------------
+- MonitorEnlace: por janela de tempo (padrão 10 s) conta escritas, falhas de
+  ACK (MAX_RT), retransmissões de hardware (ARC), portadora no canal antes de
+  transmitir (RPD) e quadros perdidos na recepção (lacunas de sequência)
+- Adaptação: sobe ou desce um nível de NIVEIS conforme as janelas e aplica o
+  atraso/contagem de retransmissão do nRF24 (setRetries) e o orçamento de
+  tentativas de software dos transmissores acompanhados (MaskTransmitter;
+  o hub segue com o próprio orçamento, limitado pelo prazo de cada estação)
+- Janelas com poucas escritas (o transmissor só escreve quando a máscara muda
+  e no keep-alive de 30 s) se somam até MIN_ESCRITAS antes de cada decisão
+- Varredura de canais (offline, com o sistema parado): amostra a portadora em
+  cada canal e ordena do mais limpo ao mais ruidoso; o canal escolhido vale
+  para os dois lados (AERACAO_CANAL aqui e radio.setChannel() no radio.cpp)
+
+Uso:
+    python enlace.py varrer --amostras 200 [--canais 0-125]
+    AERACAO_ENLACE_ADAPTATIVO=0 desliga a adaptação (só monitora)
+"""
+
+import argparse, os, threading, time
+from collections import deque
+
+JANELA = float(os.environ.get("AERACAO_ENLACE_JANELA", "10"))
+ADAPTATIVO = os.environ.get("AERACAO_ENLACE_ADAPTATIVO", "1") not in ("", "0")
+
+
+class Nivel:
+    """Política de retransmissão para uma condição do enlace."""
+
+    def __init__(self, nome, atraso, contagem, tentativas, backoff):
+        self.nome = nome
+        self.atraso = atraso          # setRetries: (atraso + 1) × 250 µs entre retransmissões
+        self.contagem = contagem      # setRetries: retransmissões de hardware (0–15)
+        self.tentativas = tentativas  # Escritas de software por máscara
+        self.backoff = backoff        # Espera de software após a primeira falha (s)
+
+
+# Do enlace limpo ao ruim. A 250 kbps o atraso mínimo útil é 500 µs (atraso=1).
+NIVEIS = [
+    Nivel("limpo", 1, 5, 3, 0.01),
+    Nivel("normal", 4, 10, 5, 0.02),
+    Nivel("ruidoso", 8, 15, 6, 0.05),
+    Nivel("ruim", 15, 15, 5, 0.02),  # setRetries(15, 15) e 5 tentativas de antes
+]
+NIVEL_INICIAL = len(NIVEIS) - 1     # Começa conservador e desce com janelas limpas
+# Nenhum ACK na janela inteira (estação desligada ou fora da janela de escuta):
+# mais tentativas só queimam tempo de ar, então sonda barato até voltar um ACK
+AUSENTE = Nivel("ausente", 15, 5, 1, 0.2)
+
+# Limites para trocar de nível
+SOBE_FALHAS = 0.05     # Fração de escritas sem ACK na janela
+SOBE_ARC = 3.0         # Retransmissões de hardware por escrita (média)
+DESCE_ARC = 0.5
+JANELAS_PARA_DESCER = 2  # Avaliações limpas seguidas para descer um nível
+MIN_ESCRITAS = 3       # Escritas por avaliação; janelas com menos se somam às seguintes
+
+
+class MonitorEnlace:
+    """Estatísticas do enlace por janela e adaptação das retransmissões.
+
+    registrar_tx() é chamado por comunicacao.send_mask_once()/send_mask() com o
+    radio_lock já tomado, logo após cada escrita."""
+
+    def __init__(self, janela=JANELA, adaptativo=ADAPTATIVO, historico=60, lost_counter=None,
+                 relogio=time.monotonic):
+        self.janela = janela
+        self.adaptativo = adaptativo
+        self.lost_counter = lost_counter  # Função que retorna o total de quadros perdidos na recepção
+        self.relogio = relogio            # Tempo simulado nos benchmarks
+        self.nivel = NIVEL_INICIAL
+        self.ausente = False
+        self.janelas = deque(maxlen=historico)
+        self.transmissores = []
+        self._lock = threading.Lock()
+        self._avaliacoes_limpas = 0
+        self._acumulado = [0, 0, 0]  # Escritas, falhas e retransmissões ainda não avaliadas
+        self._inicio = relogio()
+        self._perdidos_base = 0
+        self._zerar()
+        # Totais
+        self.trocas = 0
+
+    def _zerar(self):
+        self._escritas = 0
+        self._falhas = 0
+        self._arc_total = 0
+        self._arc_max = 0
+        self._portadora = 0
+
+    # -------- Política --------
+    @property
+    def politica(self):
+        return AUSENTE if self.ausente else NIVEIS[self.nivel]
+
+    def retries(self):
+        """(atraso, contagem) para radio.setRetries() no nível atual."""
+        p = self.politica
+        return p.atraso, p.contagem
+
+    def acompanhar(self, transmissor):
+        """Passa a ajustar max_attempts/backoff do transmissor a cada troca de nível."""
+        self.transmissores.append(transmissor)
+        self._ajustar(transmissor)
+
+    def _ajustar(self, transmissor):
+        p = self.politica
+        transmissor.max_attempts = p.tentativas
+        transmissor.backoff = p.backoff
+
+    # -------- Registro (radio_lock tomado) --------
+    def registrar_tx(self, radio, ok, arc, portadora=False):
+        with self._lock:
+            self._escritas += 1
+            self._falhas += not ok
+            self._arc_total += arc
+            self._arc_max = max(self._arc_max, arc)
+            self._portadora += bool(portadora)
+            agora = self.relogio()
+            janela = self._fechar(agora) if agora - self._inicio >= self.janela else None
+        if not self.adaptativo:
+            return
+        if ok and self.ausente:
+            self._trocar(radio, self.nivel, ausente=False)  # A estação voltou: retoma o nível de antes
+        elif janela is not None:
+            self._adaptar(radio, janela)
+
+    def _fechar(self, agora):
+        perdidos = 0
+        if self.lost_counter is not None:
+            total = self.lost_counter()
+            perdidos, self._perdidos_base = total - self._perdidos_base, total
+        n = self._escritas
+        janela = {
+            "inicio": time.time() - (agora - self._inicio),
+            "duracao_s": round(agora - self._inicio, 3),
+            "escritas": n,
+            "falhas": self._falhas,
+            "arc_medio": round(self._arc_total / n, 2) if n else 0.0,
+            "arc_max": self._arc_max,
+            "retransmissoes": self._arc_total,
+            "portadora": round(self._portadora / n, 3) if n else 0.0,
+            "perdidos_rx": perdidos,
+            "nivel": self.politica.nome,
+        }
+        self.janelas.append(janela)
+        self._inicio = agora
+        self._zerar()
+        return janela
+
+    def _adaptar(self, radio, janela):
+        acumulado = self._acumulado
+        acumulado[0] += janela["escritas"]
+        acumulado[1] += janela["falhas"]
+        acumulado[2] += janela["retransmissoes"]
+        n, falhas, retransmissoes = acumulado
+        if n < MIN_ESCRITAS:
+            return
+        self._acumulado = [0, 0, 0]
+        arc_medio = retransmissoes / n
+        if falhas == n:
+            self._trocar(radio, self.nivel, ausente=True)
+            return
+        if falhas / n > SOBE_FALHAS or arc_medio > SOBE_ARC:
+            self._avaliacoes_limpas = 0
+            novo = min(self.nivel + 1, len(NIVEIS) - 1)
+        elif falhas == 0 and arc_medio < DESCE_ARC:
+            self._avaliacoes_limpas += 1
+            novo = self.nivel
+            if self._avaliacoes_limpas >= JANELAS_PARA_DESCER:
+                self._avaliacoes_limpas = 0
+                novo = max(self.nivel - 1, 0)
+        else:
+            self._avaliacoes_limpas = 0
+            novo = self.nivel
+        self._trocar(radio, novo, self.ausente)
+
+    def _trocar(self, radio, nivel, ausente):
+        if (nivel, ausente) == (self.nivel, self.ausente):
+            return
+        self.nivel, self.ausente = nivel, ausente
+        self.trocas += 1
+        radio.setRetries(*self.retries())
+        for transmissor in self.transmissores:
+            self._ajustar(transmissor)
+
+    def stats(self):
+        ultima = self.janelas[-1] if self.janelas else {}
+        return {
+            "nivel": self.politica.nome,
+            "trocas": self.trocas,
+            "janelas": len(self.janelas),
+            **{k: ultima[k] for k in ("escritas", "falhas", "arc_medio", "portadora", "perdidos_rx")
+               if k in ultima},
+        }
+
+
+# ==================== VARREDURA DE CANAIS ====================
+def varrer_canais(radio, canais=range(126), amostras=100, espera=0.0002):
+    """Amostra a portadora (testRPD) em cada canal; retorna [(canal, fração)] do mais limpo ao mais ruidoso.
+
+    Deixa o rádio parado (stopListening) no último canal; chamar setup() depois."""
+    contagem = {canal: 0 for canal in canais}
+    radio.stopListening()
+    # Passadas intercaladas: ruído intermitente afeta todos os canais por igual
+    for _ in range(amostras):
+        for canal in contagem:
+            radio.setChannel(canal)
+            radio.startListening()
+            time.sleep(espera)  # RPD precisa de ~170 µs em RX
+            radio.stopListening()
+            contagem[canal] += bool(radio.testRPD())
+    return sorted(((c, n / amostras) for c, n in contagem.items()), key=lambda cf: (cf[1], cf[0]))
+
+
+def _faixa(texto):
+    """ "0-125" ou "90,100,110" → lista de canais."""
+    canais = []
+    for parte in texto.split(","):
+        inicio, _, fim = parte.partition("-")
+        canais += range(int(inicio), int(fim or inicio) + 1)
+    return canais
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p = sub.add_parser("varrer", help="ordena os canais pelo ruído (rode com o controlador parado)")
+    p.add_argument("--canais", type=_faixa, default=list(range(126)), help="ex.: 0-125 ou 90,100,110")
+    p.add_argument("--amostras", type=int, default=100, help="amostras de portadora por canal")
+    p.add_argument("--espera", type=float, default=0.0002, help="tempo em RX antes de cada amostra (s)")
+    p.add_argument("--mostrar", type=int, default=10, help="quantos canais listar em cada ponta")
+    p.add_argument("--ruido-virtual", type=float, default=0.0,
+                   help="com AERACAO_RADIO=virtual, ruído aleatório de até N por canal (demonstração)")
+    args = parser.parse_args()
+
+    import random
+    import comunicacao
+    comunicacao.setup()
+    if args.ruido_virtual and hasattr(comunicacao.radio, "ether"):
+        rng = random.Random(1)
+        comunicacao.radio.ether.ruido = {c: rng.uniform(0, args.ruido_virtual) for c in args.canais}
+    with comunicacao.radio_lock:
+        ranking = varrer_canais(comunicacao.radio, args.canais, args.amostras, args.espera)
+    print(f"Canal atual: {comunicacao.CANAL}. Portadora detectada (fração das amostras):")
+    print("Mais limpos: " + ", ".join(f"{c} ({f:.0%})" for c, f in ranking[:args.mostrar]))
+    print("Mais ruidosos: " + ", ".join(f"{c} ({f:.0%})" for c, f in ranking[::-1][:args.mostrar]))
+    print(f"Para trocar: AERACAO_CANAL={ranking[0][0]} aqui e radio.setChannel({ranking[0][0]}) no radio.cpp")
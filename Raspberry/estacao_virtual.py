@@ -0,0 +1,114 @@
+"""
+Black Pill virtual
+------------------
+- Reproduz o loop() do master.ino sobre um rádio VirtualRF24:
+  envia (oxigênio, temperatura), escuta a máscara por até 1 s e espera o intervalo
+- Mede o tempo entre o envio da amostra e a chegada da máscara (ida e volta)
+- Envia quadros legados "<ff" ou versionados (comunicacao.encode_frame), com
+  várias amostras acumuladas por quadro
+"""
+
+import struct, threading, time
+import transporte
+
+ADDR_TX = b"RPi58"   # Raspberry Pi (transmissão)
+ADDR_RX = b"Bp32A"   # Black Pill   (recepção)
+
+
+class EstacaoVirtual(threading.Thread):
+    def __init__(self, ether=None, sample=None, period=0.5, rx_timeout=1.0,
+                 count=None, addr_tx=ADDR_TX, addr_rx=ADDR_RX, name="bp", versioned=False,
+                 batch=1, node=1, compact=True):
+        super().__init__(daemon=True)
+        self.radio = transporte.VirtualRF24(ether, name=name)
+        self.sample = sample or (lambda n: (5.0, 25.0))
+        self.period = period
+        self.rx_timeout = rx_timeout
+        self.count = count
+        self.addr_tx = addr_tx
+        self.addr_rx = addr_rx
+        self.versioned = versioned  # Quadro versionado em vez do "<ff" legado
+        self.batch = batch          # Amostras por quadro (só no formato versionado)
+        self.node = node
+        self.compact = compact
+        self.seq = 0
+        self._buffer = []
+        self.running = True
+        self.mask = None
+        # Estatísticas
+        self.sent = 0
+        self.samples = 0
+        self.tx_failed = 0
+        self.masks = 0
+        self.missed = 0
+        self.rtts = []
+
+        self.radio.setDataRate(transporte.RF24_250KBPS)
+        self.radio.setChannel(100)
+        self.radio.setCRCLength(transporte.RF24_CRC_16)
+        self.radio.setAutoAck(True)
+        self.radio.setRetries(15, 15)
+        self.radio.stopListening()
+
+    def payload(self, n):
+        """Payload da amostra n (padrão: struct SensorData, 8 bytes)."""
+        ox, temp = self.sample(n)
+        return struct.pack("<ff", ox, temp)
+
+    def frame(self, samples):
+        """Quadro versionado com as amostras acumuladas."""
+        import comunicacao  # Aqui: comunicacao cria o rádio do Pi ao ser importado
+        data = comunicacao.encode_frame(samples, node=self.node, seq=self.seq,
+                                        interval_ms=int(self.period * 1000), compact=self.compact)
+        self.seq = (self.seq + 1) & 0xFFFF
+        return data
+
+    def run(self):
+        n = 0
+        while self.running and (self.count is None or n < self.count):
+            if self.versioned:
+                self._buffer.append(self.sample(n))
+                n += 1
+                self.samples += 1
+                if len(self._buffer) < self.batch and (self.count is None or n < self.count):
+                    if self.period:
+                        time.sleep(self.period)
+                    continue
+                payload, self._buffer = self.frame(self._buffer), []
+            else:
+                payload = self.payload(n)
+                n += 1
+                self.samples += 1
+
+            # enterTX() + sendSensorData()
+            self.radio.stopListening()
+            self.radio.openWritingPipe(self.addr_tx)
+            t0 = time.perf_counter()
+            ok = self.radio.write(payload)
+            if not ok:
+                self.tx_failed += 1
+            else:
+                self.sent += 1
+
+            # enterRX() + receiveRelayMask(mask, 1000)
+            self.radio.openReadingPipe(1, self.addr_rx)
+            self.radio.startListening()
+            deadline = t0 + self.rx_timeout
+            received = False
+            while time.perf_counter() < deadline:
+                if self.radio.available():
+                    self.mask = self.radio.read(1)[0]
+                    self.rtts.append(time.perf_counter() - t0)
+                    self.masks += 1
+                    received = True
+                    break
+                time.sleep(0.0005)
+            if ok and not received:
+                self.missed += 1
+
+            if self.period:
+                time.sleep(self.period)
+        self.running = False
+
+    def stop(self):
+        self.running = False
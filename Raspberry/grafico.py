@@ -0,0 +1,157 @@
+"""
+Gráfico de tendência de oxigênio
+--------------------------------
+- Lê o histórico de telemetria e desenha, por coluna de pixel, o mínimo e o
+  máximo de O2 (no máximo 2 pontos por pixel, mesmo com 24 h a 2 Hz)
+- Faixas de ligado/desligado de cada aerador embaixo da curva
+- Linhas dos limiares dos spinboxes desenhadas por cima, sem refazer a curva
+- Atualização incremental: a imagem rola para a esquerda e só as colunas
+  novas são desenhadas
+"""
+
+import math, time
+import numpy as np
+from PySide6.QtWidgets import QWidget
+from PySide6.QtCore import Qt, QRect
+from PySide6.QtGui import QPainter, QPixmap, QColor, QPen, QFont
+import telemetria as _telemetria
+
+AXIS_WIDTH = 60      # Largura reservada para a escala à esquerda (px)
+BAND_HEIGHT = 6      # Altura da faixa de cada aerador (px)
+BAND_GAP = 2         # Espaço entre faixas (px)
+
+COLOR_CURVE = QColor("#00ffea")
+COLOR_BAND = QColor("#00C851")
+COLOR_BACKGROUND = QColor(0, 0, 0, 120)
+THRESHOLD_COLORS = [QColor("#ff8800"), QColor("#ffd600"), QColor("#e040fb"), QColor("#ff5252")]
+
+
+class TrendChart(QWidget):
+    def __init__(self, telemetria, thresholds, window=24 * 3600, y_max=15.0, parent=None):
+        super().__init__(parent)
+        self.telemetria = telemetria
+        self.thresholds = list(thresholds)
+        self.window = window          # Janela exibida (s)
+        self.y_max = y_max            # Topo da escala de O2 (mg/L)
+        self._pixmap = None
+        self._t_right = 0.0           # Fim (exclusivo) da última coluna
+        self._dt = 1.0                # Segundos por coluna
+        self._min = self._max = self._mask = None
+        # Estatísticas
+        self.full_redraws = 0
+        self.columns_drawn = 0
+
+    # -------- Geometria --------
+    @property
+    def n_aeradores(self):
+        return len(self.thresholds)
+
+    def _plot_rect(self):
+        bands = self.n_aeradores * (BAND_HEIGHT + BAND_GAP)
+        return QRect(0, 0, max(1, self.width() - AXIS_WIDTH), max(1, self.height() - bands - 4))
+
+    def _y(self, value):
+        h = self._plot_rect().height()
+        return h - 1 - int(min(max(value, 0.0), self.y_max) / self.y_max * (h - 1))
+
+    def _align(self, now):
+        return (math.floor(now / self._dt) + 1) * self._dt
+
+    # -------- Dados --------
+    def set_thresholds(self, thresholds):
+        self.thresholds = list(thresholds)
+        self.update()  # Só as linhas de limiar mudam; a curva fica em cache
+
+    def rebuild(self, now=None):
+        """Refaz todas as colunas a partir do log (ao abrir ou redimensionar)."""
+        now = time.time() if now is None else now
+        rect = self._plot_rect()
+        width = rect.width()
+        self._dt = self.window / width
+        self._t_right = self._align(now)
+        ds = self.telemetria.downsample(self._t_right - width * self._dt, self._t_right, width)
+        self._min, self._max, self._mask = ds["o2_min"], ds["o2_max"], ds["mask"].copy()
+        self._pixmap = QPixmap(self.width() - AXIS_WIDTH, self.height())
+        self._pixmap.fill(COLOR_BACKGROUND)
+        self._draw_columns(0, width)
+        self.full_redraws += 1
+        self.update()
+
+    def refresh(self, now=None):
+        """Incorpora as amostras novas: rola a imagem e desenha só as colunas afetadas."""
+        if self._pixmap is None:
+            return self.rebuild(now)
+        now = time.time() if now is None else now
+        width = len(self._min)
+        shift = int(round((self._align(now) - self._t_right) / self._dt))
+        if shift >= width:
+            return self.rebuild(now)
+        if shift > 0:
+            self._pixmap.scroll(-shift, 0, self._pixmap.rect())
+            for arr, empty in ((self._min, np.nan), (self._max, np.nan), (self._mask, 0)):
+                arr[:-shift] = arr[shift:]
+                arr[-shift:] = empty
+            self._t_right += shift * self._dt
+        # A coluna que estava parcial e as novas (a última continua parcial)
+        first = width - 1 - max(shift, 0)
+        t_first = self._t_right - (width - first) * self._dt
+        recent = self.telemetria.recent(seconds=self._t_right - t_first)
+        edges = self._t_right - (width - np.arange(first, width + 1)) * self._dt
+        ds = _telemetria.reduce_samples(recent, edges)
+        self._min[first:] = ds["o2_min"]
+        self._max[first:] = ds["o2_max"]
+        self._mask[first:] = ds["mask"]
+        self._draw_columns(first, width)
+        self.update()
+
+    # -------- Desenho --------
+    def _draw_columns(self, first, last):
+        """Desenha as colunas [first, last) na imagem em cache."""
+        rect = self._plot_rect()
+        painter = QPainter(self._pixmap)
+        painter.setCompositionMode(QPainter.CompositionMode_Source)
+        painter.fillRect(first, 0, last - first, self._pixmap.height(), COLOR_BACKGROUND)
+        painter.setCompositionMode(QPainter.CompositionMode_SourceOver)
+        painter.setPen(QPen(COLOR_CURVE, 1))
+        band_top = rect.height() + 4
+        for c in range(first, last):
+            lo, hi = self._min[c], self._max[c]
+            if not math.isnan(lo):
+                # Une à coluna anterior para a curva não ficar pontilhada
+                if c > 0 and not math.isnan(self._min[c - 1]):
+                    prev = (self._min[c - 1] + self._max[c - 1]) / 2
+                    lo, hi = min(lo, prev), max(hi, prev)
+                painter.drawLine(c, self._y(lo), c, self._y(hi))
+            mask = int(self._mask[c])
+            for i in range(self.n_aeradores):
+                if (mask >> i) & 1:
+                    painter.fillRect(c, band_top + i * (BAND_HEIGHT + BAND_GAP), 1, BAND_HEIGHT, COLOR_BAND)
+        painter.end()
+        self.columns_drawn += last - first
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if self.width() > AXIS_WIDTH:
+            self.rebuild()
+
+    def paintEvent(self, event):
+        if self._pixmap is None:
+            return
+        painter = QPainter(self)
+        painter.drawPixmap(AXIS_WIDTH, 0, self._pixmap)
+        rect = self._plot_rect().translated(AXIS_WIDTH, 0)
+
+        # Escala de O2
+        painter.setFont(QFont("Arial", 11))
+        painter.setPen(QColor("white"))
+        for value in range(0, int(self.y_max) + 1, 5):
+            y = max(8, self._y(value))
+            painter.drawText(QRect(0, y - 8, AXIS_WIDTH - 6, 16), Qt.AlignRight | Qt.AlignVCenter, f"{value}")
+
+        # Limiares dos aeradores
+        for i, limiar in enumerate(self.thresholds):
+            pen = QPen(THRESHOLD_COLORS[i % len(THRESHOLD_COLORS)], 1, Qt.DashLine)
+            painter.setPen(pen)
+            y = self._y(limiar)
+            painter.drawLine(rect.left(), y, rect.right(), y)
+        painter.end()
@@ -0,0 +1,223 @@
+"""
+Hub de várias estações Black Pill em um único rádio
+---------------------------------------------------
+- Cada estação usa um dos 6 pipes de leitura do nRF24 (endereço próprio) e
+  recebe a máscara no seu próprio endereço de transmissão
+- Limiares, máscara manual e estatísticas por estação (tabela de nós)
+- Escalonador EDF (prazo mais próximo primeiro): cada amostra gera um envio
+  de máscara com prazo dentro da janela de 1 s em que a estação escuta
+- Máscaras de todas as amostras recebidas em um despertar calculadas em lote
+  (mascara.calculate_masks)
+- Estatísticas de latência RX→ACK e taxa de perda de janela por estação
+
+Uso: python hub.py --nos hub_nos.json
+"""
+
+import argparse, heapq, json, os, threading, time
+from collections import deque
+import numpy as np
+import comunicacao
+import mascara
+import metricas
+import recepcao
+
+RX_WINDOW = 1.0       # Janela de recepção da Black Pill após enviar a amostra (s)
+WINDOW_MARGIN = 0.05  # Folga para a estação ainda estar escutando (s)
+
+# Pipes 2–5 compartilham os 4 bytes altos do pipe 1 e só diferem no primeiro byte
+_PIPE_PREFIX = {0: b"Q", 1: b"R", 2: b"S", 3: b"T", 4: b"U", 5: b"V"}
+
+
+def default_address(pipe):
+    """Endereço de leitura do pipe (pipe 1 = ADDR_RX original)."""
+    return _PIPE_PREFIX[pipe] + comunicacao.ADDR_RX[1:]
+
+
+class Node:
+    """Estado de uma estação."""
+
+    def __init__(self, node_id, pipe, tx_address, thresholds, manual_mask=0, rx_address=None):
+        self.node_id = node_id
+        self.pipe = pipe
+        self.rx_address = rx_address or default_address(pipe)
+        self.tx_address = tx_address
+        self.thresholds = list(thresholds)
+        self.manual_mask = manual_mask
+        self.last_sample = None       # (t, oxigênio, temperatura)
+        self.mask = None
+        # Estatísticas
+        self.samples = 0
+        self.acked = 0
+        self.misses = 0
+        self.latencies = deque(maxlen=500)
+
+    def stats(self):
+        lat = sorted(self.latencies)
+        pct = lambda p: round(lat[min(len(lat) - 1, int(p * len(lat)))] * 1000, 2) if lat else None
+        jobs = self.acked + self.misses
+        return {
+            "no": self.node_id,
+            "pipe": self.pipe,
+            "amostras": self.samples,
+            "ack": self.acked,
+            "perdas": self.misses,
+            "taxa_perda": round(self.misses / jobs, 4) if jobs else 0.0,
+            "latencia_ms_p50": pct(0.5),
+            "latencia_ms_p99": pct(0.99),
+        }
+
+
+def load_nodes(path):
+    """Lê a tabela de nós (JSON). Sem arquivo: uma estação com os endereços originais."""
+    if not path or not os.path.exists(path):
+        config = comunicacao.load_config()
+        return [Node(1, 1, comunicacao.ADDR_TX, config["thresholds"], config["manual_mask"])]
+    with open(path, "r") as f:
+        table = json.load(f)
+    nodes = []
+    for entry in table:
+        nodes.append(Node(entry["id"], entry["pipe"], entry["tx"].encode(), entry["aeradores"],
+                          entry.get("mask", 0), entry["rx"].encode() if "rx" in entry else None))
+    return nodes
+
+
+class Hub:
+    def __init__(self, nodes, max_attempts=8, backoff=0.01, send=None):
+        if len(nodes) > comunicacao.transporte.NUM_PIPES:
+            raise ValueError(f"No máximo {comunicacao.transporte.NUM_PIPES} estações por rádio")
+        self.nodes = {n.pipe: n for n in nodes}
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.send = send or comunicacao.send_mask_once
+        self._heap = []               # (prazo, seq, pipe, máscara, t_rx, tentativas)
+        self._seq = 0
+        self._cond = threading.Condition()
+        self.running = False
+        self._build_thresholds()
+
+    def _build_thresholds(self):
+        """Matriz de limiares (pipes × aeradores), NaN onde o aerador não existe."""
+        n = max(len(node.thresholds) for node in self.nodes.values())
+        self._matrix = np.full((comunicacao.transporte.NUM_PIPES, n), np.nan)
+        self._manual = np.zeros((comunicacao.transporte.NUM_PIPES, mascara.mask_bytes(n)), np.uint8)
+        for node in self.nodes.values():
+            self._matrix[node.pipe, :len(node.thresholds)] = node.thresholds
+            self._manual[node.pipe] = mascara.ints_to_masks([node.manual_mask], n)[0]
+
+    def set_node_config(self, pipe, thresholds=None, manual_mask=None):
+        node = self.nodes[pipe]
+        with self._cond:
+            if thresholds is not None:
+                node.thresholds = list(thresholds)
+            if manual_mask is not None:
+                node.manual_mask = manual_mask
+            self._build_thresholds()
+
+    def setup(self):
+        comunicacao.setup()
+        comunicacao.set_rx_pipes({n.pipe: n.rx_address for n in self.nodes.values()})
+
+    # -------- Recepção --------
+    def on_samples(self, samples):
+        """Calcula em lote as máscaras das amostras (pipe, O2, temp) e agenda os envios."""
+        t_rx = time.monotonic()
+        samples = [s for s in samples if s[0] in self.nodes]
+        if not samples:
+            return
+        pipes = np.array([s[0] for s in samples])
+        o2 = np.array([s[1] for s in samples])
+        with self._cond:
+            final, _ = mascara.calculate_masks(o2, self._matrix[pipes], self._manual[pipes])
+        masks = mascara.masks_to_ints(final)
+        if __debug__ and metricas.ATIVO:
+            metricas.rx_mascara.observe(time.monotonic() - metricas.t_rx)
+        with self._cond:
+            for (pipe, ox, temp), mask in zip(samples, masks):
+                node = self.nodes[pipe]
+                node.samples += 1
+                node.last_sample = (time.time(), ox, temp)
+                # Uma amostra nova substitui o envio ainda pendente da mesma estação
+                self._heap = [job for job in self._heap if job[2] != pipe]
+                heapq.heapify(self._heap)
+                self._seq += 1
+                deadline = t_rx + RX_WINDOW - WINDOW_MARGIN
+                heapq.heappush(self._heap, (deadline, self._seq, pipe, mask, t_rx, 0))
+            self._cond.notify()
+
+    # -------- Escalonador EDF --------
+    def _tx_loop(self):
+        while self.running:
+            with self._cond:
+                while self.running and not self._heap:
+                    self._cond.wait(0.5)
+                if not self.running:
+                    break
+                deadline, seq, pipe, mask, t_rx, attempts = heapq.heappop(self._heap)
+                node = self.nodes[pipe]
+            if time.monotonic() > deadline:
+                with self._cond:
+                    node.misses += 1  # A janela da estação já fechou
+                continue
+            t_tx = time.monotonic()
+            ok = self.send(mask, node.tx_address)
+            done = time.monotonic()
+            if __debug__ and metricas.ATIVO:
+                metricas.tx_escrita.observe(done - t_tx)
+            with self._cond:
+                if ok:
+                    node.acked += 1
+                    node.mask = mask
+                    node.latencies.append(done - t_rx)
+                    if __debug__ and metricas.ATIVO:
+                        metricas.rx_ack.observe(done - t_rx)
+                elif attempts + 1 >= self.max_attempts or done + self.backoff > deadline:
+                    node.misses += 1
+                    if __debug__ and metricas.ATIVO:
+                        metricas.tx_falhas.inc()
+                elif not any(job[2] == pipe for job in self._heap):
+                    # Tenta de novo depois dos prazos mais urgentes
+                    self._seq += 1
+                    heapq.heappush(self._heap, (deadline, self._seq, pipe, mask, t_rx, attempts + 1))
+                    if __debug__ and metricas.ATIVO:
+                        metricas.tx_retentativas.inc()
+            if not ok:
+                time.sleep(self.backoff)
+
+    def start(self):
+        self.running = True
+        self.tx_thread = threading.Thread(target=self._tx_loop, daemon=True)
+        self.tx_thread.start()
+        # Lote inteiro de cada despertar vai para o cálculo vetorizado
+        self.engine = recepcao.ReceiveEngine(reader=comunicacao.get_all_data_pipes, on_batch=self.on_samples)
+        self.rx_thread = threading.Thread(target=self.engine.run, daemon=True)
+        self.rx_thread.start()
+
+    def stop(self):
+        self.running = False
+        self.engine.stop()
+        with self._cond:
+            self._cond.notify_all()
+
+    def stats(self):
+        return [node.stats() for node in sorted(self.nodes.values(), key=lambda n: n.node_id)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nos", default=os.path.join(comunicacao.BASE_DIR, "hub_nos.json"),
+                        help="tabela de nós (JSON)")
+    parser.add_argument("--intervalo", type=float, default=30.0, help="intervalo entre relatórios (s)")
+    args = parser.parse_args()
+
+    if metricas.ATIVO:
+        metricas.iniciar()
+    hub = Hub(load_nodes(args.nos))
+    hub.setup()
+    hub.start()
+    try:
+        while True:
+            time.sleep(args.intervalo)
+            for s in hub.stats():
+                print(s)
+    except KeyboardInterrupt:
+        hub.stop()
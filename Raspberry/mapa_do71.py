@@ -0,0 +1,151 @@
+"""
+Mapa de registradores da sonda Yokogawa DO71/DO72
+-------------------------------------------------
+- Endereços, tipos, unidades e valores padrão em uma única tabela (MAPA)
+- Endereço = endereço do PDU Modbus, o mesmo usado pelo firmware (sensor.cpp)
+- Ordem das palavras/bytes configurável: ABCD, CDAB (padrão da sonda), BADC, DCBA
+- Conversão de um valor (struct) ou de blocos inteiros de registradores
+  (numpy.frombuffer), ex.: os 3000 registradores do simulador em uma chamada
+
+Usado pelo simulador (yokogawa_do71.py) e pelos clientes Modbus em Python.
+"""
+
+import struct
+from typing import NamedTuple, Optional
+import numpy as np
+
+# Bloco de holding registers exposto pelo simulador (endereços do PDU)
+BLOCO_INICIO = 2000
+BLOCO_TAMANHO = 3000
+
+# Posição de cada byte do valor big endian (A = mais significativo) nos registradores
+ORDENS = {
+    "ABCD": (0, 1, 2, 3),
+    "CDAB": (2, 3, 0, 1),
+    "BADC": (1, 0, 3, 2),
+    "DCBA": (3, 2, 1, 0),
+}
+ORDEM_PADRAO = "CDAB"
+
+# Tipo → (formato struct big endian, nº de registradores, dtype numpy)
+TIPOS = {
+    "uint16": (">H", 1, ">u2"),
+    "int16": (">h", 1, ">i2"),
+    "uint32": (">I", 2, ">u4"),
+    "int32": (">i", 2, ">i4"),
+    "float32": (">f", 2, ">f4"),
+}
+
+
+class Registro(NamedTuple):
+    nome: str
+    endereco: int
+    tipo: str
+    unidade: Optional[str] = None
+    padrao: float = 0
+    descricao: str = ""
+
+    @property
+    def tamanho(self):
+        return TIPOS[self.tipo][1]
+
+
+MAPA = {r.nome: r for r in (
+    Registro("unidade_o2", 2089, "uint16", padrao=0x0080, descricao="Unidade de O2 (0x0080 = mg/L)"),
+    Registro("o2", 2091, "float32", "mg/L", descricao="Oxigênio dissolvido"),
+    Registro("unidade_temp", 2409, "uint16", padrao=0x0004, descricao="Unidade de temperatura (0x0004 = °C)"),
+    Registro("temperatura", 2411, "float32", "°C", descricao="Temperatura"),
+    Registro("intervalo", 3499, "uint16", "s", padrao=1, descricao="Intervalo de atualização"),
+    Registro("id", 4095, "uint16", padrao=1, descricao="Endereço Modbus do dispositivo"),
+    Registro("baud", 4101, "uint16", padrao=0x0004, descricao="Baud rate (0x0004 = 19200)"),
+)}
+
+
+class Codec:
+    """Conversão entre valores e registradores de 16 bits para uma ordem de bytes."""
+
+    def __init__(self, ordem=ORDEM_PADRAO):
+        if ordem not in ORDENS:
+            raise ValueError(f"Ordem {ordem!r} inválida; use {', '.join(ORDENS)}")
+        self.ordem = ordem
+        self._perm = list(ORDENS[ordem])
+        self._struct = {tipo: struct.Struct(fmt) for tipo, (fmt, _, _) in TIPOS.items()}
+        self._regs2 = struct.Struct(">HH")
+
+    # -------- Um valor (struct) --------
+    def encode(self, tipo, valor):
+        """Valor → lista de registradores."""
+        if TIPOS[tipo][1] == 1:
+            return [self._struct["uint16"].unpack(self._struct[tipo].pack(valor))[0]]
+        raw = self._struct[tipo].pack(valor)
+        return list(self._regs2.unpack(bytes(raw[i] for i in self._perm)))
+
+    def decode(self, tipo, regs):
+        """Lista de registradores → valor."""
+        if TIPOS[tipo][1] == 1:
+            return self._struct[tipo].unpack(self._struct["uint16"].pack(regs[0]))[0]
+        wire = self._regs2.pack(regs[0], regs[1])
+        raw = bytearray(4)
+        for pos, i in enumerate(self._perm):
+            raw[i] = wire[pos]
+        return self._struct[tipo].unpack(raw)[0]
+
+    # -------- Vários valores (numpy) --------
+    def encode_array(self, tipo, valores):
+        """Array de valores → array uint16 de registradores (2 por valor em tipos de 32 bits)."""
+        _, n, dtype = TIPOS[tipo]
+        raw = np.asarray(valores).astype(dtype)
+        if n == 1:
+            return raw.view(">u2").astype(np.uint16)
+        wire = raw.view(np.uint8).reshape(-1, 4)[:, self._perm]
+        return np.ascontiguousarray(wire).view(">u2").astype(np.uint16).reshape(-1)
+
+    def decode_array(self, tipo, regs):
+        """Array de registradores → array de valores (dtype nativo)."""
+        _, n, dtype = TIPOS[tipo]
+        wire = np.asarray(regs, dtype=np.uint16).astype(">u2").view(np.uint8)
+        if n == 1:
+            return wire.view(dtype).astype(dtype[1:])
+        raw = np.empty((len(wire) // 4, 4), np.uint8)
+        raw[:, self._perm] = wire.reshape(-1, 4)
+        return raw.reshape(-1).view(dtype).astype(dtype[1:])
+
+    # -------- Bloco de registradores --------
+    def encode_bloco(self, valores=None, inicio=BLOCO_INICIO, tamanho=BLOCO_TAMANHO, mapa=MAPA):
+        """Monta o bloco de registradores [inicio, inicio+tamanho) com os padrões do mapa
+        e os valores informados ({nome: valor})."""
+        bloco = np.zeros(tamanho, np.uint16)
+        valores = valores or {}
+        for r in mapa.values():
+            pos = r.endereco - inicio
+            if 0 <= pos and pos + r.tamanho <= tamanho:
+                bloco[pos:pos + r.tamanho] = self.encode(r.tipo, valores.get(r.nome, r.padrao))
+        return bloco
+
+    def decode_bloco(self, regs, inicio=BLOCO_INICIO, mapa=MAPA):
+        """Lê do bloco todos os registros do mapa que ele contém → {nome: valor}."""
+        regs = np.asarray(regs, dtype=np.uint16)
+        valores = {}
+        for r in mapa.values():
+            pos = r.endereco - inicio
+            if 0 <= pos and pos + r.tamanho <= len(regs):
+                valores[r.nome] = self.decode(r.tipo, regs[pos:pos + r.tamanho].tolist())
+        return valores
+
+    def floats_bloco(self, regs):
+        """Interpreta um bloco inteiro como floats consecutivos (snapshot em uma chamada)."""
+        return self.decode_array("float32", regs)
+
+
+# ==================== BYTES NO BARRAMENTO ====================
+def regs_to_bytes(regs):
+    """Registradores → bytes do campo de dados Modbus (big endian por registrador)."""
+    return np.asarray(regs, dtype=np.uint16).astype(">u2").tobytes()
+
+
+def bytes_to_regs(data):
+    """Bytes do campo de dados Modbus → array uint16 de registradores."""
+    return np.frombuffer(data, dtype=">u2").astype(np.uint16)
+
+
+codec = Codec()
@@ -0,0 +1,70 @@
+"""
+Motor de máscaras vetorizado
+----------------------------
+- Avalia um lote de leituras (viveiro, O2) contra uma matriz de limiares
+  (viveiros × aeradores) em uma única operação NumPy
+- Mesma regra de comunicacao.calculate_mask(): O2 arredondado a 2 casas,
+  aerador ligado se O2 <= limiar, OR com a máscara manual
+- Máscaras de vários bytes (bit i = aerador i, little endian), sem limite de 8 aeradores
+- Limiar NaN = aerador inexistente naquele viveiro
+"""
+
+import numpy as np
+
+
+def mask_bytes(n_aeradores):
+    """Bytes necessários para a máscara de n aeradores (mínimo 1)."""
+    return max(1, (n_aeradores + 7) // 8)
+
+
+def round2(values):
+    """round(x, 2) do Python, vetorizado.
+
+    np.round() multiplica por 100 antes de arredondar e pode divergir do
+    arredondamento exato do Python em valores como 2.675; os casos ambíguos
+    (parte fracionária muito perto de 0,5) são refeitos com round()."""
+    values = np.asarray(values, dtype=np.float64)
+    scaled = values * 100.0
+    result = np.rint(scaled) / 100.0
+    ambiguous = np.abs(np.abs(scaled - np.floor(scaled)) - 0.5) < 1e-6
+    if ambiguous.any():
+        idx = np.flatnonzero(ambiguous)
+        flat = result.reshape(-1)
+        src = values.reshape(-1)
+        flat[idx] = [round(float(src[i]), 2) for i in idx]
+    return result
+
+
+def calculate_masks(o2_values, thresholds, manual_masks=None):
+    """Calcula as máscaras de um lote de viveiros.
+
+    - o2_values: (P,) leituras de oxigênio
+    - thresholds: (P, N) limiares por viveiro, ou (N,) comuns a todos
+    - manual_masks: (P, B) bytes das máscaras manuais, (B,) comum, ou None
+    Retorna (final, auto), ambos (P, B) uint8, com B = mask_bytes(N)."""
+    o2 = round2(o2_values)
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    n = thresholds.shape[-1]
+    nbytes = mask_bytes(n)
+    bits = o2[:, None] <= thresholds  # NaN compara como False
+    if n % 8:
+        bits = np.pad(np.broadcast_to(bits, (len(o2), n)), ((0, 0), (0, 8 * nbytes - n)))
+    auto = np.packbits(bits, axis=1, bitorder="little")
+    if manual_masks is None:
+        return auto.copy(), auto
+    manual = np.asarray(manual_masks, dtype=np.uint8)
+    if manual.shape[-1] < nbytes:
+        manual = np.pad(manual, [(0, 0)] * (manual.ndim - 1) + [(0, nbytes - manual.shape[-1])])
+    return auto | manual[..., :nbytes], auto
+
+
+def ints_to_masks(masks, n_aeradores):
+    """Converte máscaras inteiras do Python em uma matriz (P, B) uint8."""
+    nbytes = mask_bytes(n_aeradores)
+    return np.frombuffer(b"".join(int(m).to_bytes(nbytes, "little") for m in masks),
+                         dtype=np.uint8).reshape(-1, nbytes)
+
+
+def masks_to_ints(masks):
+    """Converte uma matriz (P, B) uint8 de volta em inteiros do Python."""
+    return [int.from_bytes(row.tobytes(), "little") for row in np.asarray(masks, dtype=np.uint8)]
@@ -0,0 +1,185 @@
+"""
+Métricas de latência ponta a ponta e contadores
+-----------------------------------------------
+- Carimbos time.monotonic() em cada etapa: leitura do rádio (get_frames) →
+  máscara calculada → ACK da máscara → status na tela
+- Histogramas de baldes fixos e contadores sem lock: cada thread escreve na
+  sua própria fatia ({thread: contagens}); a leitura soma as fatias
+- Exposição em texto Prometheus (http://127.0.0.1:9108/metrics) e em uma
+  linha de log periódica
+
+Ativação: AERACAO_METRICAS=1 (porta em AERACAO_METRICAS_PORTA, 0 = sem HTTP;
+intervalo do log em AERACAO_METRICAS_LOG, s). Os ganchos são escritos como
+`if __debug__ and metricas.ATIVO:`; com python -O o bloco nem é compilado.
+"""
+
+import bisect, os, threading, time
+
+ATIVO = __debug__ and os.environ.get("AERACAO_METRICAS", "") not in ("", "0")
+PORTA = int(os.environ.get("AERACAO_METRICAS_PORTA", "9108"))
+LOG_INTERVALO = float(os.environ.get("AERACAO_METRICAS_LOG", "60"))
+
+# Limites superiores dos baldes (s): 100 µs a 10 s
+BALDES = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+          0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Contador:
+    """Contador monotônico; inc() não usa lock (uma fatia por thread)."""
+
+    def __init__(self, nome, ajuda):
+        self.nome = nome
+        self.ajuda = ajuda
+        self._fatias = {}
+
+    def inc(self, n=1):
+        fatia = self._fatias.get(threading.get_ident())
+        if fatia is None:
+            fatia = self._fatias[threading.get_ident()] = [0]
+        fatia[0] += n
+
+    def valor(self):
+        return sum(f[0] for f in list(self._fatias.values()))
+
+    def prometheus(self):
+        return [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} counter",
+                f"{self.nome} {self.valor()}"]
+
+
+class Histograma:
+    """Histograma de baldes fixos; observe() não usa lock (uma fatia por thread)."""
+
+    def __init__(self, nome, ajuda, baldes=BALDES):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.baldes = baldes
+        self._fatias = {}
+
+    def observe(self, valor):
+        fatia = self._fatias.get(threading.get_ident())
+        if fatia is None:
+            # Contagem por balde (+ um para acima do último), soma
+            fatia = self._fatias[threading.get_ident()] = [[0] * (len(self.baldes) + 1), 0.0]
+        fatia[0][bisect.bisect_left(self.baldes, valor)] += 1
+        fatia[1] += valor
+
+    def snapshot(self):
+        """(contagens por balde, soma) somando as fatias de todas as threads."""
+        contagens = [0] * (len(self.baldes) + 1)
+        soma = 0.0
+        for por_balde, s in list(self._fatias.values()):
+            for i, c in enumerate(por_balde):
+                contagens[i] += c
+            soma += s
+        return contagens, soma
+
+    def quantil(self, q, contagens=None):
+        """Limite superior do balde que contém o quantil q (None sem observações)."""
+        contagens = contagens or self.snapshot()[0]
+        total = sum(contagens)
+        if not total:
+            return None
+        alvo, acumulado = q * total, 0
+        for i, c in enumerate(contagens):
+            acumulado += c
+            if acumulado >= alvo:
+                return self.baldes[i] if i < len(self.baldes) else float("inf")
+
+    def prometheus(self):
+        contagens, soma = self.snapshot()
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} histogram"]
+        acumulado = 0
+        for limite, c in zip(self.baldes, contagens):
+            acumulado += c
+            linhas.append(f'{self.nome}_bucket{{le="{limite}"}} {acumulado}')
+        acumulado += contagens[-1]
+        linhas += [f'{self.nome}_bucket{{le="+Inf"}} {acumulado}',
+                   f"{self.nome}_sum {soma:.6f}", f"{self.nome}_count {acumulado}"]
+        return linhas
+
+
+# ==================== MÉTRICAS DO SISTEMA ====================
+rx_mascara = Histograma("aeracao_rx_mascara_segundos", "Leitura do radio ate a mascara calculada")
+rx_ack = Histograma("aeracao_rx_ack_segundos", "Leitura do radio ate o ACK da mascara")
+rx_tela = Histograma("aeracao_rx_tela_segundos", "Leitura do radio ate o status desenhado na tela")
+tx_escrita = Histograma("aeracao_tx_escrita_segundos", "Duracao de cada escrita da mascara no radio")
+amostras = Contador("aeracao_amostras_total", "Amostras aceitas do radio")
+descartadas = Contador("aeracao_amostras_descartadas_total",
+                       "Amostras perdidas (FIFO cheia, duplicadas ou atrasadas)")
+tx_retentativas = Contador("aeracao_tx_retentativas_total", "Reenvios de mascara apos falta de ACK")
+tx_falhas = Contador("aeracao_tx_falhas_total", "Mascaras nao entregues apos todas as tentativas")
+config_gravacoes = Contador("aeracao_config_gravacoes_total", "Gravacoes da configuracao em disco")
+
+HISTOGRAMAS = (rx_mascara, rx_ack, rx_tela, tx_escrita)
+CONTADORES = (amostras, descartadas, tx_retentativas, tx_falhas, config_gravacoes)
+
+# Instante da última leitura do rádio (escrito só pela thread de recepção)
+t_rx = 0.0
+
+
+def marca_rx():
+    global t_rx
+    t_rx = time.monotonic()
+
+
+def prometheus():
+    """Todas as métricas no formato de texto do Prometheus."""
+    linhas = []
+    for m in HISTOGRAMAS + CONTADORES:
+        linhas += m.prometheus()
+    return "\n".join(linhas) + "\n"
+
+
+def linha_log():
+    """Resumo de uma linha: p50/p99 (ms) de cada etapa e os contadores."""
+    partes = []
+    for h in HISTOGRAMAS:
+        contagens = h.snapshot()[0]
+        p50, p99 = h.quantil(0.5, contagens), h.quantil(0.99, contagens)
+        nome = h.nome[len("aeracao_"):-len("_segundos")]
+        partes.append(f"{nome} p50≤{p50 * 1000:g} p99≤{p99 * 1000:g} ms" if p50 is not None
+                      else f"{nome} --")
+    partes += [f"{c.nome[len('aeracao_'):-len('_total')]}={c.valor()}" for c in CONTADORES]
+    return "Métricas: " + " | ".join(partes)
+
+
+# ==================== EXPOSIÇÃO ====================
+def _servidor(host, porta):
+    # http.server só é importado com o endpoint ligado (custa dezenas de ms na inicialização)
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class _Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            corpo = prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+
+        def log_message(self, format, *args):
+            pass  # Sem uma linha de log por coleta
+
+    return ThreadingHTTPServer((host, porta), _Handler)
+
+
+def _log_loop(intervalo):
+    while True:
+        time.sleep(intervalo)
+        print(linha_log(), flush=True)
+
+
+def iniciar(porta=PORTA, intervalo=LOG_INTERVALO, host="127.0.0.1"):
+    """Sobe o endpoint HTTP e o log periódico em threads daemon; retorna o servidor (ou None)."""
+    servidor = None
+    if porta:
+        servidor = _servidor(host, porta)
+        servidor.daemon_threads = True
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        print(f"Métricas em http://{host}:{servidor.server_address[1]}/metrics")
+    if intervalo > 0:
+        threading.Thread(target=_log_loop, args=(intervalo,), daemon=True).start()
+    return servidor
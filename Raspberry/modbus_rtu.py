@@ -0,0 +1,393 @@
+"""
+Mestre Modbus RTU (asyncio) para as sondas DO71/DO72
+----------------------------------------------------
+- Planeja as leituras juntando registradores próximos em poucas requisições
+  (mapa de registradores em mapa_do71.py)
+- Fim de quadro e silêncio entre quadros (t3.5) calculados a partir do baud rate,
+  sem atrasos fixos
+- Varre vários escravos em sequência: os quadros de requisição ficam prontos
+  (com CRC) e a próxima requisição sai logo após o t3.5 da resposta anterior;
+  a decodificação acontece enquanto o barramento já atende o próximo escravo
+- Mede amostras/s, ocupação do barramento e quantas sondas cabem na linha
+- Com --simulador --falhas, o simulador injeta falhas nas respostas e as
+  estatísticas dos dois lados saem juntas (pior resposta × timeout)
+
+Uso:
+    python modbus_rtu.py --porta /dev/ttyUSB0 --escravos 1 2 3 --periodo 1
+    python modbus_rtu.py --simulador --escravos 1 2 3 4 --duracao 10
+    python modbus_rtu.py --simulador --duracao 60 --periodo 0.2 --falhas pior --timeout 0.8
+"""
+
+import argparse, asyncio, os, signal, struct, sys, time
+import mapa_do71
+
+FUNC_READ_HOLDING = 0x03
+MAX_REGISTERS = 125  # Limite do protocolo por requisição da função 3
+REQUEST = struct.Struct(">BBHH")
+
+
+# ==================== CRC E TEMPORIZAÇÃO ====================
+def _crc_table():
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+        table.append(crc)
+    return table
+
+_CRC_TABLE = _crc_table()
+
+
+def crc16(data):
+    """CRC-16 Modbus (polinômio 0xA001, valor inicial 0xFFFF)."""
+    crc = 0xFFFF
+    for byte in data:
+        crc = (crc >> 8) ^ _CRC_TABLE[(crc ^ byte) & 0xFF]
+    return crc
+
+
+def char_time(baud, bits_per_char=11):
+    """Duração de um caractere (1 início + 8 dados + paridade/parada = 11 bits)."""
+    return bits_per_char / baud
+
+
+def t35(baud, bits_per_char=11):
+    """Silêncio de fim de quadro; acima de 19200 bps a norma fixa 1,75 ms."""
+    return 1.75e-3 if baud > 19200 else 3.5 * char_time(baud, bits_per_char)
+
+
+# ==================== PLANEJAMENTO ====================
+def merge_gap(baud, turnaround=0.005, bits_per_char=11):
+    """Maior lacuna (em registradores) que ainda compensa ler junto.
+
+    Uma requisição a mais custa 8 bytes de pedido, 5 de cabeçalho/CRC na
+    resposta, dois silêncios t3.5 e o tempo de resposta da sonda; cada
+    registrador da lacuna custa 2 bytes."""
+    c = char_time(baud, bits_per_char)
+    overhead = (8 + 5) * c + 2 * t35(baud, bits_per_char) + turnaround
+    return int(overhead / (2 * c))
+
+
+def plan_reads(registros, max_gap=0, max_count=MAX_REGISTERS):
+    """Agrupa registros (mapa_do71.Registro) em intervalos [(início, quantidade)]."""
+    spans = []
+    for r in sorted(registros, key=lambda r: r.endereco):
+        end = r.endereco + r.tamanho
+        if spans:
+            start, count = spans[-1]
+            if r.endereco - (start + count) <= max_gap and end - start <= max_count:
+                spans[-1] = (start, max(count, end - start))
+                continue
+        spans.append((r.endereco, r.tamanho))
+    return spans
+
+
+class ModbusError(Exception):
+    pass
+
+
+class ModbusTimeout(ModbusError):
+    pass
+
+
+# ==================== MESTRE ====================
+class ModbusRtuMaster:
+    """Mestre Modbus RTU sobre uma porta serial (ou pty), uma transação por vez.
+
+    `port` é o caminho da porta (aberta pelo pyserial) ou um descritor já aberto,
+    como o lado mestre de um par pty."""
+
+    def __init__(self, port, baud=19200, parity="N", stopbits=2, timeout=0.5, bits_per_char=11):
+        if isinstance(port, int):
+            self.serial = None
+            self.fd = port
+            os.set_blocking(port, False)
+        else:
+            import serial
+            self.serial = serial.Serial(port, baud, parity=parity, stopbits=stopbits, timeout=0)
+            self.fd = self.serial.fileno()
+        self.baud = baud
+        self.timeout = timeout  # Tempo máximo de resposta da sonda
+        self.char = char_time(baud, bits_per_char)
+        self.silence = t35(baud, bits_per_char)
+        self._rx = bytearray()
+        self._rx_event = None
+        self._last_byte = 0.0  # Instante do último byte no barramento
+        self._first_byte = 0.0  # Instante do primeiro byte da resposta
+        self._lock = None
+        # Estatísticas
+        self.transactions = 0
+        self.timeouts = 0
+        self.crc_errors = 0
+        self.exceptions = 0
+        self.bytes_tx = 0
+        self.bytes_rx = 0
+        self.busy_time = 0.0  # Do início do pedido ao fim da resposta + t3.5
+        self.response_time = 0.0
+        self.response_max = 0.0
+
+    def _on_readable(self):
+        try:
+            data = os.read(self.fd, 256)
+        except BlockingIOError:
+            return
+        if data:
+            self._last_byte = time.monotonic()
+            if not self._rx:
+                self._first_byte = self._last_byte
+            self._rx += data
+            self._rx_event.set()
+
+    async def open(self):
+        loop = asyncio.get_running_loop()
+        self._rx_event = asyncio.Event()
+        self._lock = asyncio.Lock()
+        loop.add_reader(self.fd, self._on_readable)
+
+    def close(self):
+        try:
+            asyncio.get_running_loop().remove_reader(self.fd)
+        except RuntimeError:
+            pass
+        if self.serial is not None:
+            self.serial.close()
+
+    @staticmethod
+    def request_frame(slave, address, count, function=FUNC_READ_HOLDING):
+        body = REQUEST.pack(slave, function, address, count)
+        return body + struct.pack("<H", crc16(body))
+
+    async def _wait_idle(self):
+        """Respeita o silêncio t3.5 desde o último byte no barramento."""
+        wait = self._last_byte + self.silence - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    async def transact(self, frame, expected):
+        """Envia um quadro pronto e retorna a resposta completa (com CRC conferido)."""
+        async with self._lock:
+            await self._wait_idle()
+            self._rx.clear()
+            self._rx_event.clear()
+            t0 = time.monotonic()
+            os.write(self.fd, frame)
+            tx_end = t0 + len(frame) * self.char  # Fim da transmissão no fio
+            self.bytes_tx += len(frame)
+            self.transactions += 1
+            deadline = tx_end + self.timeout
+            try:
+                while True:
+                    # Resposta de exceção tem 5 bytes; a normal, `expected`
+                    if len(self._rx) >= 5 and self._rx[1] & 0x80 or len(self._rx) >= expected:
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.timeouts += 1
+                        raise ModbusTimeout(f"Sem resposta do escravo {frame[0]}")
+                    try:
+                        await asyncio.wait_for(self._rx_event.wait(), remaining)
+                    except asyncio.TimeoutError:
+                        continue
+                    self._rx_event.clear()
+            except ModbusTimeout:
+                self._last_byte = max(self._last_byte, deadline)
+                self.busy_time += self._last_byte + self.silence - t0
+                raise
+            response = bytes(self._rx[:5] if self._rx[1] & 0x80 else self._rx[:expected])
+            # Do pedido ao primeiro byte da resposta; na porta serial desconta a
+            # transmissão do pedido no fio (num pty os bytes chegam na hora)
+            rx_time = len(response) * self.char
+            response_time = max(0.0, self._first_byte - (t0 if self.serial is None else tx_end))
+            self.response_time += response_time
+            self.response_max = max(self.response_max, response_time)
+            self._last_byte = max(self._last_byte, tx_end + rx_time)
+            self.busy_time += self._last_byte + self.silence - t0
+            self.bytes_rx += len(response)
+        if crc16(response[:-2]) != struct.unpack("<H", response[-2:])[0]:
+            self.crc_errors += 1
+            raise ModbusError(f"CRC inválido na resposta do escravo {frame[0]}")
+        if response[0] != frame[0]:
+            raise ModbusError(f"Resposta do escravo {response[0]}, esperado {frame[0]}")
+        if response[1] & 0x80:
+            self.exceptions += 1
+            raise ModbusError(f"Exceção Modbus {response[2]} do escravo {frame[0]}")
+        return response
+
+    async def read_holding(self, slave, address, count):
+        """Função 3: lê `count` registradores a partir de `address`."""
+        response = await self.transact(self.request_frame(slave, address, count), 5 + 2 * count)
+        return mapa_do71.bytes_to_regs(response[3:3 + response[2]])
+
+    def stats(self, elapsed):
+        bytes_time = (self.bytes_tx + self.bytes_rx) * self.char
+        return {
+            "transacoes": self.transactions,
+            "timeouts": self.timeouts,
+            "erros_crc": self.crc_errors,
+            "excecoes": self.exceptions,
+            "ocupacao_barramento": round(self.busy_time / elapsed, 4) if elapsed else 0.0,
+            "ocupacao_bytes": round(bytes_time / elapsed, 4) if elapsed else 0.0,
+            "resposta_ms_media": round(self.response_time / self.transactions * 1000, 2)
+            if self.transactions else None,
+            "resposta_ms_max": round(self.response_max * 1000, 2),
+        }
+
+
+# ==================== VARREDURA ====================
+class Poller:
+    """Lê periodicamente os registros de vários escravos e entrega {nome: valor}."""
+
+    def __init__(self, master, slaves, nomes=("o2", "temperatura"), period=1.0, callback=None,
+                 max_gap=None, codec=None):
+        self.master = master
+        self.slaves = list(slaves)
+        self.period = period
+        self.callback = callback
+        self.codec = codec or mapa_do71.codec
+        self.registros = [mapa_do71.MAPA[n] for n in nomes]
+        gap = merge_gap(master.baud) if max_gap is None else max_gap
+        self.spans = plan_reads(self.registros, gap)
+        # Quadros de requisição prontos (com CRC) para cada escravo e intervalo
+        self.frames = {(s, start): ModbusRtuMaster.request_frame(s, start, count)
+                       for s in self.slaves for start, count in self.spans}
+        self.running = False
+        # Estatísticas
+        self.samples = 0
+        self.failures = 0
+        self.cycles = 0
+        self.cycle_time = 0.0
+        self.last = {}
+
+    def _decode(self, slave, blocks):
+        values = {}
+        for start, regs in blocks:
+            values.update(self.codec.decode_bloco(regs, start, {r.nome: r for r in self.registros}))
+        self.samples += 1
+        self.last[slave] = values
+        if self.callback is not None:
+            self.callback(slave, values)
+
+    async def poll_once(self):
+        """Uma varredura de todos os escravos."""
+        t0 = time.monotonic()
+        loop = asyncio.get_running_loop()
+        pending = None
+        for slave in self.slaves:
+            blocks = []
+            try:
+                for start, count in self.spans:
+                    response = await self.master.transact(self.frames[(slave, start)], 5 + 2 * count)
+                    blocks.append((start, mapa_do71.bytes_to_regs(response[3:3 + response[2]])))
+            except ModbusError as e:
+                self.failures += 1
+                print(f"Modbus -> {e}")
+                continue
+            # Decodifica o escravo anterior enquanto a próxima requisição já está no fio
+            if pending is not None:
+                self._decode(*pending)
+            pending = (slave, blocks)
+            await asyncio.sleep(0)
+        if pending is not None:
+            loop.call_soon(self._decode, *pending)
+        self.cycles += 1
+        self.cycle_time += time.monotonic() - t0
+
+    async def run(self, duration=None):
+        self.running = True
+        start = time.monotonic()
+        next_cycle = start
+        while self.running and (duration is None or time.monotonic() - start < duration):
+            await self.poll_once()
+            next_cycle += self.period
+            wait = next_cycle - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            else:
+                next_cycle = time.monotonic()  # Varredura maior que o período
+        await asyncio.sleep(0)
+
+    def stats(self, elapsed):
+        per_slave = self.cycle_time / self.cycles / len(self.slaves) if self.cycles else None
+        return {
+            "escravos": len(self.slaves),
+            "requisicoes_por_escravo": len(self.spans),
+            "intervalos": self.spans,
+            "amostras": self.samples,
+            "falhas": self.failures,
+            "amostras_s": round(self.samples / elapsed, 2) if elapsed else 0.0,
+            "varredura_ms_media": round(self.cycle_time / self.cycles * 1000, 2) if self.cycles else None,
+            # Quantas sondas cabem no período, a partir do tempo médio por sonda
+            "max_sondas_no_periodo": int(self.period / per_slave) if per_slave else None,
+        }
+
+
+def start_simulator(*args):
+    """Sobe o yokogawa_do71.py em um par pty e retorna (processo, descritor do lado mestre)."""
+    import subprocess, tty
+    master_fd, slave_fd = os.openpty()
+    tty.setraw(master_fd)
+    tty.setraw(slave_fd)
+    script = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "yokogawa_do71.py")
+    proc = subprocess.Popen([sys.executable, script, "--porta", os.ttyname(slave_fd), *args],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    os.close(slave_fd)
+    return proc, master_fd
+
+
+async def _main(args):
+    sim = None
+    port = args.porta
+    falhas_json = None
+    if args.simulador:
+        extra = []
+        if args.falhas:
+            import tempfile
+            falhas_json = os.path.join(tempfile.mkdtemp(prefix="falhas"), "falhas.json")
+            extra = ["--falhas", args.falhas, "--falhas-json", falhas_json]
+            if args.falhas_seed is not None:
+                extra += ["--falhas-seed", str(args.falhas_seed)]
+        sim, port = start_simulator("--cenario", "diurno", "--velocidade", "60", "--servidor", "asyncio",
+                                    "--escravos", ",".join(map(str, args.escravos)), *extra)
+        await asyncio.sleep(1.5)  # Tempo de subida do servidor pymodbus
+    master = ModbusRtuMaster(port, args.baud, timeout=args.timeout)
+    await master.open()
+    show = (lambda s, v: print(f"Escravo {s}: " + ", ".join(f"{k}={x:.2f}" for k, x in v.items()))) \
+        if args.verbose else None
+    poller = Poller(master, args.escravos, args.registros, period=args.periodo, callback=show)
+    t0 = time.monotonic()
+    try:
+        await poller.run(args.duracao)
+    finally:
+        elapsed = time.monotonic() - t0
+        master.close()
+        if sim is not None:
+            sim.send_signal(signal.SIGINT)  # O simulador grava as estatísticas de falhas ao sair
+            sim.wait(5)
+    print(poller.stats(elapsed))
+    print(master.stats(elapsed))
+    if falhas_json is not None and os.path.exists(falhas_json):
+        import json
+        with open(falhas_json) as f:
+            print(json.load(f))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--porta", default="/dev/ttyUSB0", help="porta serial do adaptador RS-485")
+    parser.add_argument("--baud", type=int, default=19200)
+    parser.add_argument("--escravos", type=int, nargs="+", default=[1], help="endereços Modbus das sondas")
+    parser.add_argument("--registros", nargs="+", default=["o2", "temperatura"], choices=sorted(mapa_do71.MAPA),
+                        help="registros lidos de cada sonda (nomes do mapa_do71)")
+    parser.add_argument("--periodo", type=float, default=1.0, help="intervalo entre varreduras (s)")
+    parser.add_argument("--duracao", type=float, default=None, help="tempo de execução (s)")
+    parser.add_argument("--timeout", type=float, default=0.5, help="tempo máximo de resposta (s)")
+    parser.add_argument("--simulador", action="store_true", help="usa o yokogawa_do71.py em um par pty")
+    parser.add_argument("--falhas", help="com --simulador, perfil ou regras de falhas (ver yokogawa_falhas.py)")
+    parser.add_argument("--falhas-seed", type=int, help="semente do sorteio das falhas")
+    parser.add_argument("-v", "--verbose", action="store_true", help="mostra cada leitura")
+    args = parser.parse_args()
+    try:
+        asyncio.run(_main(args))
+    except KeyboardInterrupt:
+        pass
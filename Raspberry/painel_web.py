@@ -0,0 +1,356 @@
+"""
+Painel web do sistema de aeração
+--------------------------------
+- Serviço HTTP assíncrono (asyncio puro) cliente do controlador (controlador.py):
+  uma única conexão ao socket Unix alimenta todos os navegadores, sem tocar no
+  rádio nem no laço de decisão
+- GET /eventos: Server-Sent Events; cada mensagem é formatada uma vez e vai
+  para um buffer circular compartilhado (fan-out); Last-Event-ID retoma de onde
+  o navegador parou, ou recebe o estado completo se ficou para trás demais
+- GET /estado: snapshot JSON em cache com ETag (304 se não mudou)
+- GET /historico?janela=86400&pontos=300: histórico reduzido (mín/máx/média)
+  do log de telemetria, em cache por janela alinhada, com ETag
+- POST /config {"limiares": [...], "manual": m}: repassado ao controlador, que
+  grava pelo mesmo caminho de comunicacao.save_config() (AERACAO_WEB_TOKEN, se
+  definido, é exigido no cabeçalho Authorization: Bearer)
+- Escuta só em 127.0.0.1 por padrão; com --host de rede e sem AERACAO_WEB_TOKEN
+  o painel fica somente leitura (POST /config responde 403)
+- POST /config exige Content-Type: application/json e recusa Origin de outro
+  site e, em 127.0.0.1, Host que não seja local (CSRF e DNS rebinding)
+
+Uso: python painel_web.py --porta 8080
+     AERACAO_WEB_TOKEN=... python painel_web.py --host 0.0.0.0
+"""
+
+import argparse, asyncio, hashlib, json, os, time
+from collections import deque
+from urllib.parse import parse_qs, urlsplit
+import comunicacao
+import controlador
+
+TOKEN = os.environ.get("AERACAO_WEB_TOKEN")
+BUFFER_EVENTOS = 256          # Eventos guardados para clientes que reconectam
+LIMITE_BUFFER = 64 * 1024     # Bytes pendentes por navegador antes de desconectá-lo
+KEEPALIVE = 15.0              # Comentário SSE periódico para proxies não fecharem a conexão
+MAX_PONTOS = 2000
+HOSTS_LOCAIS = ("127.0.0.1", "::1", "localhost")
+
+_STATUS = {200: "OK", 202: "Accepted", 304: "Not Modified", 400: "Bad Request", 401: "Unauthorized",
+           403: "Forbidden", 404: "Not Found", 405: "Method Not Allowed", 415: "Unsupported Media Type",
+           503: "Service Unavailable"}
+
+PAGINA = """<!doctype html>
+<html lang="pt-br"><meta charset="utf-8"><title>Aeração</title>
+<style>body{font-family:sans-serif;background:#001F3F;color:#fff;text-align:center}
+b{font-size:2.5em;color:#00ffea}#t{color:#ff8800}.on{color:#00C851}.off{color:#E53935}</style>
+<h1>Painel de Controle</h1>
+<p>Oxigênio <b id="o">--</b> mg/L &nbsp; Temperatura <b id="t">--</b> °C</p>
+<p id="a"></p><p id="l">Enlace: aguardando</p>
+<script>
+const n = () => (window.lim || []).length;
+function aeradores(m) {
+  let h = ""; for (let i = 0; i < n(); i++) { const on = (m >> i) & 1;
+    h += `<span class="${on ? "on" : "off"}">Aerador ${i + 1}: ${on ? "LIGADO" : "DESLIGADO"}</span> `; }
+  document.getElementById("a").innerHTML = h; }
+function amostra(d) { o.textContent = d.o2.toFixed(2); t.textContent = d.temp.toFixed(2); aeradores(d.mascara); }
+const es = new EventSource("/eventos");
+es.addEventListener("estado", e => { const d = JSON.parse(e.data); window.lim = d.limiares; if ("o2" in d) amostra(d); });
+es.addEventListener("config", e => { window.lim = JSON.parse(e.data).limiares; });
+es.addEventListener("amostra", e => amostra(JSON.parse(e.data)));
+es.addEventListener("ack", e => { const d = JSON.parse(e.data);
+  l.textContent = `Enlace: máscara ${d.mascara.toString(2)} ${d.ok ? "confirmada (ACK)" : "sem ACK"}`;
+  l.className = d.ok ? "on" : "off"; });
+</script></html>
+""".encode()
+
+
+def _json(obj):
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+def _etag(data):
+    return '"' + hashlib.blake2b(data, digest_size=8).hexdigest() + '"'
+
+
+# ==================== ESTADO E FAN-OUT ====================
+class Difusor:
+    """Buffer circular de eventos SSE já formatados, compartilhado por todos os clientes."""
+
+    def __init__(self, tamanho=BUFFER_EVENTOS):
+        self.eventos = deque(maxlen=tamanho)  # (id, bytes do evento)
+        self.ultimo_id = 0
+        self._novo = asyncio.Event()
+
+    def publicar(self, tipo, data):
+        self.ultimo_id += 1
+        self.eventos.append((self.ultimo_id, f"id: {self.ultimo_id}\nevent: {tipo}\ndata: ".encode()
+                             + data + b"\n\n"))
+        # Acorda todos os clientes de uma vez; quem chegar depois espera o próximo
+        self._novo.set()
+        self._novo = asyncio.Event()
+
+    def desde(self, ultimo):
+        """Eventos com id > ultimo, ou None se alguns já saíram do buffer (ou o id é desconhecido)."""
+        if ultimo > self.ultimo_id:
+            return None  # Id de antes de o painel reiniciar: o navegador precisa do estado completo
+        if ultimo == self.ultimo_id:
+            return []
+        if ultimo < self.eventos[0][0] - 1:
+            return None
+        return [dados for i, dados in self.eventos if i > ultimo]
+
+    async def esperar(self, timeout):
+        try:
+            await asyncio.wait_for(self._novo.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+class EstadoWeb:
+    """Último estado recebido do controlador, com o JSON e a ETag calculados sob demanda."""
+
+    def __init__(self):
+        self.estado = {}
+        self.conectado = False
+        self.difusor = Difusor()
+        self._json = None
+        self._historico = {}  # (janela, pontos, fim alinhado) → (corpo, etag)
+
+    def aplicar(self, msg):
+        tipo = msg.get("tipo")
+        if tipo == "estado":
+            self.estado = {k: v for k, v in msg.items() if k != "tipo"}
+        elif tipo == "amostra":
+            self.estado.update({k: v for k, v in msg.items() if k != "tipo"})
+        elif tipo == "ack":
+            self.estado.update(ack_mascara=msg["mascara"], ack_ok=msg["ok"])
+        elif tipo == "config":
+            self.estado.update(limiares=msg["limiares"], manual=msg["manual"])
+        else:
+            return
+        self._json = None
+        self.difusor.publicar(tipo, _json({k: v for k, v in msg.items() if k != "tipo"})
+                              if tipo != "estado" else self.snapshot()[0])
+
+    def snapshot(self):
+        if self._json is None:
+            corpo = _json(dict(self.estado, conectado=self.conectado))
+            self._json = (corpo, _etag(corpo))
+        return self._json
+
+    def historico(self, janela, pontos):
+        """Histórico reduzido; o fim é alinhado ao tamanho do intervalo para o cache valer entre clientes."""
+        passo = janela / pontos
+        fim = (time.time() // passo + 1) * passo
+        chave = (janela, pontos, fim)
+        if chave not in self._historico:
+            import telemetria
+            try:
+                ds = telemetria.TelemetryReader(comunicacao.TELEMETRY_FILE).downsample(fim - janela, fim, pontos)
+            except (OSError, ValueError):
+                ds = None
+            dados = {"inicio": fim - janela, "passo": passo}
+            if ds is not None:
+                for nome in ("o2_min", "o2_max", "o2_mean", "temp_mean"):
+                    dados[nome] = [None if x != x else round(x, 3) for x in ds[nome].tolist()]
+                dados["mask"] = ds["mask"].tolist()
+            corpo = _json(dados)
+            if len(self._historico) > 32:
+                self._historico.clear()
+            self._historico[chave] = (corpo, _etag(corpo))
+        return self._historico[chave]
+
+
+# ==================== CONEXÃO COM O CONTROLADOR ====================
+async def acompanhar_controlador(estado, path, comandos):
+    """Mantém a conexão com o controlador, aplicando as mensagens e enviando os comandos da fila."""
+    while True:
+        try:
+            reader, writer = await asyncio.open_unix_connection(path)
+        except OSError:
+            await asyncio.sleep(1.0)
+            continue
+        estado.conectado = True
+        envio = asyncio.create_task(_enviar_comandos(writer, comandos))
+        try:
+            while line := await reader.readline():
+                estado.aplicar(json.loads(line))
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            envio.cancel()
+            writer.close()
+            estado.conectado = False
+            estado._json = None
+        await asyncio.sleep(1.0)
+
+
+async def _enviar_comandos(writer, comandos):
+    while True:
+        cmd = await comandos.get()
+        writer.write(_json(cmd) + b"\n")
+        await writer.drain()
+
+
+# ==================== HTTP ====================
+class PainelWeb:
+    def __init__(self, socket_path=controlador.SOCKET_PATH):
+        self.socket_path = socket_path
+        self.estado = EstadoWeb()
+        self.comandos = asyncio.Queue()
+        self.clientes_sse = 0
+        self.clientes_lentos = 0
+        self.somente_leitura = False
+        self.local = True
+
+    async def start(self, host, porta):
+        # Sem token, alterar a configuração só é aceito de quem já está na máquina
+        self.local = host in HOSTS_LOCAIS
+        self.somente_leitura = not TOKEN and not self.local
+        asyncio.create_task(acompanhar_controlador(self.estado, self.socket_path, self.comandos))
+        self.server = await asyncio.start_server(self._cliente, host, porta)
+        return self.server
+
+    async def _cliente(self, reader, writer):
+        try:
+            linha = await reader.readline()
+            metodo, alvo, _ = linha.decode("latin-1").split(" ", 2)
+            cabecalhos = {}
+            while (h := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                nome, _, valor = h.decode("latin-1").partition(":")
+                cabecalhos[nome.strip().lower()] = valor.strip()
+            url = urlsplit(alvo)
+            if url.path == "/eventos" and metodo == "GET":
+                await self._eventos(writer, cabecalhos)
+                return
+            corpo = await reader.readexactly(int(cabecalhos.get("content-length", 0) or 0))
+            self._responder(writer, *self._rota(metodo, url, cabecalhos, corpo))
+            await writer.drain()
+        except (ValueError, ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _rota(self, metodo, url, cabecalhos, corpo):
+        """Retorna (status, corpo, tipo, etag)."""
+        if url.path == "/" and metodo == "GET":
+            return 200, PAGINA, "text/html; charset=utf-8", None
+        if url.path == "/estado" and metodo == "GET":
+            return self._com_etag(cabecalhos, *self.estado.snapshot())
+        if url.path == "/historico" and metodo == "GET":
+            q = parse_qs(url.query)
+            try:
+                janela = float(q.get("janela", ["86400"])[0])
+                pontos = int(q.get("pontos", ["300"])[0])
+            except ValueError:
+                return 400, b'{"erro":"janela/pontos"}', "application/json", None
+            if not (0 < janela <= 30 * 86400 and 0 < pontos <= MAX_PONTOS):
+                return 400, b'{"erro":"janela/pontos fora do limite"}', "application/json", None
+            return self._com_etag(cabecalhos, *self.estado.historico(janela, pontos))
+        if url.path == "/config":
+            if metodo != "POST":
+                return 405, b"", "text/plain", None
+            return self._config(cabecalhos, corpo)
+        return 404, b"", "text/plain", None
+
+    def _com_etag(self, cabecalhos, corpo, etag):
+        if cabecalhos.get("if-none-match") == etag:
+            return 304, b"", "application/json", etag
+        return 200, corpo, "application/json", etag
+
+    def _config(self, cabecalhos, corpo):
+        if self.somente_leitura:
+            return 403, b'{"erro":"defina AERACAO_WEB_TOKEN para alterar pela rede"}', "application/json", None
+        if TOKEN and cabecalhos.get("authorization") != f"Bearer {TOKEN}":
+            return 401, b"", "text/plain", None
+        if not self._mesma_origem(cabecalhos):
+            return 403, b'{"erro":"origem nao permitida"}', "application/json", None
+        # Formulário e fetch no-cors de outro site não conseguem mandar este tipo sem preflight
+        if cabecalhos.get("content-type", "").split(";")[0].strip().lower() != "application/json":
+            return 415, b'{"erro":"use Content-Type: application/json"}', "application/json", None
+        if not self.estado.conectado:
+            return 503, b'{"erro":"controlador desconectado"}', "application/json", None
+        try:
+            dados = json.loads(corpo)
+            limiares = dados.get("limiares", self.estado.estado["limiares"])
+            manual = dados.get("manual", self.estado.estado["manual"])
+        except (ValueError, TypeError, KeyError, AttributeError):
+            return 400, b'{"erro":"JSON invalido"}', "application/json", None
+        try:
+            limiares, manual = controlador.validar_config(limiares, manual, len(self.estado.estado["limiares"]))
+        except (ValueError, TypeError):
+            return 400, b'{"erro":"limiares ou mascara fora do limite"}', "application/json", None
+        self.comandos.put_nowait({"cmd": "config", "limiares": limiares, "manual": manual})
+        return 202, _json({"limiares": limiares, "manual": manual}), "application/json", None
+
+    def _mesma_origem(self, cabecalhos):
+        """Origin (se houver) igual ao Host; escutando em 127.0.0.1, Host local."""
+        host = cabecalhos.get("host", "")
+        if self.local and urlsplit("//" + host).hostname not in HOSTS_LOCAIS:
+            return False
+        origem = cabecalhos.get("origin")
+        return origem is None or urlsplit(origem).netloc == host
+
+    def _responder(self, writer, status, corpo, tipo, etag):
+        cab = [f"HTTP/1.1 {status} {_STATUS[status]}", f"Content-Type: {tipo}",
+               f"Content-Length: {len(corpo)}", "Connection: close", "Cache-Control: no-cache"]
+        if etag:
+            cab.append(f"ETag: {etag}")
+        writer.write(("\r\n".join(cab) + "\r\n\r\n").encode() + corpo)
+
+    async def _eventos(self, writer, cabecalhos):
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                     b"Cache-Control: no-cache\r\nConnection: keep-alive\r\n\r\n")
+        difusor = self.estado.difusor
+        try:
+            ultimo = int(cabecalhos.get("last-event-id", ""))
+        except ValueError:
+            ultimo = None
+        pendentes = difusor.desde(ultimo) if ultimo is not None else None
+        if pendentes is None:
+            # Primeira conexão ou ficou para trás: começa pelo estado completo
+            writer.write(f"id: {difusor.ultimo_id}\nevent: estado\ndata: ".encode()
+                         + self.estado.snapshot()[0] + b"\n\n")
+            pendentes = []
+        ultimo = difusor.ultimo_id
+        self.clientes_sse += 1
+        try:
+            while True:
+                for dados in pendentes:
+                    writer.write(dados)
+                if writer.transport.get_write_buffer_size() > LIMITE_BUFFER:
+                    self.clientes_lentos += 1
+                    return
+                if writer.transport.is_closing():
+                    return
+                await difusor.esperar(KEEPALIVE)
+                pendentes = difusor.desde(ultimo)
+                if pendentes is None:
+                    return  # Cliente lento demais para o buffer; o navegador reconecta
+                if not pendentes:
+                    writer.write(b": keepalive\n\n")
+                ultimo = difusor.ultimo_id
+        finally:
+            self.clientes_sse -= 1
+
+
+async def _main(args):
+    painel = PainelWeb(args.socket)
+    server = await painel.start(args.host, args.porta)
+    print(f"Painel web em http://{args.host}:{server.sockets[0].getsockname()[1]}/", flush=True)
+    if painel.somente_leitura:
+        print("Sem AERACAO_WEB_TOKEN: POST /config desativado fora de 127.0.0.1", flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1", help="0.0.0.0 expõe na rede (defina AERACAO_WEB_TOKEN)")
+    parser.add_argument("--porta", type=int, default=8080)
+    parser.add_argument("--socket", default=controlador.SOCKET_PATH, help="socket Unix do controlador")
+    args = parser.parse_args()
+    try:
+        asyncio.run(_main(args))
+    except KeyboardInterrupt:
+        pass
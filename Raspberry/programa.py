@@ -1,67 +1,227 @@
-import sys, threading, time
+import os, sys, threading, time
+T_INICIO = time.perf_counter()
 from PySide6.QtWidgets import (
     QApplication, QWidget, QLabel, QPushButton, QDoubleSpinBox,
     QVBoxLayout, QHBoxLayout, QFrame, QGridLayout, QSpacerItem, QSizePolicy
 )
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, Signal, QTimer
 from PySide6.QtGui import QFont, QPalette, QColor
+T_QT = time.perf_counter()
 import comunicacao
+import condicionamento
+import controlador
+import grafico
+import metricas
+import recepcao
+import telemetria
+import transmissao
+T_MODULOS = time.perf_counter()
+
+# Taxa máxima de atualização do painel (quadros por segundo)
+UI_FPS = float(os.environ.get("AERACAO_UI_FPS", "5"))
+
+# ==================== PERFIL DE INICIALIZAÇÃO ====================
+# --profile-startup: marca cada etapa (s desde o início do processo) e sai após a primeira amostra
+PERFIL = "--profile-startup" in sys.argv
+marcas = {"import PySide6": T_QT - T_INICIO, "import módulos": T_MODULOS - T_INICIO}
+
+
+def marcar(etapa):
+    if etapa not in marcas:
+        marcas[etapa] = time.perf_counter() - T_INICIO
+
+
+def relatorio_inicio():
+    """Imprime as marcas de --profile-startup (acumulado e duração de cada etapa) e fecha o painel."""
+    print("Perfil de inicialização (s desde o início do processo / duração da etapa):", flush=True)
+    anterior = 0.0
+    for etapa, t in sorted(marcas.items(), key=lambda m: m[1]):
+        print(f"  {etapa:<30} {t:7.3f}  {t - anterior:+7.3f}", flush=True)
+        anterior = t
+    if "primeira amostra" not in marcas:
+        print("  (nenhuma amostra recebida)", flush=True)
+    QApplication.instance().closeAllWindows()
+    QApplication.instance().quit()
+
+
+# ==================== ESTILO ====================
+# Uma folha de estilo para toda a aplicação, compilada uma vez; cada widget
+# escolhe sua regra pela propriedade dinâmica "papel" (e "ligado", "sensor",
+# "enlace"). Depois de mudar uma propriedade, usar repolir().
+ESTILO = """
+QWidget#Main {
+    background: qlineargradient(x1:0, y1:0, x2:1, y2:1,
+        stop:0 #001F3F, stop:1 #003C80);
+}
+QLabel[papel="titulo"] { font-size: 46px; font-weight: bold; color: white; margin-top: 15px; }
+QLabel[papel="rotulo"] { font-size: 28px; font-weight: bold; color: white; }
+QLabel[papel="minimo"] { font-size: 20px; color: white; margin-bottom: 5px; }
+QLabel[papel="render"] { font-size: 14px; color: rgba(255, 255, 255, 0.5); }
+QLabel[papel="enlace"] { font-size: 20px; color: white; }
+QLabel[papel="enlace"][enlace="ok"] { color: #00C851; }
+QLabel[papel="enlace"][enlace="falha"] { color: #E53935; }
+
+QFrame[papel="card-sensor"] {
+    background-color: black;
+    border: 2px solid white;
+    border-radius: 20px;
+}
+QLabel[papel="sensor-titulo"] { font-size: 20px; font-weight: bold; }
+QLabel[papel="sensor-valor"] { font-size: 34px; font-weight: bold; }
+QLabel[sensor="ox"] { color: #00ffea; }
+QLabel[sensor="temp"] { color: #ff8800; }
+
+QFrame[papel="card-aerador"] {
+    background-color: black;
+    border: 3px solid white;
+    border-radius: 20px;
+}
+QPushButton[papel="manual"] {
+    background-color: qlineargradient(x1:0, y1:0, x2:1, y2:0,
+        stop:0 #C62828, stop:1 #E53935);
+    color: white;
+    font-weight: bold;
+    font-size: 24px;
+    border-radius: 12px;
+    border: 2px solid white;
+}
+QPushButton[papel="manual"]:checked {
+    background-color: qlineargradient(x1:0, y1:0, x2:1, y2:0,
+        stop:0 #007A33, stop:1 #00C851);
+}
+QPushButton[papel="ajuste"] {
+    background-color: rgba(255, 255, 255, 0.15);
+    color: white;
+    font-size: 36px;
+    font-weight: bold;
+    border-radius: 10px;
+    border: 2px solid white;
+}
+QPushButton[papel="ajuste"]:hover { background-color: rgba(255, 255, 255, 0.3); }
+QDoubleSpinBox {
+    color: white;
+    background-color: rgba(0, 0, 0, 200);
+    border: 2px solid white;
+    border-radius: 10px;
+}
+QLabel[papel="status"] {
+    background-color: #C62828;
+    color: white;
+    font-weight: bold;
+    font-size: 26px;
+    border-radius: 12px;
+    border: 2px solid white;
+}
+QLabel[papel="status"][ligado="true"] { background-color: #00C851; }
+"""
+
+
+def _com_papel(widget, papel, **props):
+    widget.setProperty("papel", papel)
+    for nome, valor in props.items():
+        widget.setProperty(nome, valor)
+    return widget
+
+
+def repolir(widget, nome, valor):
+    """Muda uma propriedade dinâmica e reaplica a folha de estilo só neste widget."""
+    widget.setProperty(nome, valor)
+    widget.style().unpolish(widget)
+    widget.style().polish(widget)
 
 
 class RadioThread(threading.Thread):
     def __init__(self, callback):
         super().__init__(daemon=True)
         self.callback = callback
-        self.running = True
+        self.engine = recepcao.ReceiveEngine(callback)
 
     def run(self):
         comunicacao.setup()
-        while self.running:
-            data = comunicacao.get_data()
-            if data:
-                self.callback(*data)
-            time.sleep(0.1)
+        marcar("rádio pronto")
+        self.engine.run()
+
+    def stop(self):
+        self.engine.stop()
 
 
 class MainWindow(QWidget):
-    def __init__(self):
+    # Resultado de entrega da máscara (máscara, True/False), emitido pela thread do transmissor
+    ack_changed = Signal(int, bool)
+    # Nova leitura disponível na caixa de correio (emitido no máximo uma vez por quadro)
+    sample_ready = Signal()
+    # Configuração alterada por outro cliente do controlador (limiares, máscara manual)
+    config_received = Signal(list, int)
+
+    def __init__(self, cliente=None, snapshot=None):
+        """`cliente` (controlador.ClienteControle já conectado) e `snapshot` (mensagem
+        inicial do daemon) põem o painel em modo cliente: o rádio e o laço de
+        decisão ficam no controlador e a janela só exibe e envia a configuração."""
+        marcar("janela: início")
         super().__init__()
+        self.cliente = cliente
         self.setObjectName("Main")
         self.setWindowTitle("Painel de Controle")
         self.setWindowFlags(Qt.FramelessWindowHint)
-        self.showFullScreen()  # 1920x1080
+        app = QApplication.instance()
+        if app.styleSheet() != ESTILO:
+            app.setStyleSheet(ESTILO)
 
         # ==================== VARIÁVEIS ====================
-        config = comunicacao.load_config()
-        self.thresholds = config["thresholds"]
-        self.mask = config["manual_mask"]
+        if cliente is None:
+            config = comunicacao.load_config()
+            self.thresholds = config["thresholds"]
+            self.mask = config["manual_mask"]
+        else:
+            self.thresholds = snapshot["limiares"]
+            self.mask = snapshot["manual"]
+        # Última configuração confirmada pelo controlador (volta a ela se o envio falhar)
+        self._confirmada = (list(self.thresholds), self.mask)
         self.auto_mask = 0
-        self.status_atual = [None] * 4
+        self.condicionador = condicionamento.Condicionador()  # AERACAO_FILTRO (só no modo local)
+        self.n_aeradores = len(self.thresholds)
+        self.status_atual = [False] * self.n_aeradores  # Rótulos nascem "DESLIGADO"
+        self.link_atual = None
+        # No modo cliente o log é gravado pelo controlador; aqui só é lido
+        self.telemetria = telemetria.Telemetria(comunicacao.TELEMETRY_FILE, readonly=cliente is not None)
+
+        # Caixa de correio da interface: só a leitura mais recente é desenhada
+        self._latest = None
+        self._latest_lock = threading.Lock()
+        self._render_pending = False
+        self._last_render = 0.0
+        self._render_time = 0.0
+        self._render_window = time.monotonic()
+
+        # ==================== THREADS ====================
+        # Sobem antes dos widgets: a aeração não espera a interface ficar pronta.
+        # Os sinais chegam à thread da interface em fila e só são tratados depois
+        # que o laço de eventos começa, quando os widgets já existem.
+        self._render_timer = QTimer(self)
+        self._render_timer.setSingleShot(True)
+        self._render_timer.timeout.connect(self.render)
+        self.sample_ready.connect(self._schedule_render)
+        self.ack_changed.connect(self.update_link)
+        if cliente is None:
+            self.transmitter = transmissao.MaskTransmitter(
+                on_result=lambda mask, ok: self.ack_changed.emit(mask, ok))
+            comunicacao.link_monitor.acompanhar(self.transmitter)
+            self.transmitter.start()
+            self.radio_thread = RadioThread(self.update_data)
+            self.radio_thread.start()
+            marcar("laço de controle iniciado")
 
         # ==================== TÍTULO PRINCIPAL ====================
-        titulo = QLabel("Painel de Controle")
+        titulo = _com_papel(QLabel("Painel de Controle"), "titulo")
         titulo.setAlignment(Qt.AlignCenter)
-        titulo.setStyleSheet("""
-            font-size: 46px;
-            font-weight: bold;
-            color: white;
-            margin-top: 15px;
-        """)
 
         # ==================== OXIGÊNIO E TEMPERATURA ====================
         info_layout = QHBoxLayout()
         info_layout.setSpacing(600)
         info_layout.setAlignment(Qt.AlignCenter)
 
-        def criar_card_sensor(titulo, unidade, cor):
-            frame = QFrame()
-            frame.setStyleSheet("""
-                QFrame {
-                    background-color: black;
-                    border: 2px solid white;
-                    border-radius: 20px;
-                }
-            """)
+        def criar_card_sensor(titulo, unidade, sensor):
+            frame = _com_papel(QFrame(), "card-sensor")
             frame.setFixedSize(420, 120)
 
             layout = QVBoxLayout(frame)
@@ -69,13 +229,11 @@ class MainWindow(QWidget):
             layout.setSpacing(4)
             layout.setAlignment(Qt.AlignCenter)
 
-            lbl_titulo = QLabel(titulo)
+            lbl_titulo = _com_papel(QLabel(titulo), "sensor-titulo", sensor=sensor)
             lbl_titulo.setAlignment(Qt.AlignCenter)
-            lbl_titulo.setStyleSheet(f"font-size: 20px; font-weight: bold; color: {cor}; border: none;")
 
-            lbl_valor = QLabel(f"--.- {unidade}")
+            lbl_valor = _com_papel(QLabel(f"--.- {unidade}"), "sensor-valor", sensor=sensor)
             lbl_valor.setAlignment(Qt.AlignCenter)
-            lbl_valor.setStyleSheet(f"font-size: 34px; font-weight: bold; color: {cor}; border: none;")
 
             layout.addWidget(lbl_titulo)
             layout.addWidget(lbl_valor)
@@ -83,13 +241,25 @@ class MainWindow(QWidget):
             return frame, lbl_valor
 
         # Criação dos dois cards
-        card_ox, self.label_ox = criar_card_sensor("Oxigênio", "mg/L", "#00ffea")
-        card_temp, self.label_temp = criar_card_sensor("Temperatura", "°C", "#ff8800")
+        card_ox, self.label_ox = criar_card_sensor("Oxigênio", "mg/L", "ox")
+        card_temp, self.label_temp = criar_card_sensor("Temperatura", "°C", "temp")
 
         # Adiciona ambos lado a lado
         info_layout.addWidget(card_ox)
         info_layout.addWidget(card_temp)
 
+        # ==================== ESTADO DO ENLACE ====================
+        self.label_link = _com_papel(QLabel("Enlace: aguardando"), "enlace")
+        self.label_link.setAlignment(Qt.AlignCenter)
+
+        # ==================== TENDÊNCIA (24 h) ====================
+        self.chart = grafico.TrendChart(self.telemetria, self.thresholds)
+        self.chart.setFixedHeight(220)
+
+        # Custo de desenho do painel (ms gastos por segundo)
+        self.label_render = _com_papel(QLabel("Render: -- ms/s"), "render")
+        self.label_render.setAlignment(Qt.AlignRight)
+
         # ==================== GRID PRINCIPAL ====================
         grid = QGridLayout()
         grid.setHorizontalSpacing(80)
@@ -104,41 +274,32 @@ class MainWindow(QWidget):
         label_auto.setContentsMargins(0, 50, 0, 0)    
         for row, lbl in enumerate([label_manual, label_auto, label_status]):
             lbl.setAlignment(Qt.AlignCenter)
-            lbl.setStyleSheet("font-size: 28px; color: white; font-weight: bold;")
+            _com_papel(lbl, "rotulo")
             grid.addWidget(lbl, row + 1, 0, alignment=Qt.AlignCenter)
 
-        # ---- Criação dos cards dos aeradores (colunas 1 a 4) ----
+        # ---- Criação dos cards dos aeradores (colunas 1 a N) ----
         self.buttons = []
         self.spinboxes = []
         self.status_labels = []
 
-        for col in range(4):
-            card = QFrame()
-            card.setStyleSheet("""
-                QFrame {
-                    background-color: black;
-                    border: 3px solid white;
-                    border-radius: 20px;
-                }
-            """)
+        for col in range(self.n_aeradores):
+            card = _com_papel(QFrame(), "card-aerador")
             card_layout = QVBoxLayout()
             card_layout.setAlignment(Qt.AlignCenter)
             card_layout.setSpacing(80)
             card_layout.setContentsMargins(20, 25, 20, 25)
 
             # -------- Título do aerador --------
-            titulo_aerador = QLabel(f"Aerador {col + 1}")
+            titulo_aerador = _com_papel(QLabel(f"Aerador {col + 1}"), "rotulo")
             titulo_aerador.setAlignment(Qt.AlignCenter)
-            titulo_aerador.setStyleSheet("font-size: 28px; color: white; font-weight: bold; border: none;")
             card_layout.addWidget(titulo_aerador)
 
             # -------- Linha 1: Acionamento manual --------
             estado = (self.mask >> col) & 1
-            btn = QPushButton("ON" if estado else "OFF")
+            btn = _com_papel(QPushButton("ON" if estado else "OFF"), "manual")
             btn.setCheckable(True)
             btn.setChecked(bool(estado))
             btn.setMinimumSize(220, 100)
-            btn.setStyleSheet(self._btn_style(btn.isChecked(), bordered=True))
             btn.clicked.connect(lambda checked, n=col: self.toggle_aerador(n, checked))
             self.buttons.append(btn)
             card_layout.addWidget(btn, alignment=Qt.AlignCenter)
@@ -148,9 +309,8 @@ class MainWindow(QWidget):
             ox_layout.setSpacing(10)
             ox_layout.setAlignment(Qt.AlignCenter)
 
-            label_min = QLabel("Mínimo")
+            label_min = _com_papel(QLabel("Mínimo"), "minimo")
             label_min.setAlignment(Qt.AlignCenter)
-            label_min.setStyleSheet("font-size: 20px; color: white; border: none; margin-bottom: 5px;")
             ox_layout.addWidget(label_min)
 
             spin_layout = QHBoxLayout()
@@ -161,17 +321,7 @@ class MainWindow(QWidget):
             btn_plus = QPushButton("+")
             for b in (btn_minus, btn_plus):
                 b.setFixedSize(60, 80)
-                b.setStyleSheet("""
-                    QPushButton {
-                        background-color: rgba(255, 255, 255, 0.15);
-                        color: white;
-                        font-size: 36px;
-                        font-weight: bold;
-                        border-radius: 10px;
-                        border: 2px solid white;
-                    }
-                    QPushButton:hover { background-color: rgba(255, 255, 255, 0.3); }
-                """)
+                _com_papel(b, "ajuste")
 
             spin = QDoubleSpinBox()
             spin.setRange(0.00, 20.00)
@@ -182,14 +332,6 @@ class MainWindow(QWidget):
             spin.setAlignment(Qt.AlignCenter)
             spin.setFont(QFont("Arial", 24, QFont.Bold))
             spin.setButtonSymbols(QDoubleSpinBox.NoButtons)
-            spin.setStyleSheet("""
-                QDoubleSpinBox {
-                    color: white;
-                    background-color: rgba(0, 0, 0, 200);
-                    border: 2px solid white;
-                    border-radius: 10px;
-                }
-            """)
             spin.valueChanged.connect(self.save_config)
             btn_minus.clicked.connect(lambda _, s=spin: s.setValue(s.value() - s.singleStep()))
             btn_plus.clicked.connect(lambda _, s=spin: s.setValue(s.value() + s.singleStep()))
@@ -203,10 +345,9 @@ class MainWindow(QWidget):
             self.spinboxes.append(spin)
 
             # -------- Linha 3: Status --------
-            status = QLabel("DESLIGADO")
+            status = _com_papel(QLabel("DESLIGADO"), "status", ligado=False)
             status.setAlignment(Qt.AlignCenter)
             status.setFixedSize(240, 100)
-            status.setStyleSheet(self._status_style(False, bordered=True))
             self.status_labels.append(status)
             card_layout.addWidget(status, alignment=Qt.AlignCenter)
 
@@ -215,83 +356,145 @@ class MainWindow(QWidget):
 
         # ==================== LAYOUT PRINCIPAL ====================
         main_layout = QVBoxLayout()
-        main_layout.setSpacing(60)
+        main_layout.setSpacing(30)
         main_layout.addSpacerItem(QSpacerItem(10, 40, QSizePolicy.Minimum, QSizePolicy.Expanding))
         main_layout.addWidget(titulo)
         main_layout.addLayout(info_layout)
+        main_layout.addWidget(self.label_link)
+        main_layout.addWidget(self.chart)
         main_layout.addLayout(grid)
         main_layout.addSpacerItem(QSpacerItem(10, 40, QSizePolicy.Minimum, QSizePolicy.Expanding))
+        main_layout.addWidget(self.label_render)
         self.setLayout(main_layout)
+        marcar("widgets montados")
 
-        # ==================== FUNDO ====================
-        self.setStyleSheet("""
-            QWidget#Main {
-                background: qlineargradient(x1:0, y1:0, x2:1, y2:1,
-                    stop:0 #001F3F, stop:1 #003C80);
-            }
-        """)
-
-        # ==================== THREAD ====================
-        self.radio_thread = RadioThread(self.update_data)
-        self.radio_thread.start()
-
-    # =====================================================
-    def _btn_style(self, on, bordered=False):
-        border = "border: 2px solid white;" if bordered else ""
-        if on:
-            return f"""
-                QPushButton {{
-                    background-color: qlineargradient(x1:0, y1:0, x2:1, y2:0,
-                        stop:0 #007A33, stop:1 #00C851);
-                    color: white;
-                    font-weight: bold;
-                    font-size: 24px;
-                    border-radius: 12px;
-                    {border}
-                }}
-            """
-        else:
-            return f"""
-                QPushButton {{
-                    background-color: qlineargradient(x1:0, y1:0, x2:1, y2:0,
-                        stop:0 #C62828, stop:1 #E53935);
-                    color: white;
-                    font-weight: bold;
-                    font-size: 24px;
-                    border-radius: 12px;
-                    {border}
-                }}
-            """
-
-    def _status_style(self, ligado, bordered=False):
-        border = "border: 2px solid white;" if bordered else ""
-        return f"""
-            QLabel {{
-                background-color: {'#00C851' if ligado else '#C62828'};
-                color: white;
-                font-weight: bold;
-                font-size: 26px;
-                border-radius: 12px;
-                {border}
-            }}
-        """
+        if cliente is not None:
+            self.config_received.connect(self.apply_config)
+            cliente.on_message = self.on_message
+            self.on_message(snapshot)
+            cliente.start()
+        self.showFullScreen()  # 1920x1080
 
     # =====================================================
     def update_data(self, ox, temp):
-        """Atualiza valores e status conforme máscara final."""
+        """Calcula e envia a máscara; chamado pela thread do rádio a cada amostra.
+
+        Não toca nos widgets: deixa a leitura na caixa de correio e avisa a
+        thread da interface, que desenha no máximo UI_FPS vezes por segundo."""
+        if PERFIL:
+            marcar("primeira amostra")
+        final_mask, self.auto_mask = self.condicionador.calcular(ox, self.thresholds, self.mask)
+        future = self.transmitter.submit(final_mask)
+        t_rx = 0.0
+        if __debug__ and metricas.ATIVO:
+            t_rx = metricas.t_rx
+            metricas.rx_mascara.observe(time.monotonic() - t_rx)
+            if not future.done():  # Máscara inalterada e já confirmada não vai ao rádio
+                future.add_done_callback(
+                    lambda f, t=t_rx: f.result() and metricas.rx_ack.observe(time.monotonic() - t))
+        self.telemetria.append(time.time(), ox, temp, final_mask)
+        self._post(ox, temp, final_mask, t_rx)
+
+    def _post(self, ox, temp, final_mask, t_rx=0.0):
+        """Deixa a leitura na caixa de correio e avisa a interface (uma vez por quadro)."""
+        with self._latest_lock:
+            self._latest = (ox, temp, final_mask, t_rx)
+            if self._render_pending:
+                return
+            self._render_pending = True
+        self.sample_ready.emit()
+
+    def on_message(self, msg):
+        """Mensagem do controlador (modo cliente), recebida na thread do cliente."""
+        tipo = msg["tipo"]
+        if tipo == "estado":
+            # Ao (re)conectar: configuração, última amostra e último ACK do controlador
+            if "o2" in msg:
+                self.on_message(dict(msg, tipo="amostra"))
+            if "ack_mascara" in msg:
+                self.ack_changed.emit(msg["ack_mascara"], msg["ack_ok"])
+            self.on_message(dict(msg, tipo="config"))
+        elif tipo == "amostra":
+            if PERFIL:
+                marcar("primeira amostra")
+            self.auto_mask = msg["auto"]
+            self.telemetria.append(msg["t"], msg["o2"], msg["temp"], msg["mascara"])
+            self._post(msg["o2"], msg["temp"], msg["mascara"])
+        elif tipo == "ack":
+            self.ack_changed.emit(msg["mascara"], msg["ok"])
+        elif tipo == "config":
+            self._confirmada = (msg["limiares"], msg["manual"])
+            if msg["limiares"] != self.thresholds or msg["manual"] != self.mask:
+                self.config_received.emit(msg["limiares"], msg["manual"])
+
+    def apply_config(self, thresholds, manual_mask):
+        """Mostra a configuração recebida do controlador sem reenviá-la."""
+        self.thresholds = list(thresholds)
+        self.mask = manual_mask
+        for i, spin in enumerate(self.spinboxes[:len(thresholds)]):
+            spin.blockSignals(True)
+            spin.setValue(thresholds[i])
+            spin.blockSignals(False)
+        for i, btn in enumerate(self.buttons):
+            ligado = bool((manual_mask >> i) & 1)
+            btn.setChecked(ligado)
+            btn.setText("ON" if ligado else "OFF")
+        self.chart.set_thresholds(self.thresholds)
+
+    def _schedule_render(self):
+        """Desenha agora ou quando o intervalo mínimo entre quadros tiver passado."""
+        wait = self._last_render + 1.0 / UI_FPS - time.monotonic()
+        if wait <= 0:
+            self.render()
+        elif not self._render_timer.isActive():
+            self._render_timer.start(int(wait * 1000) + 1)
+
+    def render(self):
+        """Aplica a leitura mais recente aos widgets (thread da interface)."""
+        t0 = time.perf_counter()
+        with self._latest_lock:
+            latest = self._latest
+            self._render_pending = False
+        if latest is None:
+            return
+        ox, temp, final_mask, t_rx = latest
+        self._last_render = time.monotonic()
+
         self.label_ox.setText(f"{ox:.2f} mg/L")
         self.label_temp.setText(f"{temp:.2f} °C")
 
-        thresholds = [spin.value() for spin in self.spinboxes]
-        final_mask, self.auto_mask = comunicacao.calculate_mask(ox, thresholds, self.mask)
-        comunicacao.send_mask(final_mask)
-
         for i, lbl in enumerate(self.status_labels):
             ligado = bool((final_mask >> i) & 1)
             if ligado != self.status_atual[i]:
                 self.status_atual[i] = ligado
                 lbl.setText("LIGADO" if ligado else "DESLIGADO")
-                lbl.setStyleSheet(self._status_style(ligado, bordered=True))
+                repolir(lbl, "ligado", ligado)
+
+        self.chart.refresh()
+        if __debug__ and metricas.ATIVO and t_rx:  # Modo cliente: o rádio está no controlador
+            metricas.rx_tela.observe(time.monotonic() - t_rx)
+        if PERFIL and "primeira amostra na tela" not in marcas:
+            marcar("primeira amostra na tela")
+            if "painel exibido" in marcas:
+                QTimer.singleShot(0, relatorio_inicio)
+
+        # Contador de custo: ms de desenho acumulados a cada segundo
+        self._render_time += time.perf_counter() - t0
+        elapsed = self._last_render - self._render_window
+        if elapsed >= 1.0:
+            self.label_render.setText(f"Render: {self._render_time * 1000 / elapsed:.1f} ms/s")
+            self._render_time = 0.0
+            self._render_window = self._last_render
+
+    def update_link(self, mask, ok):
+        """Mostra o estado real de entrega da última máscara enviada."""
+        if ok:
+            self.label_link.setText(f"Enlace: máscara {mask:0{self.n_aeradores}b} confirmada (ACK)")
+        else:
+            self.label_link.setText(f"Enlace: máscara {mask:0{self.n_aeradores}b} sem ACK")
+        if ok != self.link_atual:
+            self.link_atual = ok
+            repolir(self.label_link, "enlace", "ok" if ok else "falha")
 
     def toggle_aerador(self, index, state):
         if state:
@@ -300,28 +503,72 @@ class MainWindow(QWidget):
         else:
             self.mask &= ~(1 << index)
             self.buttons[index].setText("OFF")
-        self.buttons[index].setStyleSheet(self._btn_style(state, bordered=True))
         self.save_config()
 
     def save_config(self):
-        thresholds = [spin.value() for spin in self.spinboxes]
-        comunicacao.save_config(thresholds, self.mask)
+        # Nova lista (troca atômica) lida pela thread do rádio em update_data()
+        self.thresholds = [spin.value() for spin in self.spinboxes]
+        self.chart.set_thresholds(self.thresholds)
+        if self.cliente is not None:
+            if not self.cliente.send_config(self.thresholds, self.mask):
+                # Controlador fora do ar: a tela volta ao que está valendo nele
+                self.apply_config(*self._confirmada)
+                self.label_link.setText("Enlace: controlador desconectado")
+                self.link_atual = None
+                repolir(self.label_link, "enlace", "falha")
+        else:
+            comunicacao.save_config(self.thresholds, self.mask)
 
     def closeEvent(self, event):
-        self.radio_thread.running = False
+        if self.cliente is not None:
+            # A aeração continua no controlador; o painel só se desconecta
+            self.cliente.stop()
+            self.telemetria.close()
+            event.accept()
+            return
+        self.radio_thread.stop()
         self.radio_thread.join(timeout=1)
+        self.transmitter.stop()
         comunicacao.save_config([spin.value() for spin in self.spinboxes], self.mask)
+        comunicacao.flush_config()
+        self.telemetria.close()
+        if self.condicionador.ativo:
+            print(f"Condicionamento: {self.condicionador.stats()}")
         event.accept()
 
 
 if __name__ == "__main__":
+    if metricas.ATIVO:
+        metricas.iniciar()
     app = QApplication(sys.argv)
     QApplication.setStyle("Fusion")
     palette = QPalette()
     palette.setColor(QPalette.Window, QColor(5, 20, 50))
     palette.setColor(QPalette.WindowText, QColor("white"))
     app.setPalette(palette)
-
-    window = MainWindow()
+    marcar("QApplication criada")
+
+    # Com o controlador (controlador.py) no ar, o painel é só um cliente dele
+    cliente = controlador.ClienteControle()
+    estado = None if "--local" in sys.argv else cliente.connect()
+    if estado is not None:
+        print(f"Painel conectado ao controlador ({cliente.path})")
+    if estado is None and "--estacao-virtual" in sys.argv:
+        # Black Pill simulada no mesmo processo (com AERACAO_RADIO=virtual)
+        import random
+        from estacao_virtual import EstacaoVirtual
+        EstacaoVirtual(sample=lambda n: (random.uniform(3.0, 8.0), 27.0), period=1.0).start()
+    window = MainWindow(cliente if estado is not None else None, estado)
     window.show()
+
+    def exibido():
+        # Primeira volta do laço de eventos = primeiro quadro na tela
+        marcar("painel exibido")
+        print("Painel exibido", flush=True)
+        if PERFIL and "primeira amostra na tela" in marcas:
+            relatorio_inicio()
+
+    QTimer.singleShot(0, exibido)
+    if PERFIL:
+        QTimer.singleShot(30000, relatorio_inicio)  # Sem amostra em 30 s: relata assim mesmo
     sys.exit(app.exec())
@@ -0,0 +1,202 @@
+"""
+Recepção orientada a eventos
+----------------------------
+- Bloqueia na linha IRQ do nRF24 (GPIO no Pi, ou a IRQ simulada do VirtualRF24)
+  em vez de acordar a cada 100 ms
+- A cada despertar, esvazia toda a FIFO e entrega as amostras em ordem
+- Contabiliza profundidade da fila por despertar e quadros perdidos
+"""
+
+import asyncio, threading, time
+import comunicacao
+import metricas
+
+
+# ==================== FONTES DE IRQ ====================
+class RadioIrq:
+    """IRQ do rádio virtual (evento interno e descritor selecionável)."""
+
+    def __init__(self, radio):
+        self.radio = radio
+
+    def wait(self, timeout):
+        return self.radio.wait_irq(timeout)
+
+    def fileno(self):
+        return self.radio.fileno()
+
+    def close(self):
+        pass
+
+
+class PinIrq:
+    """Pino IRQ do nRF24 (ativo em nível baixo) ligado a um GPIO do Raspberry Pi."""
+
+    def __init__(self, pin):
+        import RPi.GPIO as GPIO
+        self.GPIO = GPIO
+        self.pin = pin
+        self.event = threading.Event()
+        GPIO.setmode(GPIO.BCM)
+        GPIO.setup(pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
+        GPIO.add_event_detect(pin, GPIO.FALLING, callback=lambda _: self.event.set())
+
+    def wait(self, timeout):
+        fired = self.event.wait(timeout)
+        self.event.clear()
+        return fired
+
+    def close(self):
+        self.GPIO.remove_event_detect(self.pin)
+
+
+class PollingIrq:
+    """Sem IRQ disponível: acorda em intervalo fixo."""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+
+    def wait(self, timeout):
+        time.sleep(min(self.interval, timeout))
+        return True
+
+    def close(self):
+        pass
+
+
+def default_irq_source(radio):
+    """Escolhe a melhor fonte de IRQ para o rádio atual."""
+    if hasattr(radio, "wait_irq"):
+        return RadioIrq(radio)
+    if comunicacao.IRQ_PIN is not None:
+        try:
+            return PinIrq(comunicacao.IRQ_PIN)
+        except (ImportError, RuntimeError) as e:
+            print(f"IRQ no GPIO{comunicacao.IRQ_PIN} indisponível ({e}); usando polling.")
+    return PollingIrq()
+
+
+# ==================== MOTOR DE RECEPÇÃO ====================
+class ReceiveEngine:
+    """Aguarda a IRQ, esvazia a FIFO e entrega cada (oxigênio, temperatura) ao callback.
+
+    `reader` troca a função de leitura da FIFO (ex.: comunicacao.get_all_data_pipes
+    no modo hub, que entrega também o pipe de origem) e `on_batch` recebe a
+    lista inteira de cada despertar."""
+
+    def __init__(self, callback=None, source=None, timeout=0.5, reader=None, on_batch=None):
+        self.callback = callback
+        self.on_batch = on_batch
+        self.source = source
+        self.reader = reader or comunicacao.get_all_data
+        self.timeout = timeout  # Rede de segurança caso uma borda de IRQ se perca
+        self.running = False
+        # Estatísticas
+        self.wakeups = 0
+        self.empty_wakeups = 0
+        self.received = 0
+        self.last_depth = 0
+        self.max_depth = 0
+        self.fifo_full = 0
+        self.dropped = 0
+        self._radio_dropped0 = None
+
+    def _drain(self):
+        """Limpa a IRQ e lê a FIFO até esvaziá-la; repete se algo chegou nesse meio-tempo."""
+        samples = []
+        while True:
+            comunicacao.clear_irq()
+            if comunicacao.rx_fifo_full():
+                self.fifo_full += 1
+            batch = self.reader()
+            if not batch:
+                break
+            samples.extend(batch)
+        self._update_dropped()
+        return samples
+
+    def _update_dropped(self):
+        radio_dropped = getattr(comunicacao.radio, "rx_dropped", None)
+        if radio_dropped is None:
+            return
+        if self._radio_dropped0 is None:
+            self._radio_dropped0 = radio_dropped
+        dropped = radio_dropped - self._radio_dropped0
+        if __debug__ and metricas.ATIVO and dropped > self.dropped:
+            metricas.descartadas.inc(dropped - self.dropped)  # FIFO cheia no rádio
+        self.dropped = dropped
+
+    def _deliver(self, samples):
+        self.wakeups += 1
+        depth = len(samples)
+        self.last_depth = depth
+        self.max_depth = max(self.max_depth, depth)
+        if not depth:
+            self.empty_wakeups += 1
+        elif self.on_batch is not None:
+            self.on_batch(samples)
+        for sample in samples:
+            self.received += 1
+            if self.callback is not None:
+                self.callback(*sample)
+
+    def run(self):
+        """Loop bloqueante; encerra com stop()."""
+        if self.source is None:
+            self.source = default_irq_source(comunicacao.radio)
+        self._update_dropped()
+        self.running = True
+        self._deliver(self._drain())  # Amostras que chegaram antes do loop
+        try:
+            while self.running:
+                self.source.wait(self.timeout)
+                if self.running:
+                    self._deliver(self._drain())
+        finally:
+            self.source.close()
+
+    def stop(self):
+        self.running = False
+
+    async def stream(self):
+        """Versão asyncio: gera cada (oxigênio, temperatura) em ordem.
+
+        Usa o descritor selecionável da fonte quando existir; caso contrário,
+        espera a IRQ em uma thread do executor."""
+        if self.source is None:
+            self.source = default_irq_source(comunicacao.radio)
+        self._update_dropped()
+        loop = asyncio.get_running_loop()
+        fired = asyncio.Event()
+        fileno = getattr(self.source, "fileno", None)
+        if fileno is not None:
+            loop.add_reader(fileno(), fired.set)
+        self.running = True
+        try:
+            while self.running:
+                samples = self._drain()
+                self._deliver(samples)
+                for sample in samples:
+                    yield sample
+                if fileno is not None:
+                    try:
+                        await asyncio.wait_for(fired.wait(), self.timeout)
+                    except asyncio.TimeoutError:
+                        pass
+                    fired.clear()
+                else:
+                    await loop.run_in_executor(None, self.source.wait, self.timeout)
+        finally:
+            if fileno is not None:
+                loop.remove_reader(fileno())
+
+    def stats(self):
+        return {
+            "despertares": self.wakeups,
+            "despertares_vazios": self.empty_wakeups,
+            "recebidas": self.received,
+            "profundidade_ultima": self.last_depth,
+            "profundidade_max": self.max_depth,
+            "fifo_cheia": self.fifo_full,
+            "descartadas": self.dropped,
+        }
@@ -0,0 +1,385 @@
+"""
+Histórico de telemetria (oxigênio, temperatura e máscara aplicada)
+------------------------------------------------------------------
+- Buffer circular de memória fixa em array.array (horas de dados em poucos MB)
+- Log binário somente-anexação, com registros de tamanho fixo e um bloco de
+  índice (t inicial/final, mín/máx/soma) a cada BLOCK_RECORDS registros
+- Consultas por intervalo e redução mín/máx/média lidas por memmap do NumPy,
+  sem interpretar texto; blocos de índice aceleram janelas de vários dias
+- NumPy só é importado nas consultas (o caminho de escrita não depende dele)
+- O tempo nunca diminui dentro de um log: um passo do relógio para trás de até
+  CLOCK_STEP_TOLERANCE repete o último t; um passo maior (relógio adiantado
+  corrigido pelo NTP) guarda o log atual como <arquivo>.<último t> e começa outro
+"""
+
+import os, struct, threading, time
+from array import array
+
+# ==================== FORMATO DO ARQUIVO ====================
+MAGIC = b"AERTLM01"
+HEADER = struct.Struct("<8sIII12x")        # magic, versão, bytes/registro, registros/bloco
+RECORD = struct.Struct("<dffQ")            # t (epoch s), O2 (mg/L), temperatura (°C), máscara
+INDEX = struct.Struct("<ddffdffdIQ4x")     # t0, t1, O2 mín/máx/soma, temp mín/máx/soma, n, OR das máscaras
+VERSION = 1
+BLOCK_RECORDS = 1024
+CLOCK_STEP_TOLERANCE = 60.0  # s
+
+
+def _record_dtype(np):
+    return np.dtype([("t", "<f8"), ("o2", "<f4"), ("temp", "<f4"), ("mask", "<u8")])
+
+
+def _index_dtype(np):
+    return np.dtype([("t0", "<f8"), ("t1", "<f8"),
+                     ("o2_min", "<f4"), ("o2_max", "<f4"), ("o2_sum", "<f8"),
+                     ("temp_min", "<f4"), ("temp_max", "<f4"), ("temp_sum", "<f8"),
+                     ("n", "<u4"), ("mask_or", "<u8"), ("pad", "V4")])
+
+
+class _BlockSummary:
+    """Resumo acumulado do bloco em escrita (vira o bloco de índice ao completar)."""
+
+    def __init__(self):
+        self.n = 0
+        self.t0 = self.t1 = 0.0
+        self.o2_min = self.temp_min = float("inf")
+        self.o2_max = self.temp_max = float("-inf")
+        self.o2_sum = self.temp_sum = 0.0
+        self.mask_or = 0
+
+    def add(self, t, o2, temp, mask):
+        if not self.n:
+            self.t0 = t
+        self.t1 = t
+        self.n += 1
+        self.o2_min = min(self.o2_min, o2)
+        self.o2_max = max(self.o2_max, o2)
+        self.o2_sum += o2
+        self.temp_min = min(self.temp_min, temp)
+        self.temp_max = max(self.temp_max, temp)
+        self.temp_sum += temp
+        self.mask_or |= mask
+
+    def pack(self):
+        return INDEX.pack(self.t0, self.t1, self.o2_min, self.o2_max, self.o2_sum,
+                          self.temp_min, self.temp_max, self.temp_sum, self.n, self.mask_or)
+
+
+# ==================== LOG BINÁRIO ====================
+class TelemetryLog:
+    """Log binário somente-anexação com blocos de índice periódicos."""
+
+    def __init__(self, path, block_records=BLOCK_RECORDS):
+        self.path = path
+        self.block_records = block_records
+        self.block_bytes = block_records * RECORD.size + INDEX.size
+        self._summary = _BlockSummary()
+        self._pending = bytearray()
+        self._file = None
+        self.last_t = float("-inf")  # Maior t gravado: append() não deixa o tempo voltar
+        self.clamped = 0
+        self.rotated = 0
+        self._open()
+
+    def _open(self):
+        if not os.path.exists(self.path) or os.path.getsize(self.path) < HEADER.size:
+            with open(self.path, "wb") as f:
+                f.write(HEADER.pack(MAGIC, VERSION, RECORD.size, self.block_records))
+        with open(self.path, "rb") as f:
+            magic, version, rec_size, block_records = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or rec_size != RECORD.size:
+            raise ValueError(f"{self.path} não é um log de telemetria v{VERSION}")
+        self.block_records = block_records
+        self.block_bytes = block_records * RECORD.size + INDEX.size
+
+        # Descarta um registro parcial (queda de energia) e refaz o resumo do bloco aberto
+        size = os.path.getsize(self.path) - HEADER.size
+        blocks, rest = divmod(size, self.block_bytes)
+        tail = rest // RECORD.size
+        end = HEADER.size + blocks * self.block_bytes + tail * RECORD.size
+        self._file = open(self.path, "r+b")
+        self._file.truncate(end)
+        if blocks:
+            self._file.seek(HEADER.size + blocks * self.block_bytes - INDEX.size)
+            self.last_t = INDEX.unpack(self._file.read(INDEX.size))[1]
+        self._file.seek(HEADER.size + blocks * self.block_bytes)
+        for _ in range(tail):
+            self._summary.add(*RECORD.unpack(self._file.read(RECORD.size)))
+        if tail:
+            self.last_t = max(self.last_t, self._summary.t1)
+        self._file.seek(end)
+
+    def append(self, t, o2, temp, mask):
+        # Consultas e índices usam busca binária em t: um passo do relógio para trás
+        # (NTP depois do boot, o Pi não tem RTC) repete o último t em vez de desordenar
+        if t < self.last_t:
+            if self.last_t - t > CLOCK_STEP_TOLERANCE:
+                self._rotate()
+            else:
+                t = self.last_t
+                self.clamped += 1
+        self.last_t = t
+        self._pending += RECORD.pack(t, o2, temp, mask)
+        self._summary.add(t, o2, temp, mask)
+        if self._summary.n == self.block_records:
+            self._pending += self._summary.pack()
+            self._summary = _BlockSummary()
+
+    def _rotate(self):
+        # Sem isso um único t no futuro prenderia todos os seguintes, até entre reinícios
+        self.close()
+        os.replace(self.path, f"{self.path}.{int(self.last_t)}")
+        self._summary = _BlockSummary()
+        self.last_t = float("-inf")
+        self.rotated += 1
+        self._open()
+
+    def flush(self):
+        if self._pending:
+            self._file.write(self._pending)
+            self._file.flush()
+            self._pending.clear()
+
+    def close(self):
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
+
+
+class TelemetryReader:
+    """Leitura de um log de telemetria por memmap (NumPy)."""
+
+    def __init__(self, path):
+        import numpy as np
+        self.np = np
+        self.path = path
+        with open(path, "rb") as f:
+            magic, version, rec_size, self.block_records = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or rec_size != RECORD.size:
+            raise ValueError(f"{path} não é um log de telemetria v{VERSION}")
+        self.record_dtype = _record_dtype(np)
+        self.block_dtype = np.dtype([("rec", self.record_dtype, (self.block_records,)),
+                                     ("idx", _index_dtype(np))])
+        self.refresh()
+
+    def refresh(self):
+        """Remapeia o arquivo para enxergar os registros anexados desde a última leitura."""
+        np = self.np
+        size = os.path.getsize(self.path) - HEADER.size
+        n_blocks, rest = divmod(size, self.block_dtype.itemsize)
+        # Um bloco completo cujo índice ainda está sendo escrito: só os registros contam
+        n_tail = min(rest // RECORD.size, self.block_records)
+        self.blocks = np.memmap(self.path, self.block_dtype, "r", HEADER.size, (n_blocks,)) \
+            if n_blocks else np.zeros(0, self.block_dtype)
+        tail_offset = HEADER.size + n_blocks * self.block_dtype.itemsize
+        self.tail = np.memmap(self.path, self.record_dtype, "r", tail_offset, (n_tail,)) \
+            if n_tail else np.zeros(0, self.record_dtype)
+
+    def __len__(self):
+        return len(self.blocks) * self.block_records + len(self.tail)
+
+    def query(self, t_start, t_end):
+        """Registros com t_start <= t < t_end (array estruturado: t, o2, temp, mask)."""
+        np = self.np
+        idx = self.blocks["idx"]
+        first = int(np.searchsorted(idx["t1"], t_start, "left"))
+        last = int(np.searchsorted(idx["t0"], t_end, "left"))
+        parts = [self.blocks["rec"][first:last].reshape(-1)]
+        if len(self.tail) and (not len(idx) or self.tail["t"][0] < t_end):
+            parts.append(self.tail)
+        records = np.concatenate(parts) if len(parts) > 1 else np.array(parts[0])
+        lo = np.searchsorted(records["t"], t_start, "left")
+        hi = np.searchsorted(records["t"], t_end, "left")
+        return records[lo:hi]
+
+    def downsample(self, t_start, t_end, buckets):
+        """Reduz [t_start, t_end) a `buckets` intervalos com mín/máx/média de O2 e temperatura.
+
+        Quando cada intervalo cobre vários blocos, usa só os blocos de índice."""
+        np = self.np
+        edges = np.linspace(t_start, t_end, buckets + 1)
+        idx = self.blocks["idx"]
+        span = (t_end - t_start) / buckets
+        if len(idx) and span >= 4 * (idx["t1"][-1] - idx["t0"][0]) / len(idx):
+            first = int(np.searchsorted(idx["t1"], t_start, "left"))
+            last = int(np.searchsorted(idx["t0"], t_end, "left"))
+            sel = idx[first:last]
+            summary = {"t": sel["t0"], "n": sel["n"].astype("f8"),
+                       "o2_min": sel["o2_min"], "o2_max": sel["o2_max"], "o2_sum": sel["o2_sum"],
+                       "temp_min": sel["temp_min"], "temp_max": sel["temp_max"],
+                       "temp_sum": sel["temp_sum"], "mask": sel["mask_or"]}
+            tail = self.tail[self.tail["t"] >= t_start] if len(self.tail) else self.tail
+            tail = tail[tail["t"] < t_end]
+            if len(tail):
+                ones = np.ones(len(tail))
+                summary = {k: np.concatenate([v, w]) for (k, v), w in zip(summary.items(), [
+                    tail["t"], ones, tail["o2"], tail["o2"], tail["o2"].astype("f8"),
+                    tail["temp"], tail["temp"], tail["temp"].astype("f8"), tail["mask"]])}
+        else:
+            rec = self.query(t_start, t_end)
+            return reduce_samples({k: rec[k] for k in ("t", "o2", "temp", "mask")}, edges)
+        return _reduce(np, summary, edges)
+
+
+def _reduce(np, s, edges):
+    """Agrupa linhas já resumidas nos intervalos definidos por `edges`."""
+    buckets = len(edges) - 1
+    pos = np.searchsorted(s["t"], edges)
+    starts = pos[:-1]
+    counts = np.diff(pos)
+    nonempty = counts > 0
+    out = {"t": (edges[:-1] + edges[1:]) / 2, "n": np.zeros(buckets, "i8")}
+    for key in ("o2_min", "o2_max", "o2_mean", "temp_min", "temp_max", "temp_mean"):
+        out[key] = np.full(buckets, np.nan)
+    out["mask"] = np.zeros(buckets, "u8")
+    if len(s["t"]) and nonempty.any():
+        at = starts[nonempty]
+        n = np.add.reduceat(s["n"], at)
+        out["n"][nonempty] = n
+        out["o2_min"][nonempty] = np.minimum.reduceat(s["o2_min"], at)
+        out["o2_max"][nonempty] = np.maximum.reduceat(s["o2_max"], at)
+        out["o2_mean"][nonempty] = np.add.reduceat(s["o2_sum"], at) / n
+        out["temp_min"][nonempty] = np.minimum.reduceat(s["temp_min"], at)
+        out["temp_max"][nonempty] = np.maximum.reduceat(s["temp_max"], at)
+        out["temp_mean"][nonempty] = np.add.reduceat(s["temp_sum"], at) / n
+        out["mask"][nonempty] = np.bitwise_or.reduceat(s["mask"], at)
+    return out
+
+
+def reduce_samples(samples, edges):
+    """Mín/máx/média por intervalo de amostras cruas (dicionário t, o2, temp, mask)."""
+    import numpy as np
+    t = samples["t"]
+    summary = {"t": t, "n": np.ones(len(t)),
+               "o2_min": samples["o2"], "o2_max": samples["o2"], "o2_sum": samples["o2"].astype("f8"),
+               "temp_min": samples["temp"], "temp_max": samples["temp"],
+               "temp_sum": samples["temp"].astype("f8"), "mask": samples["mask"]}
+    return _reduce(np, summary, np.asarray(edges, "f8"))
+
+
+# ==================== BUFFER CIRCULAR + LOG ====================
+class Telemetria:
+    """Buffer circular em memória com despejo periódico para o log binário.
+
+    Com readonly=True o log em `path` é só consultado (gravado por outro
+    processo, ex.: o controlador); as amostras ficam apenas no buffer."""
+
+    def __init__(self, path=None, capacity=24 * 3600 * 2, flush_interval=5.0, readonly=False):
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self._t = array("d", bytes(8 * capacity))
+        self._o2 = array("f", bytes(4 * capacity))
+        self._temp = array("f", bytes(4 * capacity))
+        self._mask = array("Q", bytes(8 * capacity))
+        self._head = 0
+        self._count = 0
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self.log = TelemetryLog(path) if path and not readonly else None
+        self.path = path
+        self._reader = None
+
+    def append(self, t, o2, temp, mask):
+        """Registra uma amostra (O(1), sem alocação)."""
+        with self._lock:
+            i = self._head
+            if self._count:
+                # Mesma regra do log: t nunca diminui, e um passo grande recomeça o buffer
+                if self._t[i - 1] - t > CLOCK_STEP_TOLERANCE:
+                    self._count = 0
+                else:
+                    t = max(t, self._t[i - 1])
+            self._t[i] = t
+            self._o2[i] = o2
+            self._temp[i] = temp
+            self._mask[i] = mask
+            self._head = (i + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+            if self.log is not None:
+                self.log.append(t, o2, temp, mask)
+                now = time.monotonic()
+                if now - self._last_flush >= self.flush_interval:
+                    self.log.flush()
+                    self._last_flush = now
+
+    def __len__(self):
+        return self._count
+
+    def recent(self, seconds=None):
+        """Amostras do buffer em ordem cronológica, como dicionário de arrays NumPy.
+
+        Com `seconds`, copia só as amostras dos últimos segundos (busca binária)."""
+        import numpy as np
+        with self._lock:
+            n, head, cap = self._count, self._head, self.capacity
+            skip = 0
+            if seconds is not None and n:
+                cutoff = self._t[(head - 1) % cap] - seconds
+                lo, hi = 0, n
+                while lo < hi:
+                    mid = (lo + hi) // 2
+                    if self._t[(head - n + mid) % cap] < cutoff:
+                        lo = mid + 1
+                    else:
+                        hi = mid
+                skip = lo
+            start = (head - n + skip) % cap
+            size = n - skip
+            cols = []
+            for a, d in ((self._t, "f8"), (self._o2, "f4"), (self._temp, "f4"), (self._mask, "u8")):
+                view = np.frombuffer(a, dtype=d)
+                if start + size <= cap:
+                    cols.append(view[start:start + size].copy())
+                else:
+                    cols.append(np.concatenate([view[start:], view[:start + size - cap]]))
+        t, o2, temp, mask = cols
+        return {"t": t, "o2": o2, "temp": temp, "mask": mask}
+
+    def flush(self):
+        with self._lock:
+            if self.log is not None:
+                self.log.flush()
+                self._last_flush = time.monotonic()
+
+    def reader(self):
+        """Leitor do log (atualizado para incluir tudo o que já foi despejado)."""
+        self.flush()
+        if self._reader is None:
+            self._reader = TelemetryReader(self.path)
+        else:
+            self._reader.refresh()
+        return self._reader
+
+    def _sem_log(self):
+        # No modo somente-leitura o log pode ainda não existir (o controlador não despejou nada)
+        return self.path is None or not os.path.exists(self.path)
+
+    def _recent_between(self, t_start, t_end):
+        s = self.recent()
+        sel = (s["t"] >= t_start) & (s["t"] < t_end)
+        return {k: v[sel] for k, v in s.items()}
+
+    def query(self, t_start, t_end):
+        """Registros do log em [t_start, t_end); sem log, os do buffer."""
+        if self._sem_log():
+            import numpy as np
+            s = self._recent_between(t_start, t_end)
+            records = np.zeros(len(s["t"]), _record_dtype(np))
+            for k, v in s.items():
+                records[k] = v
+            return records
+        return self.reader().query(t_start, t_end)
+
+    def downsample(self, t_start, t_end, buckets):
+        """Como TelemetryReader.downsample(); sem log, reduz as amostras do buffer."""
+        if self._sem_log():
+            import numpy as np
+            return reduce_samples(self._recent_between(t_start, t_end), np.linspace(t_start, t_end, buckets + 1))
+        return self.reader().downsample(t_start, t_end, buckets)
+
+    def close(self):
+        with self._lock:
+            if self.log is not None:
+                self.log.close()
+                self.log = None
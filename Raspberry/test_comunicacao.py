@@ -0,0 +1,59 @@
+"""Números de sequência dos quadros versionados (SequenceTracker)."""
+
+import comunicacao
+
+
+def _quadro(seq, node=1):
+    return comunicacao.Frame(1, node, seq, 0, 0, [(6.5, 27.0)])
+
+
+def _aceitos(tracker, seqs):
+    return [s for s in seqs if tracker.accept(_quadro(s))]
+
+
+def test_reinicio_da_estacao_ressincroniza():
+    tracker = comunicacao.SequenceTracker()
+    assert _aceitos(tracker, [98, 99, 100, 0, 1, 2, 3]) == [98, 99, 100, 0, 1, 2, 3]
+    assert tracker.out_of_order == 0
+    assert tracker.lost == 0
+    assert tracker.resyncs == 1
+
+
+def test_reinicio_com_salto_para_frente_nao_conta_perdas():
+    tracker = comunicacao.SequenceTracker()
+    assert _aceitos(tracker, [50000, 50001, 0, 1]) == [50000, 50001, 0, 1]
+    assert tracker.lost == 0
+    assert tracker.resyncs == 1
+
+
+def test_reinicio_logo_apos_outro_reinicio():
+    # Dentro da janela de reordenação: descarta até RESYNC_FRAMES - 1 quadros
+    tracker = comunicacao.SequenceTracker()
+    assert _aceitos(tracker, [0, 1, 2, 3, 4, 5, 0, 1, 2, 3]) == [0, 1, 2, 3, 4, 5, 2, 3]
+    assert tracker.resyncs == 1
+
+
+def test_atrasados_duplicados_e_perdas():
+    tracker = comunicacao.SequenceTracker()
+    assert _aceitos(tracker, [10, 11, 11, 14, 12, 15, 0xFFFF]) == [10, 11, 14, 15]
+    assert tracker.duplicates == 1
+    assert tracker.out_of_order == 2
+    assert tracker.lost == 2
+    # Volta natural do contador de 16 bits
+    tracker = comunicacao.SequenceTracker()
+    assert _aceitos(tracker, [0xFFFE, 0xFFFF, 0, 2]) == [0xFFFE, 0xFFFF, 0, 2]
+    assert tracker.lost == 1
+    assert tracker.resyncs == 0
+
+
+def test_amostras_sinalizadas_pelo_sensor_nao_sao_usadas():
+    tracker = comunicacao.SequenceTracker()
+    ok = comunicacao.Frame(1, 1, 0, 0, 0, [(6.5, 27.0)])
+    velho = comunicacao.Frame(1, 1, 1, comunicacao.FLAG_SENSOR_STALE, 0, [(0.0, 0.0)])
+    assert tracker.accept(ok) and tracker.usable(ok)
+    assert tracker.accept(velho) and not tracker.usable(velho)
+    assert tracker.stats()["sensor_sinalizados"] == 1
+    # Decodificado do payload, com o formato compacto
+    payload = comunicacao.encode_frame([(5.0, 26.0)], node=1, seq=2,
+                                       flags=comunicacao.FLAG_SENSOR_ERROR)
+    assert not tracker.usable(comunicacao.decode_frame(payload))
@@ -0,0 +1,20 @@
+"""Validação da especificação do condicionamento (AERACAO_FILTRO)."""
+
+import pytest
+
+import condicionamento
+
+
+@pytest.mark.parametrize("especificacao", [
+    "mediana:0", "mediana:0.5", "pico:-1", "pico:0", "pico:1:-1", "histerese:-0.1", "ema:0", "ema:1.5",
+    "ema", "histerese", "mediana:x", "desconhecida:1", "mediana:5;mediana:0",
+])
+def test_especificacao_invalida_falha_na_criacao(especificacao):
+    with pytest.raises(ValueError):
+        condicionamento.Condicionador(especificacao)
+
+
+def test_histerese_segura_o_aerador_ate_sair_da_banda():
+    c = condicionamento.Condicionador("histerese:0.2")
+    mascaras = [c.calcular(o2, [5.0])[1] for o2 in (5.3, 5.0, 5.1, 5.2, 5.21, 5.1)]
+    assert mascaras == [0, 1, 1, 1, 0, 0]
@@ -0,0 +1,42 @@
+"""Tempo de resposta medido pelo mestre RTU contra o simulador (com injeção de falhas)."""
+
+import asyncio, os, sys, tty
+import modbus_rtu
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import yokogawa_do71, yokogawa_falhas
+
+
+async def _ler(injetor, n):
+    master_fd, slave_fd = os.openpty()
+    tty.setraw(master_fd)
+    tty.setraw(slave_fd)
+    rtu = yokogawa_falhas.RtuComFalhas(yokogawa_do71.criar_contexto([1]), slave_fd, injetor)
+    rtu.start()
+    master = modbus_rtu.ModbusRtuMaster(master_fd, timeout=0.5)
+    await master.open()
+    try:
+        for _ in range(n):
+            await master.read_holding(1, 2091, 1)
+    finally:
+        master.close()
+        rtu.close()
+        os.close(master_fd)
+        os.close(slave_fd)
+    return master.stats(1.0)
+
+
+def test_resposta_sem_falhas_nao_e_zero():
+    stats = asyncio.run(_ler(yokogawa_falhas.InjetorFalhas([]), 4))
+    assert stats["timeouts"] == 0
+    assert 0 < stats["resposta_ms_media"] < 100
+
+
+def test_atraso_injetado_aparece_nas_estatisticas_do_mestre():
+    injetor = yokogawa_falhas.InjetorFalhas(yokogawa_falhas.ler_perfil("atraso:0.2@/2"))
+    stats = asyncio.run(_ler(injetor, 4))
+    assert injetor.contagem["atraso"] == 2
+    assert stats["timeouts"] == 0
+    assert stats["resposta_ms_max"] >= 200
+    assert stats["resposta_ms_media"] >= 100  # Metade das respostas atrasadas
+    assert abs(stats["resposta_ms_max"] - injetor.as_dict()["latencia_ms_max"]) < 20
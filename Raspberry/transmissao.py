@@ -0,0 +1,144 @@
+"""
+Transmissor de máscaras fora do caminho de recepção
+---------------------------------------------------
+- Thread dedicada com caixa de correio de uma posição: a máscara mais recente
+  substitui qualquer máscara ainda não entregue
+- Não reenvia máscara inalterada, exceto a cada período de keep-alive
+- Tentativas com backoff exponencial limitado, uma escrita por vez no rádio
+- Cada submit() retorna um Future: True (ACK), False (falhou) ou None (substituída)
+"""
+
+import threading, time
+from concurrent.futures import Future
+import comunicacao
+import metricas
+
+
+class MaskTransmitter(threading.Thread):
+    def __init__(self, keepalive=30.0, max_attempts=5, backoff=0.02, max_backoff=0.2,
+                 send=None, on_result=None):
+        super().__init__(daemon=True)
+        self.keepalive = keepalive        # Reenvio periódico da mesma máscara (s)
+        self.max_attempts = max_attempts  # Tentativas de software por máscara
+        self.backoff = backoff            # Espera após a primeira falha (s), dobra a cada falha
+        self.max_backoff = max_backoff    # Espera máxima entre tentativas (s)
+        self.send = send or comunicacao.send_mask_once
+        self.on_result = on_result        # Chamado como on_result(mask, ok) na thread do transmissor
+        self.running = True
+        self._cond = threading.Condition()
+        self._pending = None              # (máscara, future) aguardando envio
+        self._current = None              # (máscara, future) em envio
+        self._last_acked = None
+        self._last_acked_at = 0.0
+        # Estatísticas
+        self.submitted = 0
+        self.skipped = 0
+        self.superseded = 0
+        self.writes = 0
+        self.acked = 0
+        self.failed = 0
+        self.radio_time = 0.0             # Tempo total com o radio_lock ocupado (s)
+
+    def submit(self, mask):
+        """Entrega a máscara ao transmissor sem bloquear; retorna um Future."""
+        future = Future()
+        with self._cond:
+            self.submitted += 1
+            if (self._pending is None and self._current is None and mask == self._last_acked
+                    and time.monotonic() - self._last_acked_at < self.keepalive):
+                self.skipped += 1
+                future.set_result(True)
+                return future
+            if self._pending is not None:
+                self._supersede()
+            self._pending = (mask, future)
+            self._cond.notify()
+        return future
+
+    def _supersede(self):
+        """Descarta a máscara pendente (chamado com o lock)."""
+        _, old = self._pending
+        self._pending = None
+        self.superseded += 1
+        old.set_result(None)
+
+    def run(self):
+        while True:
+            with self._cond:
+                while self.running and self._pending is None:
+                    self._cond.wait(0.5)
+                if not self.running:
+                    break
+                self._current = self._pending
+                self._pending = None
+            mask, future = self._current
+
+            ok = self._deliver(mask)
+            with self._cond:
+                self._current = None
+                self._cond.notify_all()
+                if ok is None:
+                    self.superseded += 1
+                elif ok:
+                    self.acked += 1
+                    self._last_acked = mask
+                    self._last_acked_at = time.monotonic()
+                else:
+                    self.failed += 1
+                    self._last_acked = None
+                    if __debug__ and metricas.ATIVO:
+                        metricas.tx_falhas.inc()
+            future.set_result(ok)
+            if ok is not None and self.on_result is not None:
+                self.on_result(mask, ok)
+
+    def _deliver(self, mask):
+        """Tenta entregar a máscara; retorna True/False, ou None se foi substituída."""
+        delay = self.backoff
+        for attempt in range(self.max_attempts):
+            t0 = time.perf_counter()
+            ok = self.send(mask)
+            elapsed = time.perf_counter() - t0
+            self.radio_time += elapsed
+            self.writes += 1
+            if __debug__ and metricas.ATIVO:
+                metricas.tx_escrita.observe(elapsed)
+                if attempt:
+                    metricas.tx_retentativas.inc()
+            if ok:
+                return True
+            if attempt + 1 == self.max_attempts:
+                break
+            with self._cond:
+                # Espera o backoff, mas desiste se chegar máscara nova
+                self._cond.wait_for(lambda: self._pending is not None or not self.running,
+                                    timeout=delay)
+                if self._pending is not None:
+                    return None
+                if not self.running:
+                    break
+            delay = min(delay * 2, self.max_backoff)
+        return False
+
+    def wait_idle(self, timeout=None):
+        """Espera não haver máscara pendente nem em envio; retorna False no timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._pending is None and self._current is None, timeout)
+
+    def stop(self):
+        with self._cond:
+            self.running = False
+            if self._pending is not None:
+                self._supersede()
+            self._cond.notify_all()
+
+    def stats(self):
+        return {
+            "submetidas": self.submitted,
+            "puladas": self.skipped,
+            "substituidas": self.superseded,
+            "escritas": self.writes,
+            "ack": self.acked,
+            "falhas": self.failed,
+            "tempo_radio_s": round(self.radio_time, 4),
+        }
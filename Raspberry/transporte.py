@@ -0,0 +1,330 @@
+"""
+Camada de transporte do rádio nRF24L01+
+---------------------------------------
+- Backend "rf24": driver real pyrf24 (Raspberry Pi, CE=GPIO25, CSN=SPI0-CE0)
+- Backend "virtual": nRF24 simulado em processo (VirtualRF24), ligado a um
+  "éter" compartilhado (VirtualEther) que reproduz o limite de 32 bytes,
+  o auto-ACK, as retransmissões de hardware e perda/latência configuráveis
+- Os dois backends expõem a mesma API (nomes do pyrf24), então o código de
+  comunicacao.py roda sem alterações fora do Pi
+"""
+
+import os, random, threading, time
+from collections import deque
+
+try:
+    from pyrf24 import RF24, RF24_PA_MAX, RF24_250KBPS, RF24_CRC_16
+except ImportError:
+    RF24 = None
+    # Mesmos valores numéricos dos enums da biblioteca RF24
+    RF24_PA_MAX = 3
+    RF24_250KBPS = 2
+    RF24_CRC_16 = 2
+
+# ==================== LIMITES DO nRF24L01+ ====================
+MAX_PAYLOAD = 32        # Tamanho máximo de payload em bytes
+RX_FIFO_DEPTH = 3       # Profundidade da FIFO de recepção
+NUM_PIPES = 6           # Pipes de leitura (0–5)
+
+# Taxas de dados (bits/s) indexadas pelo valor do enum RF24_xxxKBPS
+_DATA_RATES = {0: 1_000_000, 1: 2_000_000, 2: 250_000}
+
+
+# ==================== BACKEND REAL ====================
+def create_radio(backend=None, ce_pin=25, csn_pin=0, ether=None):
+    """Cria o rádio do backend escolhido ("rf24" ou "virtual").
+
+    Sem argumento, o backend vem da variável de ambiente AERACAO_RADIO
+    (padrão "rf24")."""
+    backend = backend or os.environ.get("AERACAO_RADIO", "rf24")
+    if backend == "rf24":
+        if RF24 is None:
+            raise RuntimeError("pyrf24 não instalado; use AERACAO_RADIO=virtual fora do Pi.")
+        return RF24(ce_pin, csn_pin)
+    if backend == "virtual":
+        return VirtualRF24(ether, name="rpi")
+    raise ValueError(f"Backend de rádio desconhecido: {backend!r}")
+
+
+# ==================== BACKEND VIRTUAL ====================
+class VirtualEther:
+    """Meio de transmissão compartilhado pelos rádios virtuais.
+
+    - loss: probabilidade de perda de cada pacote (e de cada ACK)
+    - latency: atraso extra por tentativa, em segundos
+    - realtime: se False, não dorme o tempo de ar (executa o mais rápido possível)
+    - ruido: {canal: probabilidade} de portadora no canal (testRPD) e de perda
+      extra dos pacotes nele; pode ser trocado durante a execução (perda roteirizada)
+    """
+
+    def __init__(self, loss=0.0, latency=0.0, realtime=True, seed=None):
+        self.loss = loss
+        self.latency = latency
+        self.realtime = realtime
+        self.ruido = {}
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.radios = []
+
+    def attach(self, radio):
+        with self.lock:
+            self.radios.append(radio)
+
+    def airtime(self, radio):
+        """Tempo de ar de um pacote (preâmbulo + endereço + PCF + payload + CRC)."""
+        bits = 8 * (1 + len(radio._tx_address or b"") + radio.payload_size + radio._crc_bytes) + 9
+        return bits / _DATA_RATES.get(radio._data_rate, 1_000_000)
+
+    def wait(self, seconds):
+        if self.realtime and seconds > 0:
+            time.sleep(seconds)
+
+    def _lost(self, channel=None):
+        loss = max(self.loss, self.ruido.get(channel, 0.0))
+        return loss > 0 and self.rng.random() < loss
+
+    def carrier(self, channel):
+        """Portadora detectada no canal (sinal acima de -64 dBm) em uma amostra."""
+        noise = self.ruido.get(channel, 0.0)
+        return noise > 0 and self.rng.random() < noise
+
+    def transmit(self, sender, payload, pid):
+        """Uma tentativa de envio. Retorna True se o ACK chegou ao transmissor."""
+        if self._lost(sender._channel):
+            return False
+        with self.lock:
+            for radio in self.radios:
+                if radio is sender or not radio._listening or radio._channel != sender._channel:
+                    continue
+                pipe = radio._pipe_for(sender._tx_address)
+                if pipe is None:
+                    continue
+                if not radio._receive(payload, pipe, (id(sender), pid)):
+                    return False  # FIFO cheia: o receptor não envia ACK
+                break
+            else:
+                return False  # Ninguém escutando este endereço
+        if not sender._auto_ack:
+            return True
+        return not self._lost(sender._channel)
+
+
+_default_ether = None
+
+
+def default_ether():
+    """Éter único do processo, usado quando nenhum é informado."""
+    global _default_ether
+    if _default_ether is None:
+        _default_ether = VirtualEther()
+    return _default_ether
+
+
+class VirtualRF24:
+    """nRF24L01+ simulado com a mesma API do pyrf24 usada pelo projeto."""
+
+    def __init__(self, ether=None, name=""):
+        self.name = name
+        self.ether = ether or default_ether()
+        self.payload_size = MAX_PAYLOAD
+        self._channel = 76
+        self._data_rate = 0
+        self._crc_bytes = 2
+        self._auto_ack = True
+        self._retry_delay = 5
+        self._retry_count = 15
+        self._listening = False
+        self._tx_address = None
+        self._rx_addresses = [None] * NUM_PIPES
+        self._rx_fifo = deque()
+        self._last_rx = [None] * NUM_PIPES
+        self._pid = 0
+        self._arc = 0
+        # Linha IRQ simulada (ativa em RX_DR), com descritor selecionável opcional
+        self._irq_mask_rx = False
+        self._rx_dr = False
+        self._irq = threading.Event()
+        self._irq_pipe = None
+        # Estatísticas
+        self.tx_packets = 0
+        self.tx_failed = 0
+        self.tx_attempts = 0
+        self.rx_packets = 0
+        self.rx_dropped = 0
+        self.airtime_s = 0.0
+        self.tx_time_s = 0.0  # Tempo de ar mais atrasos de retransmissão (simulado, mesmo sem realtime)
+        self.ether.attach(self)
+
+    # -------- Configuração --------
+    def begin(self):
+        return True
+
+    def isChipConnected(self):
+        return True
+
+    def setPALevel(self, level, lna_enable=True):
+        self._pa_level = level
+
+    def setDataRate(self, rate):
+        self._data_rate = int(rate)
+        return True
+
+    def setChannel(self, channel):
+        self._channel = int(channel)
+
+    def getChannel(self):
+        return self._channel
+
+    def setCRCLength(self, length):
+        self._crc_bytes = int(length)
+
+    def setAutoAck(self, enable):
+        self._auto_ack = bool(enable)
+
+    def setRetries(self, delay, count):
+        self._retry_delay = min(int(delay), 15)
+        self._retry_count = min(int(count), 15)
+
+    def setPayloadSize(self, size):
+        self.payload_size = max(1, min(int(size), MAX_PAYLOAD))
+
+    # -------- Pipes e modos --------
+    def openWritingPipe(self, address):
+        self._tx_address = bytes(address)
+
+    def openReadingPipe(self, pipe, address):
+        if not 0 <= pipe < NUM_PIPES:
+            raise ValueError(f"Pipe inválido: {pipe}")
+        self._rx_addresses[pipe] = bytes(address)
+
+    def closeReadingPipe(self, pipe):
+        self._rx_addresses[pipe] = None
+
+    def startListening(self):
+        self._listening = True
+
+    def stopListening(self):
+        self._listening = False
+
+    def _pipe_for(self, address):
+        for pipe, addr in enumerate(self._rx_addresses):
+            if addr is not None and addr == address:
+                return pipe
+        return None
+
+    # -------- Recepção --------
+    def _receive(self, payload, pipe, packet_id):
+        """Chamado pelo éter (com o lock) ao chegar um pacote neste rádio."""
+        if packet_id == self._last_rx[pipe]:
+            return True  # Retransmissão de pacote já recebido: ACK sem duplicar
+        if len(self._rx_fifo) >= RX_FIFO_DEPTH:
+            self.rx_dropped += 1
+            return False
+        self._last_rx[pipe] = packet_id
+        self._rx_fifo.append((pipe, payload))
+        self.rx_packets += 1
+        self._rx_dr = True
+        if not self._irq_mask_rx:
+            self._irq.set()
+            if self._irq_pipe is not None:
+                try:
+                    os.write(self._irq_pipe[1], b"\x01")
+                except BlockingIOError:
+                    pass
+        return True
+
+    def available(self):
+        return bool(self._rx_fifo)
+
+    def available_pipe(self):
+        with self.ether.lock:
+            if self._rx_fifo:
+                return True, self._rx_fifo[0][0]
+        return False, 0
+
+    def rxFifoFull(self):
+        return len(self._rx_fifo) >= RX_FIFO_DEPTH
+
+    def read(self, length=None):
+        length = self.payload_size if length is None else length
+        with self.ether.lock:
+            if not self._rx_fifo:
+                return bytes(length)
+            _, payload = self._rx_fifo.popleft()
+        return payload[:length].ljust(length, b"\x00")
+
+    def flush_rx(self):
+        with self.ether.lock:
+            self._rx_fifo.clear()
+
+    def flush_tx(self):
+        pass
+
+    # -------- Transmissão --------
+    def write(self, buf):
+        """Envia um payload com auto-ACK e até `count` retransmissões de hardware."""
+        buf = bytes(buf)
+        if len(buf) > MAX_PAYLOAD:
+            raise ValueError(f"Payload de {len(buf)} bytes excede {MAX_PAYLOAD} bytes")
+        if self._tx_address is None:
+            return False
+        payload = buf.ljust(self.payload_size, b"\x00")
+        self._pid = (self._pid + 1) & 0x03  # PID de 2 bits, como no chip
+        attempts = 1 + (self._retry_count if self._auto_ack else 0)
+        airtime = self.ether.airtime(self) + self.ether.latency
+        self.tx_packets += 1
+        for attempt in range(attempts):
+            self.tx_attempts += 1
+            self.airtime_s += airtime
+            self.tx_time_s += airtime
+            self.ether.wait(airtime)
+            if self.ether.transmit(self, payload, self._pid):
+                self._arc = attempt
+                return True
+            if attempt + 1 < attempts:
+                # Atraso de retransmissão: (delay + 1) * 250 µs
+                self.tx_time_s += (self._retry_delay + 1) * 250e-6
+                self.ether.wait((self._retry_delay + 1) * 250e-6)
+        self._arc = attempts - 1
+        self.tx_failed += 1
+        return False
+
+    def getARC(self):
+        return self._arc
+
+    def testRPD(self):
+        """Potência recebida acima de -64 dBm no canal atual (amostrada no modo RX)."""
+        return self.ether.carrier(self._channel)
+
+    testCarrier = testRPD
+
+    # -------- IRQ --------
+    def maskIRQ(self, tx_ok, tx_fail, rx_ready):
+        self._irq_mask_rx = bool(rx_ready)
+
+    def whatHappened(self):
+        """Lê e limpa as flags de status (tx_ds, tx_df, rx_dr), soltando a linha IRQ."""
+        with self.ether.lock:
+            rx_dr, self._rx_dr = self._rx_dr, False
+            self._irq.clear()
+            if self._irq_pipe is not None:
+                try:
+                    while os.read(self._irq_pipe[0], 64):
+                        pass
+                except BlockingIOError:
+                    pass
+        return False, False, rx_dr
+
+    def wait_irq(self, timeout=None):
+        """Bloqueia até a linha IRQ ser ativada (ou até o timeout)."""
+        return self._irq.wait(timeout)
+
+    def fileno(self):
+        """Descritor que fica legível enquanto a IRQ estiver ativa (para select/asyncio)."""
+        if self._irq_pipe is None:
+            self._irq_pipe = os.pipe()
+            for fd in self._irq_pipe:
+                os.set_blocking(fd, False)
+            if self._irq.is_set():
+                os.write(self._irq_pipe[1], b"\x01")
+        return self._irq_pipe[0]
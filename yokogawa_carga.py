@@ -0,0 +1,207 @@
+"""
+Gerador de carga Modbus para o simulador Yokogawa DO71/DO72
+-----------------------------------------------------------
+- TCP: várias conexões, cada uma com várias requisições em voo, distribuídas
+  entre os IDs de escravo
+- RTU: uma transação por vez (barramento half-duplex), pelo mestre do Raspberry
+  (Raspberry/modbus_rtu.py)
+- Mede requisições/s e a latência de resposta (p50/p99/máx)
+- --iniciar sobe o simulador (yokogawa_do71.py --pty/--tcp) em outro processo
+
+Uso:
+    python yokogawa_carga.py --iniciar --escravos 1-32 --conexoes 4 --em-voo 8
+    python yokogawa_carga.py --tcp 127.0.0.1:5020 --escravos 1-8 --duracao 10
+    python yokogawa_carga.py --iniciar --rtu --escravos 1-8
+"""
+
+import argparse, asyncio, json, os, random, re, struct, subprocess, sys, threading, time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BASE_DIR, "Raspberry"))
+
+import mapa_do71
+from yokogawa_do71 import ler_escravos
+
+MBAP = struct.Struct(">HHHB")
+READ = struct.Struct(">BHH")
+
+
+def percentil(valores, p):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(p / 100 * len(ordenados)))]
+
+
+class Resultado:
+    def __init__(self):
+        self.latencias = []
+        self.erros = 0
+        self.excecoes = 0
+
+    def resumo(self, elapsed, modo):
+        ms = [x * 1000 for x in self.latencias]
+        r = {
+            "modo": modo,
+            "requisicoes": len(ms),
+            "erros": self.erros,
+            "excecoes": self.excecoes,
+            "duracao_s": round(elapsed, 3),
+            "requisicoes_s": round(len(ms) / elapsed, 1) if elapsed else 0.0,
+        }
+        for nome, p in (("p50", 50), ("p99", 99)):
+            v = percentil(ms, p)
+            r[f"latencia_ms_{nome}"] = round(v, 3) if v is not None else None
+        r["latencia_ms_max"] = round(max(ms), 3) if ms else None
+        return r
+
+
+# ==================== TCP ====================
+async def conexao_tcp(host, port, escravos, endereco, quantidade, em_voo, fim, resultado, rng):
+    reader, writer = await asyncio.open_connection(host, port)
+    pendentes = {}
+    vaga = asyncio.Semaphore(em_voo)
+    tid = 0
+
+    async def receber():
+        while pendentes or time.monotonic() < fim:
+            try:
+                header = await reader.readexactly(MBAP.size)
+            except asyncio.IncompleteReadError:
+                return
+            t_id, _, length, _ = MBAP.unpack(header)
+            pdu = await reader.readexactly(length - 1)
+            t0 = pendentes.pop(t_id, None)
+            vaga.release()
+            if t0 is None:
+                resultado.erros += 1
+                continue
+            if pdu[0] & 0x80:
+                resultado.excecoes += 1
+            resultado.latencias.append(time.monotonic() - t0)
+
+    tarefa = asyncio.create_task(receber())
+    pdu = READ.pack(3, endereco, quantidade)
+    while time.monotonic() < fim:
+        await vaga.acquire()
+        tid = (tid + 1) & 0xFFFF
+        pendentes[tid] = time.monotonic()
+        writer.write(MBAP.pack(tid, 0, len(pdu) + 1, rng.choice(escravos)) + pdu)
+    try:
+        await asyncio.wait_for(tarefa, 5.0)
+    except asyncio.TimeoutError:
+        resultado.erros += len(pendentes)
+    writer.close()
+
+
+async def carga_tcp(host, port, escravos, endereco, quantidade, conexoes, em_voo, duracao, seed=1):
+    resultado = Resultado()
+    fim = time.monotonic() + duracao
+    t0 = time.monotonic()
+    await asyncio.gather(*(conexao_tcp(host, port, escravos, endereco, quantidade, em_voo, fim, resultado,
+                                       random.Random(seed + i)) for i in range(conexoes)))
+    return resultado.resumo(time.monotonic() - t0, f"tcp, {conexoes} conexões × {em_voo} em voo")
+
+
+# ==================== RTU ====================
+async def carga_rtu(porta, escravos, endereco, quantidade, duracao, baud):
+    import modbus_rtu
+    master = modbus_rtu.ModbusRtuMaster(porta, baud, timeout=0.5)
+    await master.open()
+    resultado = Resultado()
+    frames = [(modbus_rtu.ModbusRtuMaster.request_frame(s, endereco, quantidade), 5 + 2 * quantidade)
+              for s in escravos]
+    t0 = time.monotonic()
+    fim = t0 + duracao
+    i = 0
+    try:
+        while time.monotonic() < fim:
+            frame, esperado = frames[i % len(frames)]
+            i += 1
+            inicio = time.monotonic()
+            try:
+                await master.transact(frame, esperado)
+                resultado.latencias.append(time.monotonic() - inicio)
+            except modbus_rtu.ModbusTimeout:
+                resultado.erros += 1
+            except modbus_rtu.ModbusError:
+                resultado.excecoes += 1
+    finally:
+        master.close()
+    r = resultado.resumo(time.monotonic() - t0, f"rtu, {baud} bps")
+    r["ocupacao_barramento"] = master.stats(time.monotonic() - t0)["ocupacao_barramento"]
+    return r
+
+
+# ==================== SIMULADOR ====================
+def iniciar_simulador(escravos, rtu=False, baud=19200):
+    """Sobe o simulador e retorna (processo, porta do pty ou None, porta TCP ou None)."""
+    ids = ",".join(map(str, escravos))
+    cmd = [sys.executable, os.path.join(BASE_DIR, "yokogawa_do71.py"), "--escravos", ids,
+           "--cenario", "diurno", "--baud", str(baud)]
+    cmd += ["--pty"] if rtu else ["--tcp", "0"]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    pty = tcp = None
+    for linha in proc.stdout:
+        if m := re.search(r"Porta: (/dev/\S+)", linha):
+            pty = m.group(1)
+        if m := re.search(r"Modbus TCP: 127\.0\.0\.1:(\d+)", linha):
+            tcp = int(m.group(1))
+        if (rtu and pty) or (not rtu and tcp):
+            break
+    else:
+        raise RuntimeError("O simulador encerrou antes de abrir a porta")
+    # O simulador continua escrevendo (cenário, erros); sem ninguém lendo o pipe
+    # ele trava no print quando o buffer do sistema enche
+    threading.Thread(target=_descartar, args=(proc.stdout,), daemon=True).start()
+    return proc, pty, tcp
+
+
+def _descartar(arquivo):
+    for _ in arquivo:
+        pass
+
+
+async def _main(args):
+    proc = None
+    host, port = "127.0.0.1", 5020
+    porta_rtu = args.rtu if isinstance(args.rtu, str) else None
+    if args.iniciar:
+        proc, porta_rtu, port = iniciar_simulador(args.escravos, rtu=bool(args.rtu), baud=args.baud)
+    elif args.tcp:
+        host, _, p = args.tcp.rpartition(":")
+        host, port = host or "127.0.0.1", int(p)
+    endereco = mapa_do71.MAPA["o2"].endereco
+    try:
+        if args.rtu:
+            r = await carga_rtu(porta_rtu, args.escravos, endereco, args.quantidade, args.duracao, args.baud)
+        else:
+            r = await carga_tcp(host, port, args.escravos, endereco, args.quantidade, args.conexoes,
+                                args.em_voo, args.duracao)
+    finally:
+        if proc is not None:
+            proc.terminate()
+    r["escravos"] = len(args.escravos)
+    if args.json:
+        print(json.dumps(r))
+    else:
+        print(f"{r['modo']} | {r['escravos']} escravos | {r['requisicoes']} requisições em {r['duracao_s']} s "
+              f"= {r['requisicoes_s']} req/s")
+        print(f"Latência: p50={r['latencia_ms_p50']} ms | p99={r['latencia_ms_p99']} ms | "
+              f"máx={r['latencia_ms_max']} ms | erros={r['erros']} | exceções={r['excecoes']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iniciar", action="store_true", help="sobe o simulador em outro processo")
+    parser.add_argument("--tcp", help="endereço host:porta de um simulador já em execução")
+    parser.add_argument("--rtu", nargs="?", const=True, help="usa RTU (pty do simulador ou porta informada)")
+    parser.add_argument("--baud", type=int, default=19200, help="baud rate (define o t3.5 no RTU)")
+    parser.add_argument("--escravos", type=ler_escravos, default=[1], help="IDs consultados, ex.: 1-32")
+    parser.add_argument("--conexoes", type=int, default=4, help="conexões TCP simultâneas")
+    parser.add_argument("--em-voo", type=int, default=8, help="requisições em voo por conexão TCP")
+    parser.add_argument("--quantidade", type=int, default=2, help="registradores por requisição")
+    parser.add_argument("--duracao", type=float, default=5.0, help="duração da carga (s)")
+    parser.add_argument("--json", action="store_true", help="imprime o resultado em JSON")
+    args = parser.parse_args()
+    asyncio.run(_main(args))
@@ -0,0 +1,193 @@
+"""
+Cenários do simulador Yokogawa DO71/DO72
+----------------------------------------
+- Geradores de forma de onda: ciclo diurno de O2, queda brusca, deriva do sensor
+- Reprodução de registros gravados: CSV (t, o2, temp) ou telemetria.bin do Raspberry
+- Reprodutor com velocidade configurável (ex.: 600x = 10 min de viveiro por
+  segundo) e atualização dos registradores em passos de fração de segundo
+"""
+
+import bisect, csv, math, os, random, sys, threading, time
+
+DIA = 24 * 3600
+
+
+# ==================== GERADORES ====================
+class Diurno:
+    """Ciclo diário: O2 máximo à tarde (fotossíntese) e mínimo de madrugada."""
+
+    def __init__(self, media=6.5, amplitude=3.5, temp_media=27.0, temp_amplitude=2.0,
+                 hora_inicial=0.0, ruido=0.05, seed=1):
+        self.media = media
+        self.amplitude = amplitude
+        self.temp_media = temp_media
+        self.temp_amplitude = temp_amplitude
+        self.hora_inicial = hora_inicial
+        self.ruido = ruido
+        self.random = random.Random(seed)
+
+    def base(self, t):
+        hora = (self.hora_inicial + t / 3600) % 24
+        o2 = self.media + self.amplitude * math.sin(2 * math.pi * (hora - 9) / 24)
+        temp = self.temp_media + self.temp_amplitude * math.sin(2 * math.pi * (hora - 10) / 24)
+        return o2, temp
+
+    def __call__(self, t):
+        o2, temp = self.base(t)
+        if self.ruido:
+            o2 += self.random.gauss(0, self.ruido)
+        return max(o2, 0.0), temp
+
+    @property
+    def duracao(self):
+        return None  # Sem fim
+
+
+class Queda(Diurno):
+    """Ciclo diurno com uma queda brusca de O2 (ex.: morte de algas) e recuperação."""
+
+    def __init__(self, inicio=2 * 3600, duracao_queda=3 * 3600, minimo=1.5, tau=900, **kw):
+        super().__init__(**kw)
+        self.inicio = inicio
+        self.duracao_queda = duracao_queda
+        self.minimo = minimo
+        self.tau = tau  # Constante de tempo da queda e da recuperação (s)
+
+    def base(self, t):
+        o2, temp = super().base(t)
+        if t < self.inicio:
+            return o2, temp
+        fim = self.inicio + self.duracao_queda
+        # Decai exponencialmente até o mínimo e volta ao ciclo normal depois do fim
+        queda = 1 - math.exp(-(min(t, fim) - self.inicio) / self.tau)
+        if t > fim:
+            queda *= math.exp(-(t - fim) / self.tau)
+        return o2 - (o2 - self.minimo) * queda, temp
+
+
+class Deriva(Diurno):
+    """Ciclo diurno com deriva linear da leitura (incrustação da membrana)."""
+
+    def __init__(self, taxa=-0.5, **kw):
+        super().__init__(**kw)
+        self.taxa = taxa  # mg/L por dia
+
+    def base(self, t):
+        o2, temp = super().base(t)
+        return o2 + self.taxa * t / DIA, temp
+
+
+# ==================== REGISTROS GRAVADOS ====================
+class Registro:
+    """Série (t, o2, temp) gravada, interpolada linearmente; t relativo ao início."""
+
+    def __init__(self, tempos, o2, temp, repetir=False):
+        if not tempos:
+            raise ValueError("Registro vazio")
+        t0 = tempos[0]
+        self.tempos = [t - t0 for t in tempos]
+        self.o2 = list(o2)
+        self.temp = list(temp)
+        self.repetir = repetir
+
+    @property
+    def duracao(self):
+        return None if self.repetir else self.tempos[-1]
+
+    def __call__(self, t):
+        if self.repetir and self.tempos[-1] > 0:
+            t %= self.tempos[-1]
+        i = bisect.bisect_right(self.tempos, t)
+        if i == 0:
+            return self.o2[0], self.temp[0]
+        if i == len(self.tempos):
+            return self.o2[-1], self.temp[-1]
+        t0, t1 = self.tempos[i - 1], self.tempos[i]
+        f = (t - t0) / (t1 - t0) if t1 > t0 else 0.0
+        return (self.o2[i - 1] + f * (self.o2[i] - self.o2[i - 1]),
+                self.temp[i - 1] + f * (self.temp[i] - self.temp[i - 1]))
+
+    @classmethod
+    def csv(cls, path, repetir=False):
+        """CSV com colunas t (s), o2 (mg/L) e temp (°C); cabeçalho opcional."""
+        tempos, o2, temp = [], [], []
+        with open(path, newline="") as f:
+            for linha in csv.reader(f):
+                try:
+                    valores = [float(v) for v in linha[:3]]
+                except ValueError:
+                    continue  # Cabeçalho ou linha inválida
+                if len(valores) == 3:
+                    tempos.append(valores[0])
+                    o2.append(valores[1])
+                    temp.append(valores[2])
+        return cls(tempos, o2, temp, repetir)
+
+    @classmethod
+    def binario(cls, path, repetir=False):
+        """Log binário de telemetria gravado pelo Raspberry (telemetria.bin)."""
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "Raspberry"))
+        import telemetria
+        dados = telemetria.TelemetryReader(path).query(-math.inf, math.inf)
+        return cls(dados["t"].tolist(), dados["o2"].tolist(), dados["temp"].tolist(), repetir)
+
+
+CENARIOS = {"diurno": Diurno, "queda": Queda, "deriva": Deriva}
+
+
+def criar_cenario(nome, repetir=False, **kw):
+    """Nome de gerador (diurno, queda, deriva) ou caminho de um registro .csv/.bin."""
+    if nome in CENARIOS:
+        return CENARIOS[nome](**kw)
+    if nome.endswith(".csv"):
+        return Registro.csv(nome, repetir)
+    return Registro.binario(nome, repetir)
+
+
+# ==================== REPRODUTOR ====================
+class Reprodutor(threading.Thread):
+    """Avança o tempo simulado `velocidade` vezes mais rápido que o real e chama
+    `atualizar(o2, temp)` a cada `passo` segundos reais."""
+
+    def __init__(self, cenario, atualizar, velocidade=1.0, passo=0.1, duracao=None, log_intervalo=5.0):
+        super().__init__(daemon=True)
+        self.cenario = cenario
+        self.atualizar = atualizar
+        self.velocidade = velocidade
+        self.passo = passo
+        self.duracao = duracao if duracao is not None else cenario.duracao  # Tempo simulado (s)
+        self.log_intervalo = log_intervalo
+        self.running = True
+        self.t_sim = 0.0
+        # Estatísticas
+        self.atualizacoes = 0
+        self.atrasos = 0  # Passos que começaram depois do horário previsto
+
+    def run(self):
+        inicio = time.monotonic()
+        proximo = inicio
+        ultimo_log = -math.inf
+        while self.running:
+            agora = time.monotonic()
+            self.t_sim = (agora - inicio) * self.velocidade
+            if self.duracao is not None and self.t_sim > self.duracao:
+                self.t_sim = self.duracao
+                self.running = False
+            o2, temp = self.cenario(self.t_sim)
+            self.atualizar(o2, temp)
+            self.atualizacoes += 1
+            if agora - ultimo_log >= self.log_intervalo:
+                ultimo_log = agora
+                h, resto = divmod(int(self.t_sim), 3600)
+                print(f"[{h:02d}:{resto // 60:02d}:{resto % 60:02d}] O2={o2:.2f} mg/L | Temp={temp:.2f} °C")
+            # Passos em horários fixos, sem acumular o tempo gasto em atualizar()
+            proximo += self.passo
+            espera = proximo - time.monotonic()
+            if espera > 0:
+                time.sleep(espera)
+            else:
+                self.atrasos += 1
+                proximo = time.monotonic()
+
+    def stop(self):
+        self.running = False
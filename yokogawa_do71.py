@@ -2,11 +2,25 @@
 Simulador Modbus RTU da sonda óptica Yokogawa DO71/DO72
 --------------------------------------------------------
 - Implementa um escravo Modbus RTU via RS-485 (USB/TTL)
-- Mapeia registradores 2000–5000 conforme manual
+- Mapeia registradores 2000–4999 conforme manual (tabela em Raspberry/mapa_do71.py)
 - Valores principais:
     - HR2091: Oxigênio (float, mg/L)
     - HR2411: Temperatura (float, °C)
 - Atualiza dinamicamente com teclas ou script externo
+- Modo sem terminal (--cenario): reproduz um registro CSV/binário ou um gerador
+  (diurno, queda, deriva) com velocidade configurável, ver yokogawa_cenarios.py
+- Porta serial virtual (--pty) e Modbus TCP em localhost (--tcp), com várias
+  sondas (IDs de escravo) no mesmo processo, ver yokogawa_servidor.py
+- Injeção de falhas nas respostas RTU (--falhas): atrasos, quadros truncados,
+  CRC inválido, exceções, lacunas entre bytes e valores travados, ver
+  yokogawa_falhas.py
+
+Uso:
+    python yokogawa_do71.py                                  # interativo
+    python yokogawa_do71.py --cenario queda --velocidade 600 # 10 min simulados por segundo
+    python yokogawa_do71.py --cenario registro.csv --passo 0.05
+    python yokogawa_do71.py --pty --tcp 5020 --escravos 1-32 --cenario diurno
+    python yokogawa_do71.py --pty --cenario diurno --falhas timeout --estatisticas 5
 """
 
 # Importa módulos principais do pymodbus para criar um servidor Modbus RTU
@@ -21,9 +35,15 @@ from pymodbus.framer.rtu_framer import ModbusRtuFramer
 from pymodbus.server.sync import StartSerialServer
 # Thread usada para atualizar os valores em segundo plano
 from threading import Thread
-# struct para converter floats em bytes (e vice-versa)
-import struct
+import asyncio
 import time
+import argparse
+import os
+import sys
+
+# Mapa de registradores compartilhado com os clientes do Raspberry
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "Raspberry"))
+import mapa_do71
 
 # ================= CONFIGURAÇÕES =================
 PORTA_SERIAL = "/dev/ttyUSB0"   # Porta serial física/virtual usada (adaptador RS-485)
@@ -31,91 +51,114 @@ BAUDRATE = 19200                # Taxa de transmissão
 STOPBITS = 2                    # Número de bits de parada
 PARIDADE = "N"                  # Paridade (N = nenhuma)
 SLAVE_ID = 1                    # Endereço Modbus do escravo
+ORDEM = mapa_do71.ORDEM_PADRAO  # Ordem das palavras dos floats (CDAB)
 TIMEOUT = 1                     # Tempo máximo de espera em segundos
 
 UPDATE_INTERVAL = 2.0           # Intervalo entre atualizações automáticas
+PASSO_CENARIO = 0.1             # Intervalo entre atualizações no modo cenário (s)
 # =================================================
 
 
 # --- Funções auxiliares ---
 
 
+# Conversor de valores/registradores na ordem configurada
+codec = mapa_do71.Codec(ORDEM)
+
+
 def float_to_regs(value):
-    """Converte um valor float em dois registradores Modbus (formato little endian CDAB)"""
-    # struct.pack empacota o float em 4 bytes (ordem little endian)
-    raw = struct.pack("<f", value)
-    # Divide os 4 bytes em dois inteiros de 16 bits
-    b = struct.unpack("<HH", raw)
-    # Retorna a lista [reg1, reg2] com os dois registradores
-    return list(b)
+    """Converte um valor float em dois registradores Modbus (formato CDAB por padrão)"""
+    return codec.encode("float32", value)
 
 
 def regs_to_float(reg_hi, reg_lo):
     """Converte dois registradores Modbus (16 bits cada) em um float"""
-    # Empacota os dois registradores de volta em 4 bytes
-    raw = struct.pack("<HH", reg_hi, reg_lo)
-    # Desempacota como float de 32 bits (ordem little endian)
-    return struct.unpack("<f", raw)[0]
-
+    return codec.decode("float32", [reg_hi, reg_lo])
 
-# --- Inicializa registradores padrão ---
-registers = [0] * 5000  # Cria lista simulando 5000 registradores (endereços 0–4999)
-
-# Atribuições fixas de configuração, conforme manual da sonda
-registers[2089 - 1] = 0x0080  # Unidade de O2 (mg/L)
-registers[2409 - 1] = 0x0004  # Unidade de temperatura (°C)
-registers[4095 - 1] = 1       # ID do dispositivo
-registers[4101 - 1] = 0x0004  # Baud rate = 19200
-registers[3499 - 1] = 1       # Intervalo de atualização (rate)
 
 # Valores iniciais de leitura
 O2_value = 0.00
 Temp_value = 0.00
-# Converte os floats iniciais em dois registradores cada
-o2_regs = float_to_regs(O2_value)
-t_regs = float_to_regs(Temp_value)
-# Salva os registradores equivalentes nos endereços Modbus esperados
-registers[2091 - 1] = o2_regs[0]
-registers[2091] = o2_regs[1]
-registers[2411 - 1] = t_regs[0]
-registers[2411] = t_regs[1]
+
+
+# --- Inicializa registradores padrão ---
+def criar_registradores():
+    """Bloco de registradores (endereços 2000–4999) com a configuração da sonda.
+
+    Unidades, ID, baud rate e intervalo vêm dos valores padrão do mapa."""
+    return codec.encode_bloco({"o2": O2_value, "temperatura": Temp_value}).tolist()
+
 
 # --- Inicializa contexto Modbus ---
-# Cria o "banco de dados" do escravo (holding registers HR 2000–4999)
-store = ModbusSlaveContext(
-    hr=ModbusSequentialDataBlock(2000, registers[2000:]),  # offset inicial 2000
-    zero_mode=False  # False = endereçamento começa em 1 (padrão Modbus)
-)
-# Cria o contexto do servidor (único escravo neste caso)
-context = ModbusServerContext(slaves=store, single=True)
+def criar_escravo(slave_id=SLAVE_ID):
+    """Cria o "banco de dados" de uma sonda (holding registers HR 2000–4999)."""
+    registers = criar_registradores()
+    registers[mapa_do71.MAPA["id"].endereco - mapa_do71.BLOCO_INICIO] = slave_id
+    return ModbusSlaveContext(
+        # Com zero_mode=False o pymodbus soma 1 ao endereço do PDU; o bloco começa
+        # em BLOCO_INICIO + 1 para o registrador 2091 do mapa ser o 2091 do PDU
+        hr=ModbusSequentialDataBlock(mapa_do71.BLOCO_INICIO + 1, registers),
+        zero_mode=False  # False = endereçamento começa em 1 (padrão Modbus)
+    )
+
+
+def criar_contexto(escravos=None):
+    """Contexto do servidor: uma sonda que responde a qualquer ID (padrão) ou
+    uma sonda por ID da lista."""
+    if not escravos:
+        return ModbusServerContext(slaves=criar_escravo(), single=True)
+    return ModbusServerContext(slaves={s: criar_escravo(s) for s in escravos}, single=False)
+
+
+def ler_escravos(texto):
+    """Lista de IDs no formato "1,2,5-8"."""
+    ids = []
+    for parte in texto.split(","):
+        inicio, _, fim = parte.partition("-")
+        ids.extend(range(int(inicio), int(fim or inicio) + 1))
+    if not all(1 <= s <= 247 for s in ids):
+        raise argparse.ArgumentTypeError("IDs Modbus vão de 1 a 247")
+    return ids
+
+
+# Contexto do servidor, criado em main()
+context = None
+
+
+def atualizar_registradores(o2, temp, escravo=0x00):
+    """Grava O2 e temperatura nos registradores do contexto Modbus."""
+    global O2_value, Temp_value
+    O2_value, Temp_value = o2, temp
+    # Atualiza os registradores no contexto Modbus (func. code 3 = holding registers)
+    context[escravo].setValues(3, mapa_do71.MAPA["o2"].endereco, float_to_regs(o2))
+    context[escravo].setValues(3, mapa_do71.MAPA["temperatura"].endereco, float_to_regs(temp))
 
 
 # --- Função de atualização em segundo plano ---
 def atualizar_dinamico():
     """Loop contínuo que permite alterar os valores simulados de O2 e temperatura."""
-    global O2_value, Temp_value
+    o2, temp = O2_value, Temp_value
     while True:
         try:
             # Aguarda entrada do usuário no terminal, ex: "o2=7.8"
             entrada = input("Digite novo valor (ex: o2=7.8 ou t=23.5): ").strip()
             # Atualiza o valor conforme prefixo digitado
             if entrada.startswith("o2="):
-                O2_value = float(entrada.split("=")[1])
+                o2 = float(entrada.split("=")[1])
             elif entrada.startswith("t="):
-                Temp_value = float(entrada.split("=")[1])
+                temp = float(entrada.split("=")[1])
             else:
                 print("Use o2=<valor> ou t=<valor>")
+        except EOFError:
+            # Sem terminal (ex.: rodando em segundo plano): mantém os últimos valores
+            return
         except Exception:
             # Ignora erros de entrada (ex: linha vazia)
             pass
 
-        # Converte os novos valores em registradores
-        o2_regs = float_to_regs(O2_value)
-        t_regs = float_to_regs(Temp_value)
-
-        # Atualiza os registradores no contexto Modbus (func. code 3 = holding registers)
-        context[0x00].setValues(3, 2091, o2_regs)
-        context[0x00].setValues(3, 2411, t_regs)
+        # Converte os novos valores e atualiza os registradores (todas as sondas)
+        for escravo in context.slaves() if not context.single else [0x00]:
+            atualizar_registradores(o2, temp, escravo)
 
         # Exibe os valores atualizados no terminal
         print(f"[Atualizado] O2={O2_value:.2f} mg/L | Temp={Temp_value:.2f} °C")
@@ -123,27 +166,150 @@ def atualizar_dinamico():
         time.sleep(UPDATE_INTERVAL)
 
 
-# --- Thread de atualização dinâmica ---
-# Cria uma thread daemon (executa em paralelo ao servidor Modbus)
-t = Thread(target=atualizar_dinamico, daemon=True)
-t.start()
-
-# Informações iniciais impressas no terminal
-print(f"\n=== Simulador Yokogawa DO71/DO72 ===")
-print(f"Porta: {PORTA_SERIAL} | Baud: {BAUDRATE} | Slave ID: {SLAVE_ID}")
-print(f"Registradores ativos: 2000–5000")
-print("Digite: o2=<valor> ou t=<valor> para alterar em tempo real.\n")
-
-# --- Inicia servidor Modbus RTU ---
-# Inicia o servidor Modbus RTU que responde a requisições na porta serial definida.
-# A função StartSerialServer fica em loop infinito até o programa ser encerrado.
-StartSerialServer(
-    context,                 # Contexto com os registradores (dados do escravo)
-    framer=ModbusRtuFramer,  # Define o enquadramento RTU
-    port=PORTA_SERIAL,       # Porta serial física
-    baudrate=BAUDRATE,       # Baud rate definido
-    stopbits=STOPBITS,       # Bits de parada
-    parity=PARIDADE,         # Tipo de paridade
-    timeout=TIMEOUT,         # Timeout de comunicação
-)
+async def servir_async(args, fd=None):
+    """Servidores assíncronos: RTU no pty/porta e/ou TCP em localhost."""
+    import yokogawa_servidor
+    servidores = []
+    injetor = None
+    if fd is not None and args.falhas:
+        import yokogawa_falhas
+        injetor = yokogawa_falhas.InjetorFalhas(yokogawa_falhas.ler_perfil(args.falhas), args.falhas_seed,
+                                                args.falhas)
+        print(f"Falhas: {injetor.regras}", flush=True)
+        rtu = yokogawa_falhas.RtuComFalhas(context, fd, injetor, args.baud)
+        rtu.start()
+        servidores.append(rtu)
+    elif fd is not None:
+        rtu = yokogawa_servidor.RtuServer(context, fd, args.baud)
+        rtu.start()
+        servidores.append(rtu)
+    if args.tcp is not None:
+        tcp = await yokogawa_servidor.TcpServer(context, "127.0.0.1", args.tcp).start()
+        print(f"Modbus TCP: 127.0.0.1:{tcp.port}", flush=True)
+        servidores.append(tcp)
+    try:
+        while True:
+            await asyncio.sleep(args.estatisticas or 3600)
+            if args.estatisticas:
+                for servidor in servidores:
+                    print(f"[{type(servidor).__name__}] {servidor.stats.as_dict()}", flush=True)
+                if injetor is not None:
+                    print(f"[Falhas] {injetor.as_dict()}", flush=True)
+                    _salvar_falhas(args, injetor)
+    finally:
+        for servidor in servidores:
+            servidor.close()
+        if injetor is not None:
+            _salvar_falhas(args, injetor)
+
+
+def _salvar_falhas(args, injetor):
+    """Grava as estatísticas de falhas em --falhas-json (substitui o arquivo)."""
+    if args.falhas_json:
+        import json
+        with open(args.falhas_json + ".tmp", "w") as f:
+            json.dump(injetor.as_dict(), f, indent=1)
+        os.replace(args.falhas_json + ".tmp", args.falhas_json)
+
+
+def main():
+    global context
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--porta", help=f"porta serial do adaptador RS-485 (padrão {PORTA_SERIAL})")
+    parser.add_argument("--baud", type=int, default=BAUDRATE, help="taxa de transmissão")
+    parser.add_argument("--timeout", type=float, default=TIMEOUT,
+                        help="timeout de leitura da serial (s); valores pequenos reduzem o tempo de resposta")
+    parser.add_argument("--pty", action="store_true", help="cria uma porta serial virtual em vez de abrir --porta")
+    parser.add_argument("--tcp", type=int, nargs="?", const=5020, help="escuta Modbus TCP em 127.0.0.1 (porta 5020)")
+    parser.add_argument("--servidor", choices=("pymodbus", "asyncio"), default="pymodbus",
+                        help="servidor RTU da --porta (--pty e --tcp sempre usam asyncio)")
+    parser.add_argument("--escravos", type=ler_escravos, help="IDs das sondas simuladas, ex.: 1-32 ou 1,4,7")
+    parser.add_argument("--estatisticas", type=float, help="intervalo para imprimir as estatísticas (s)")
+    parser.add_argument("--cenario", help="diurno, queda, deriva ou caminho de um registro .csv/.bin")
+    parser.add_argument("--velocidade", type=float, default=1.0, help="segundos simulados por segundo real")
+    parser.add_argument("--passo", type=float, default=PASSO_CENARIO, help="intervalo entre atualizações (s)")
+    parser.add_argument("--duracao", type=float, help="tempo simulado até parar o cenário (s)")
+    parser.add_argument("--repetir", action="store_true", help="reinicia o registro ao chegar ao fim")
+    parser.add_argument("--hora-inicial", type=float, default=0.0, help="hora do dia no início dos geradores")
+    parser.add_argument("--falhas", help="perfil de falhas do RTU (timeout, crc, quadros, excecao, travado, pior) "
+                                         "ou regras, ex.: atraso:0.9@0.1,crc@/20 (usa o servidor asyncio)")
+    parser.add_argument("--falhas-seed", type=int, help="semente do sorteio das falhas (repetível)")
+    parser.add_argument("--falhas-json", help="grava as estatísticas de falhas neste arquivo a cada --estatisticas "
+                                              "e ao sair")
+    args = parser.parse_args()
+    if args.falhas:
+        import yokogawa_falhas
+        try:
+            yokogawa_falhas.ler_perfil(args.falhas)
+        except ValueError as e:
+            parser.error(f"--falhas: {e}")
+        args.servidor = "asyncio"  # As falhas são aplicadas no RtuServer
+    porta_informada = args.porta is not None
+    args.porta = args.porta or PORTA_SERIAL
+
+    context = criar_contexto(args.escravos)
+    escravos = args.escravos or [0x00]
+
+    # --- Thread de atualização dinâmica ---
+    # Cria uma thread daemon (executa em paralelo ao servidor Modbus)
+    if args.cenario:
+        import yokogawa_cenarios
+        gerador = args.cenario in yokogawa_cenarios.CENARIOS
+        # Uma sonda por cenário; nos geradores cada uma tem ruído e horário próprios
+        for i, escravo in enumerate(escravos):
+            kw = {"hora_inicial": args.hora_inicial + i * 0.25, "seed": escravo} if gerador else {}
+            cenario = yokogawa_cenarios.criar_cenario(args.cenario, args.repetir, **kw)
+            atualizar = (lambda e: lambda o2, temp: atualizar_registradores(o2, temp, e))(escravo)
+            yokogawa_cenarios.Reprodutor(cenario, atualizar, args.velocidade, args.passo, args.duracao,
+                                         log_intervalo=5.0 if i == 0 else float("inf")).start()
+    else:
+        Thread(target=atualizar_dinamico, daemon=True).start()
+
+    fd = None
+    if args.pty:
+        import yokogawa_servidor
+        fd, args.porta, _cliente = yokogawa_servidor.open_pty()
+
+    # Informações iniciais impressas no terminal
+    print(f"\n=== Simulador Yokogawa DO71/DO72 ===")
+    ids = f"{escravos[0]}–{escravos[-1]} ({len(escravos)} sondas)" if args.escravos else f"{SLAVE_ID} (qualquer)"
+    porta = args.porta if args.pty or porta_informada or args.tcp is None else "—"
+    print(f"Porta: {porta} | Baud: {args.baud} | Slave ID: {ids}")
+    print(f"Registradores ativos: {mapa_do71.BLOCO_INICIO}–{mapa_do71.BLOCO_INICIO + mapa_do71.BLOCO_TAMANHO - 1}")
+    if args.cenario:
+        print(f"Cenário: {args.cenario} | velocidade {args.velocidade:g}x | passo {args.passo * 1000:g} ms\n",
+              flush=True)
+    else:
+        print("Digite: o2=<valor> ou t=<valor> para alterar em tempo real.\n", flush=True)
+
+    # Servidores assíncronos: pty, --servidor asyncio ou só TCP (sem --porta)
+    if args.pty or args.servidor == "asyncio" or (args.tcp is not None and not porta_informada):
+        if fd is None and args.servidor == "asyncio":
+            import serial
+            porta_serial = serial.Serial(args.porta, args.baud, stopbits=STOPBITS, parity=PARIDADE, timeout=0)
+            fd = porta_serial.fileno()
+        try:
+            asyncio.run(servir_async(args, fd))
+        except KeyboardInterrupt:
+            pass
+        return
+    if args.tcp is not None:
+        # TCP em segundo plano e o RTU do pymodbus na --porta
+        Thread(target=lambda: asyncio.run(servir_async(args)), daemon=True).start()
+
+    # --- Inicia servidor Modbus RTU ---
+    # Inicia o servidor Modbus RTU que responde a requisições na porta serial definida.
+    # A função StartSerialServer fica em loop infinito até o programa ser encerrado.
+    StartSerialServer(
+        context,                 # Contexto com os registradores (dados do escravo)
+        framer=ModbusRtuFramer,  # Define o enquadramento RTU
+        port=args.porta,         # Porta serial física
+        baudrate=args.baud,      # Baud rate definido
+        stopbits=STOPBITS,       # Bits de parada
+        parity=PARIDADE,         # Tipo de paridade
+        timeout=args.timeout,    # Timeout de comunicação
+    )
+
 
+if __name__ == "__main__":
+    main()
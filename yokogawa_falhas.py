@@ -0,0 +1,178 @@
+"""
+Injeção de falhas no simulador Yokogawa DO71/DO72
+-------------------------------------------------
+- Perfis de falha aplicados às respostas RTU (RtuServer.respond()), por
+  probabilidade ou a cada N requisições, ou forçados para a próxima requisição
+- Falhas:
+    atraso:s      resposta atrasada (padrão 0,9 s, acima do MODBUS_TIMEOUT de 800 ms da Black Pill)
+    silencio      sem resposta
+    truncado:n    corta os últimos n bytes (padrão 3)
+    crc           CRC invertido
+    excecao:c     resposta de exceção com o código c (padrão 6, escravo ocupado)
+    lacuna:s      pausa de s segundos depois do 7º byte (padrão 0,06 s, acima da
+                  espera fixa de 50 ms da Black Pill)
+    travado:s     a sonda repete as últimas respostas por s segundos (padrão 30 s)
+- Sintaxe: "tipo[:valor]@probabilidade" ou "tipo[:valor]@/N" (a cada N
+  requisições), separados por vírgula; ou o nome de um perfil em PERFIS
+- Estatísticas: contagem por falha e latência da resposta (do fim da
+  requisição ao último byte escrito), média, p99 e máxima
+
+Uso:
+    python yokogawa_do71.py --pty --falhas timeout --estatisticas 5
+    python yokogawa_do71.py --pty --falhas "atraso:0.5@0.1,crc@/20" --falhas-json falhas.json
+"""
+
+import asyncio, random, time
+from collections import deque
+import yokogawa_servidor
+from yokogawa_servidor import with_crc
+
+# Valores padrão de cada falha
+PADROES = {"atraso": 0.9, "silencio": None, "truncado": 3, "crc": None, "excecao": 6, "lacuna": 0.06,
+           "travado": 30.0}
+BYTES_ANTES_DA_LACUNA = 7  # A Black Pill espera 7 bytes e então dorme 50 ms
+
+PERFIS = {
+    "timeout": "atraso:0.9@0.1,silencio@0.05",
+    "crc": "crc@0.1",
+    "quadros": "truncado@0.05,lacuna@0.05",
+    "excecao": "excecao@0.1",
+    "travado": "travado:20@0.01",
+    "pior": "atraso:0.9@0.05,silencio@0.03,truncado@0.03,crc@0.03,excecao@0.03,lacuna@0.03,travado:10@0.005",
+}
+
+
+class Regra:
+    """Uma falha e quando aplicá-la (probabilidade ou a cada N requisições)."""
+
+    def __init__(self, tipo, valor=None, prob=None, cada=None):
+        if tipo not in PADROES:
+            raise ValueError(f"Falha desconhecida: {tipo!r} (use {', '.join(PADROES)})")
+        self.tipo = tipo
+        self.valor = PADROES[tipo] if valor is None else valor
+        self.prob = prob
+        self.cada = cada
+
+    def dispara(self, n, rng):
+        if self.cada:
+            return n % self.cada == 0
+        return rng.random() < self.prob
+
+    def __repr__(self):
+        quando = f"/{self.cada}" if self.cada else f"{self.prob:g}"
+        return f"{self.tipo}{'' if self.valor is None else f':{self.valor:g}'}@{quando}"
+
+
+def ler_perfil(texto):
+    """Nome de perfil ou "tipo[:valor]@p,..." → [Regra]."""
+    texto = PERFIS.get(texto, texto)
+    regras = []
+    for parte in filter(None, (p.strip() for p in texto.split(","))):
+        falha, _, quando = parte.partition("@")
+        tipo, _, valor = falha.partition(":")
+        quando = quando or "1"
+        cada = int(quando[1:]) if quando.startswith("/") else None
+        regras.append(Regra(tipo, float(valor) if valor else None,
+                            None if cada else float(quando), cada))
+    return regras
+
+
+class InjetorFalhas:
+    """Decide a falha de cada resposta e guarda as estatísticas."""
+
+    def __init__(self, regras, seed=None, perfil=""):
+        self.regras = regras
+        self.perfil = perfil
+        self.rng = random.Random(seed)
+        self._forcadas = deque()
+        self._travado = {}         # escravo → (até quando, {PDU da requisição: resposta})
+        self._ultimas = {}         # escravo → {PDU da requisição: última resposta boa}
+        self._latencias = deque(maxlen=10000)
+        # Estatísticas
+        self.requisicoes = 0
+        self.contagem = {tipo: 0 for tipo in PADROES}
+        self.respostas_travadas = 0
+
+    def forcar(self, tipo, valor=None):
+        """Aplica a falha na próxima requisição (depois das já forçadas)."""
+        self._forcadas.append(Regra(tipo, valor, prob=1.0))
+
+    def escolher(self):
+        """Falha desta requisição (a primeira regra que dispara) ou None."""
+        self.requisicoes += 1
+        if self._forcadas:
+            regra = self._forcadas.popleft()
+        else:
+            regra = next((r for r in self.regras if r.dispara(self.requisicoes, self.rng)), None)
+        if regra is not None:
+            self.contagem[regra.tipo] += 1
+        return regra
+
+    def resposta_travada(self, unit, pdu, frame, agora):
+        """Resposta a enviar: a congelada se a sonda estiver travada, senão `frame` (e a guarda)."""
+        travado = self._travado.get(unit)
+        if travado is not None:
+            if agora < travado[0]:
+                congelada = travado[1].get(pdu)
+                if congelada is not None:
+                    self.respostas_travadas += 1
+                    return congelada
+            else:
+                del self._travado[unit]
+        self._ultimas.setdefault(unit, {})[pdu] = frame
+        return frame
+
+    def travar(self, unit, duracao, agora):
+        self._travado[unit] = (agora + duracao, dict(self._ultimas.get(unit, {})))
+
+    def observar(self, latencia):
+        self._latencias.append(latencia)
+
+    def as_dict(self):
+        lat = sorted(self._latencias)
+        return {
+            "perfil": self.perfil,
+            "requisicoes": self.requisicoes,
+            "falhas": {k: v for k, v in self.contagem.items() if v},
+            "respostas_travadas": self.respostas_travadas,
+            "latencia_ms_media": round(sum(lat) / len(lat) * 1000, 2) if lat else None,
+            "latencia_ms_p99": round(lat[min(len(lat) - 1, int(0.99 * len(lat)))] * 1000, 2) if lat else None,
+            "latencia_ms_max": round(lat[-1] * 1000, 2) if lat else None,
+        }
+
+
+class RtuComFalhas(yokogawa_servidor.RtuServer):
+    """RtuServer que passa cada resposta pelo injetor de falhas."""
+
+    def __init__(self, context, fd, injetor, baud=19200, bits_per_char=11):
+        super().__init__(context, fd, baud, bits_per_char)
+        self.injetor = injetor
+
+    def respond(self, unit, request_pdu, frame):
+        loop = asyncio.get_running_loop()
+        t0 = time.monotonic()
+        frame = self.injetor.resposta_travada(unit, request_pdu, frame, t0)
+        regra = self.injetor.escolher()
+        tipo = regra.tipo if regra is not None else None
+        if tipo == "silencio":
+            return
+        if tipo == "atraso":
+            loop.call_later(regra.valor, self._enviar, frame, t0)
+        elif tipo == "truncado":
+            self._enviar(frame[:max(1, len(frame) - int(regra.valor))], t0)
+        elif tipo == "crc":
+            self._enviar(frame[:-2] + bytes(b ^ 0xFF for b in frame[-2:]), t0)
+        elif tipo == "excecao":
+            self._enviar(with_crc(bytes((unit, request_pdu[0] | 0x80, int(regra.valor)))), t0)
+        elif tipo == "lacuna":
+            corte = BYTES_ANTES_DA_LACUNA if len(frame) > BYTES_ANTES_DA_LACUNA else len(frame) // 2
+            self.write(frame[:corte])
+            loop.call_later(regra.valor, self._enviar, frame[corte:], t0)
+        else:
+            if tipo == "travado":
+                self.injetor.travar(unit, regra.valor, t0)
+            self._enviar(frame, t0)
+
+    def _enviar(self, frame, t0):
+        self.write(frame)
+        self.injetor.observar(time.monotonic() - t0)
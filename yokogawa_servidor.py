@@ -0,0 +1,254 @@
+"""
+Servidores Modbus assíncronos do simulador Yokogawa DO71/DO72
+-------------------------------------------------------------
+- RTU sobre um par pty (porta serial virtual) ou uma porta serial já aberta
+- TCP (MBAP) em localhost, várias conexões e requisições em sequência por conexão
+- Os dois usam o mesmo contexto do pymodbus (ModbusServerContext) e a mesma
+  função handle_pdu(); várias sondas = vários IDs de escravo no contexto
+- Funções 3 (ler holding), 4 (ler input), 6 e 16 (escrever holding)
+"""
+
+import asyncio, os, struct, sys
+from pymodbus.exceptions import NoSuchSlaveException
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "Raspberry"))
+from modbus_rtu import crc16  # Mesmo CRC do mestre
+
+ILLEGAL_FUNCTION = 0x01
+ILLEGAL_ADDRESS = 0x02
+ILLEGAL_VALUE = 0x03
+GATEWAY_TARGET_FAILED = 0x0B
+
+MBAP = struct.Struct(">HHHB")
+MBAP_MAX_LENGTH = 254  # Campo length: ID do escravo + PDU de até 253 bytes
+ADDR_COUNT = struct.Struct(">HH")
+_REGS = {}
+
+
+def _regs_struct(count):
+    s = _REGS.get(count)
+    if s is None:
+        s = _REGS[count] = struct.Struct(f">{count}H")
+    return s
+
+
+def with_crc(frame):
+    return frame + struct.pack("<H", crc16(frame))
+
+
+def exception_pdu(function, code):
+    return bytes((function | 0x80, code))
+
+
+def slave_for(context, unit):
+    """Escravo do contexto ou None se o ID não está no simulador."""
+    try:
+        return context[unit]
+    except NoSuchSlaveException:
+        return None
+
+
+def handle_pdu(slave, pdu):
+    """Executa um PDU (função + dados) em um escravo e retorna o PDU de resposta."""
+    function = pdu[0]
+    try:
+        if function in (3, 4):
+            address, count = ADDR_COUNT.unpack_from(pdu, 1)
+            if not 1 <= count <= 125:
+                return exception_pdu(function, ILLEGAL_VALUE)
+            if not slave.validate(function, address, count):
+                return exception_pdu(function, ILLEGAL_ADDRESS)
+            values = slave.getValues(function, address, count)
+            return bytes((function, 2 * count)) + _regs_struct(count).pack(*values)
+        if function == 6:
+            address, value = ADDR_COUNT.unpack_from(pdu, 1)
+            if not slave.validate(function, address, 1):
+                return exception_pdu(function, ILLEGAL_ADDRESS)
+            slave.setValues(function, address, [value])
+            return bytes(pdu[:5])
+        if function == 16:
+            address, count = ADDR_COUNT.unpack_from(pdu, 1)
+            if not 1 <= count <= 123 or pdu[5] != 2 * count or len(pdu) < 6 + 2 * count:
+                return exception_pdu(function, ILLEGAL_VALUE)
+            if not slave.validate(function, address, count):
+                return exception_pdu(function, ILLEGAL_ADDRESS)
+            slave.setValues(function, address, list(_regs_struct(count).unpack_from(pdu, 6)))
+            return bytes(pdu[:5])
+    except (struct.error, IndexError):  # PDU mais curto que a função exige
+        return exception_pdu(function, ILLEGAL_VALUE)
+    return exception_pdu(function, ILLEGAL_FUNCTION)
+
+
+def rtu_request_length(buf):
+    """Tamanho do quadro de requisição RTU no início de buf (None = ainda não dá para saber)."""
+    if len(buf) < 2:
+        return None
+    function = buf[1]
+    if function in (1, 2, 3, 4, 5, 6):
+        return 8
+    if function in (15, 16):
+        return 9 + buf[6] if len(buf) >= 7 else None
+    return None  # Função desconhecida: o quadro termina no silêncio t3.5
+
+
+class ServerStats:
+    def __init__(self):
+        self.requests = 0
+        self.responses = 0
+        self.exceptions = 0
+        self.crc_errors = 0
+        self.ignored = 0       # ID fora do simulador ou broadcast
+        self.per_unit = {}
+
+    def count(self, unit, response):
+        self.requests += 1
+        self.per_unit[unit] = self.per_unit.get(unit, 0) + 1
+        if response is not None:
+            self.responses += 1
+            if response[0] & 0x80:
+                self.exceptions += 1
+
+    def as_dict(self):
+        return {
+            "requisicoes": self.requests,
+            "respostas": self.responses,
+            "excecoes": self.exceptions,
+            "erros_crc": self.crc_errors,
+            "ignoradas": self.ignored,
+            "por_escravo": dict(sorted(self.per_unit.items())),
+        }
+
+
+# ==================== RTU ====================
+class RtuServer:
+    """Escravo(s) Modbus RTU em um descritor serial (lado mestre de um pty ou porta aberta)."""
+
+    def __init__(self, context, fd, baud=19200, bits_per_char=11):
+        self.context = context
+        self.fd = fd
+        self.silence = 1.75e-3 if baud > 19200 else 3.5 * bits_per_char / baud
+        self._buf = bytearray()
+        self._timer = None
+        self.stats = ServerStats()
+
+    def start(self):
+        os.set_blocking(self.fd, False)
+        asyncio.get_running_loop().add_reader(self.fd, self._on_readable)
+
+    def close(self):
+        asyncio.get_running_loop().remove_reader(self.fd)
+
+    def _on_readable(self):
+        try:
+            data = os.read(self.fd, 512)
+        except (BlockingIOError, OSError):
+            return
+        if not data:
+            return
+        self._buf += data
+        self._parse()
+        # Sobra incompleta: descartada se o barramento ficar em silêncio por t3.5
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = asyncio.get_running_loop().call_later(self.silence, self._on_silence) \
+            if self._buf else None
+
+    def _parse(self):
+        while True:
+            length = rtu_request_length(self._buf)
+            if length is None or len(self._buf) < length:
+                return
+            frame = bytes(self._buf[:length])
+            del self._buf[:length]
+            if not self._frame(frame):
+                self._buf.clear()  # CRC inválido: ressincroniza no próximo silêncio
+                return
+
+    def _on_silence(self):
+        self._timer = None
+        if len(self._buf) >= 4:
+            self._frame(bytes(self._buf))
+        self._buf.clear()
+
+    def _frame(self, frame):
+        """Processa um quadro completo; retorna False se o CRC não confere."""
+        if crc16(frame[:-2]) != struct.unpack("<H", frame[-2:])[0]:
+            self.stats.crc_errors += 1
+            return False
+        unit, pdu = frame[0], frame[1:-2]
+        slave = slave_for(self.context, unit) if unit else None
+        if slave is None:
+            self.stats.ignored += 1  # Outro escravo da linha (ou broadcast)
+            if unit == 0:
+                for u in self.context.slaves():
+                    handle_pdu(self.context[u], pdu)
+            return True
+        response = handle_pdu(slave, pdu)
+        self.stats.count(unit, response)
+        self.respond(unit, pdu, with_crc(bytes((unit,)) + response))
+        return True
+
+    def respond(self, unit, request_pdu, frame):
+        """Envia a resposta (ponto de extensão para atrasos e falhas)."""
+        self.write(frame)
+
+    def write(self, frame):
+        try:
+            os.write(self.fd, frame)
+        except BlockingIOError:
+            asyncio.get_running_loop().call_later(0.001, self.write, frame)
+
+
+def open_pty():
+    """Cria um par pty em modo bruto; retorna (fd do simulador, caminho para o cliente, fd do cliente)."""
+    import tty
+    master_fd, slave_fd = os.openpty()
+    tty.setraw(master_fd)
+    tty.setraw(slave_fd)
+    path = os.ttyname(slave_fd)
+    # Mantém o lado do cliente aberto para o pty não fechar entre conexões
+    return master_fd, path, slave_fd
+
+
+# ==================== TCP ====================
+class TcpServer:
+    """Modbus TCP: cada conexão atende requisições em sequência (pode haver várias em voo)."""
+
+    def __init__(self, context, host="127.0.0.1", port=5020):
+        self.context = context
+        self.host = host
+        self.port = port
+        self.server = None
+        self.connections = 0
+        self.stats = ServerStats()
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._client, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def _client(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                header = await reader.readexactly(MBAP.size)
+                tid, pid, length, unit = MBAP.unpack(header)
+                if not 2 <= length <= MBAP_MAX_LENGTH:
+                    break  # Cabeçalho inválido: sem como achar o próximo quadro, fecha a conexão
+                pdu = await reader.readexactly(length - 1)
+                slave = slave_for(self.context, unit)
+                response = handle_pdu(slave, pdu) if slave is not None \
+                    else exception_pdu(pdu[0], GATEWAY_TARGET_FAILED)
+                self.stats.count(unit, response)
+                writer.write(MBAP.pack(tid, pid, len(response) + 1, unit) + response)
+                # Só espera o buffer esvaziar quando ele crescer demais
+                if writer.transport.get_write_buffer_size() > 65536:
+                    await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()